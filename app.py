@@ -1,7 +1,13 @@
+from libs.startup_profile import startup_profiler
+
+# 在导入应用模块之前安装，启动完成后会自动卸载
+startup_profiler.install_import_hook()
+
 from app_factory import create_app
 import uvicorn
 
-app = create_app()
+with startup_profiler.phase("create_app"):
+    app = create_app()
 
 if __name__ == "__main__":
 
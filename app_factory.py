@@ -1,52 +1,67 @@
+import asyncio
 import time
+import inspect
 import logging
-from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.responses import Response
+from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
-from controllers import test_router
+from controllers import metrics as metrics_controller, test_router
+from controllers.v1 import api_router
 
 from extensions import (
+    ext_agent,
+    ext_checkpoint_retention,
     ext_database,
-    ext_logging
+    ext_db_pool,
+    ext_logging,
+    ext_metrics,
 )
+from libs.logger import get_logger
+from libs.request_context import RequestContextMiddleware
+from libs.startup_profile import startup_profiler
+
+logger = get_logger(__name__)
 
 EXTENSIONS = [
     ext_logging,
     ext_database,
+    ext_db_pool,
+    ext_metrics,
+    ext_agent,
+    ext_checkpoint_retention,
 ]
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        request.state.request_id = int(time.time() * 1000)
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = str(request.state.request_id)
-        return response
-
 def create_app() -> FastAPI:
     """
     用 lifespan 把启动/关闭逻辑都集中在一个地方。
     """
-    # 先创建应用实例
-    app = FastAPI()
-    
-    # 在应用启动前注册中间件
-    app.add_middleware(RequestIDMiddleware)
-    
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         # —— startup 阶段 —— #
         start = time.perf_counter()
 
+        # 约定：ext 模块可以提供 preload()，在线程中提前做耗时的导入等准备工作，
+        # 与前面扩展的 init_app()（如连接池建连）并行执行
+        preloads = {
+            ext: asyncio.create_task(asyncio.to_thread(ext.preload))
+            for ext in EXTENSIONS
+            if hasattr(ext, "preload") and not (hasattr(ext, "is_enabled") and not ext.is_enabled())
+        }
+
         # 初始化每个扩展的“启动”部分
         for ext in EXTENSIONS:
             if hasattr(ext, "is_enabled") and not ext.is_enabled():
                 logging.info(f"Skipped extension {ext.__name__}")
                 continue
             t0 = time.perf_counter()
-            # 约定：每个 ext 模块都提供 init_app()，做启动阶段的工作
-            ext.init_app(app)
+            with startup_profiler.phase(ext.__name__):
+                if ext in preloads:
+                    await preloads[ext]
+                # 约定：每个 ext 模块都提供 init_app()，做启动阶段的工作
+                # init_app 可以是协程函数（例如需要建立异步连接的扩展）
+                result = ext.init_app(app)
+                if inspect.isawaitable(result):
+                    await result
             t1 = time.perf_counter()
             logging.info(f"Loaded {ext.__name__} in {(t1 - t0) * 1000:.2f}ms")
             # print(f"Loaded {ext.__name__} in {(t1 - t0) * 1000:.2f}ms")
@@ -58,19 +73,29 @@ def create_app() -> FastAPI:
 
         logging.info(f"engine in lifespan: {app.state.engine}")
 
+        # 从进程导入 app 到可以接收请求的耗时分布：各阶段耗时 + 最慢的导入包
+        logger.info("startup_profile", **startup_profiler.finish())
+
         yield  # —— 业务请求处理阶段 —— #
 
         # —— shutdown 阶段 —— #
         # 如果有需要清理的资源，可以在各自 ext 模块里定义 shutdown_app()
         for ext in reversed(EXTENSIONS):
             if hasattr(ext, "shutdown_app"):
-                # await ext.shutdown_app(app)
-                ext.shutdown_app(app)
+                result = ext.shutdown_app(app)
+                if inspect.isawaitable(result):
+                    await result
         logging.info("Application shutdown complete")
     
-    # 为应用设置 lifespan
+    # 只创建一个应用实例，中间件和路由都注册在它上面
     app = FastAPI(lifespan=lifespan)
 
-    app.include_router(test_router)
+    # 纯 ASGI 中间件：分配请求 ID 并返回 Server-Timing，不包装响应体
+    app.add_middleware(RequestContextMiddleware)
+
+    app.include_router(test_router.router)
+    if ext_metrics.is_enabled():
+        app.include_router(metrics_controller.router)
+    app.include_router(api_router, prefix="/api/v1")
     
     return app
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Measure the effect of checkpoint retention on table size and state loads.
+
+Seeds a scratch PostgreSQL database with conversation threads through the
+checkpointer used by the agent, then measures table sizes and state load
+latencies before and after a retention pass::
+
+    python benchmarks/bench_checkpoint_retention.py --dsn postgresql://localhost/scratch \
+        --threads 200 --turns 30 --keep-last 10
+
+The checkpointer tables of the target database are emptied first, so never
+point ``--dsn`` at a database holding real conversations. Sizes are reported
+after ``VACUUM FULL``, i.e. the space a regular autovacuum makes reusable.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+from psycopg.rows import dict_row  # noqa: E402
+from psycopg_pool import AsyncConnectionPool  # noqa: E402
+
+from core.agent.checkpoint_retention import CheckpointRetention  # noqa: E402
+from core.agent.checkpointer import ProfiledPostgresSaver  # noqa: E402
+
+TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
+
+class State(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+
+
+async def reply(state: State) -> dict:
+    # Stands in for the chat node: a reply of typical length, no LLM involved
+    return {"messages": [AIMessage(content="lorem ipsum " * 40)]}
+
+
+def build_graph(saver: ProfiledPostgresSaver):
+    builder = StateGraph(State)
+    builder.add_node("chat", reply)
+    builder.add_edge(START, "chat")
+    builder.add_edge("chat", END)
+    return builder.compile(checkpointer=saver)
+
+
+async def seed(graph, threads: list[str], turns: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def converse(thread_id: str) -> None:
+        async with semaphore:
+            config = {"configurable": {"thread_id": thread_id}}
+            for turn in range(turns):
+                await graph.ainvoke({"messages": [HumanMessage(content=f"question {turn}")]}, config)
+
+    await asyncio.gather(*(converse(thread_id) for thread_id in threads))
+
+
+async def table_stats(pool: AsyncConnectionPool) -> dict[str, tuple[int, int]]:
+    async with pool.connection() as conn:
+        for table in TABLES:
+            await conn.execute(f"VACUUM FULL {table}")
+        stats = {}
+        for table in TABLES:
+            cursor = await conn.execute(
+                f"SELECT count(*) AS rows, pg_total_relation_size('{table}') AS size FROM {table}"
+            )
+            row = await cursor.fetchone()
+            stats[table] = (row["rows"], row["size"])
+        return stats
+
+
+async def load_latencies(graph, threads: list[str], samples: int) -> dict[str, float]:
+    state_ms, history_ms = [], []
+    for thread_id in random.sample(threads, min(samples, len(threads))):
+        config = {"configurable": {"thread_id": thread_id}}
+        started = time.perf_counter()
+        await graph.aget_state(config)
+        state_ms.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        async for _ in graph.aget_state_history(config):
+            pass
+        history_ms.append((time.perf_counter() - started) * 1000)
+    return {
+        "state_p50_ms": statistics.median(state_ms),
+        "state_p95_ms": statistics.quantiles(state_ms, n=20)[-1],
+        "history_p50_ms": statistics.median(history_ms),
+    }
+
+
+def report(title: str, stats: dict[str, tuple[int, int]], latencies: dict[str, float]) -> None:
+    print(title)
+    for table, (rows, size) in stats.items():
+        print(f"  {table:<18} {rows:>9} rows {size / 1024 / 1024:>9.2f} MiB")
+    print("  " + "  ".join(f"{name}={value:.2f}" for name, value in latencies.items()))
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with AsyncConnectionPool(
+        args.dsn, min_size=2, max_size=args.concurrency + 2, kwargs={"autocommit": True, "row_factory": dict_row}
+    ) as pool:
+        saver = ProfiledPostgresSaver(pool)
+        await saver.setup()
+        async with pool.connection() as conn:
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)}")
+
+        graph = build_graph(saver)
+        threads = [uuid.uuid4().hex for _ in range(args.threads)]
+        started = time.perf_counter()
+        await seed(graph, threads, args.turns, args.concurrency)
+        print(f"seeded {args.threads} threads x {args.turns} turns in {time.perf_counter() - started:.1f}s\n")
+
+        report("before retention", await table_stats(pool), await load_latencies(graph, threads, args.samples))
+
+        retention = CheckpointRetention(
+            pool, keep_last=args.keep_last, max_age_days=0, delete_orphans=False, batch_size=args.batch_size
+        )
+        result = await retention.run_once()
+        print(f"\nretention pass: {result}\n")
+
+        report("after retention", await table_stats(pool), await load_latencies(graph, threads, args.samples))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="Scratch database; its checkpoint tables are emptied")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=30, help="Conversation turns per thread")
+    parser.add_argument("--keep-last", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=50, help="Threads whose state load is timed")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""Measure the effect of hedged LLM calls on tail latency.
+
+Drives ``ResilientLLMCaller`` against a simulated upstream whose time to first
+token is log-normal, with a small fraction of calls stuck for much longer (a
+slow replica, a cold connection), and compares latency percentiles and the
+number of upstream calls with and without hedging::
+
+    python benchmarks/bench_llm_hedging.py --calls 2000 --concurrency 50
+
+No network or API key is needed.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+
+from configs.middleware import LLMEndpointConfig  # noqa: E402
+from core.agent.llm_pool import EndpointHealth, LLMEndpoint, LLMPool  # noqa: E402
+from core.agent.resilience import ResilientLLMCaller  # noqa: E402
+
+
+def simulated_upstream(args: argparse.Namespace, counter: list[int]):
+    def attempt(endpoint: LLMEndpoint):
+        async def chunks():
+            counter[0] += 1
+            ttft = random.lognormvariate(0, args.sigma) * args.median
+            if random.random() < args.slow_ratio:
+                ttft += args.slow_delay
+            await asyncio.sleep(ttft)
+            for _ in range(args.chunks):
+                yield AIMessageChunk(content="token ")
+                await asyncio.sleep(args.chunk_interval)
+
+        return chunks()
+
+    return attempt
+
+
+async def run(args: argparse.Namespace, hedge_quantile) -> dict:
+    endpoint = LLMEndpoint(LLMEndpointConfig(name="bench"), None, "bench", EndpointHealth("bench"))
+    caller = ResilientLLMCaller(LLMPool([endpoint]), hedge_quantile=hedge_quantile, hedge_min_samples=args.warmup)
+    counter = [0]
+    attempt = simulated_upstream(args, counter)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def call() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            async for _ in caller.stream(attempt):
+                pass
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(call() for _ in range(args.warmup)))
+    latencies.clear()
+    counter[0] = 0
+    await asyncio.gather(*(call() for _ in range(args.calls)))
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "upstream_calls_per_call": counter[0] / args.calls,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=200, help="Calls before measuring, also the hedging sample size")
+    parser.add_argument("--median", type=float, default=0.2, help="Median time to first token, in seconds")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal spread of the time to first token")
+    parser.add_argument("--slow-ratio", type=float, default=0.03, help="Fraction of calls hitting a slow upstream")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="Extra delay of those calls, in seconds")
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-interval", type=float, default=0.005)
+    parser.add_argument("--quantile", type=float, default=0.95, help="Hedging quantile")
+    args = parser.parse_args()
+
+    for label, quantile in (("no hedging", None), (f"hedging at p{args.quantile * 100:g}", args.quantile)):
+        result = asyncio.run(run(args, quantile))
+        print(
+            f"{label:<18} p50={result['p50_ms']:7.1f}ms p95={result['p95_ms']:7.1f}ms "
+            f"p99={result['p99_ms']:7.1f}ms upstream calls/call={result['upstream_calls_per_call']:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
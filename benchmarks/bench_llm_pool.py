@@ -0,0 +1,147 @@
+"""Measure how the LLM pool spreads calls over several backends.
+
+Drives ``ResilientLLMCaller`` against simulated backends that each serve a
+limited number of calls at once (further calls queue on the backend), and
+reports throughput and latency percentiles for:
+
+* a growing number of healthy backends, to show capacity scaling;
+* one backend much slower than the others, per routing strategy;
+* one backend failing every call, which gets ejected by its circuit::
+
+    python benchmarks/bench_llm_pool.py --calls 2000 --concurrency 64
+
+No network or API key is needed.
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import openai  # noqa: E402
+from langchain_core.messages import AIMessageChunk  # noqa: E402
+
+from configs.middleware import LLMEndpointConfig  # noqa: E402
+from core.agent.llm_pool import EndpointHealth, LLMEndpoint, LLMPool  # noqa: E402
+from core.agent.resilience import ResilientLLMCaller  # noqa: E402
+
+
+class SimulatedBackend:
+    """A backend serving ``capacity`` calls at once, ``slowdown`` times slower than nominal."""
+
+    def __init__(self, capacity: int, slowdown: float = 1.0, failing: bool = False):
+        self.slots = asyncio.Semaphore(capacity)
+        self.slowdown = slowdown
+        self.failing = failing
+        self.calls = 0
+
+
+def make_pool(backends: list[SimulatedBackend], strategy: str) -> LLMPool:
+    endpoints = []
+    for index, backend in enumerate(backends):
+        name = f"backend-{index}"
+        endpoint = LLMEndpoint(LLMEndpointConfig(name=name), None, "bench", EndpointHealth(name))
+        endpoint.backend = backend
+        endpoints.append(endpoint)
+    return LLMPool(endpoints, strategy)
+
+
+def simulated_attempt(args: argparse.Namespace):
+    def attempt(endpoint: LLMEndpoint):
+        backend: SimulatedBackend = endpoint.backend
+
+        async def chunks():
+            backend.calls += 1
+            async with backend.slots:
+                if backend.failing:
+                    await asyncio.sleep(args.median)
+                    request = httpx.Request("POST", "http://backend/v1/chat/completions")
+                    raise openai.InternalServerError(
+                        "simulated failure", response=httpx.Response(500, request=request), body=None
+                    )
+                ttft = random.lognormvariate(0, args.sigma) * args.median * backend.slowdown
+                await asyncio.sleep(ttft)
+                for _ in range(args.chunks):
+                    yield AIMessageChunk(content="token ")
+                    await asyncio.sleep(args.chunk_interval * backend.slowdown)
+
+        return chunks()
+
+    return attempt
+
+
+async def run(args: argparse.Namespace, backends: list[SimulatedBackend], strategy: str) -> dict:
+    pool = make_pool(backends, strategy)
+    caller = ResilientLLMCaller(pool, backoff_base=0.05, hedge_quantile=None)
+    attempt = simulated_attempt(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = collections.Counter()
+
+    async def call() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async for _ in caller.stream(attempt):
+                    pass
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "calls_per_second": len(latencies) / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "errors": sum(errors.values()),
+        "share": [round(backend.calls / max(sum(b.calls for b in backends), 1), 2) for backend in backends],
+    }
+
+
+def report(label: str, result: dict) -> None:
+    print(
+        f"{label:<36} {result['calls_per_second']:7.1f} calls/s p50={result['p50_ms']:7.1f}ms "
+        f"p99={result['p99_ms']:7.1f}ms errors={result['errors']} share={result['share']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--capacity", type=int, default=16, help="Calls a backend serves at once")
+    parser.add_argument("--median", type=float, default=0.1, help="Median time to first token, in seconds")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal spread of the time to first token")
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-interval", type=float, default=0.005)
+    parser.add_argument("--slowdown", type=float, default=4.0, help="How much slower the degraded backend is")
+    args = parser.parse_args()
+
+    for count in (1, 2, 4):
+        backends = [SimulatedBackend(args.capacity) for _ in range(count)]
+        report(f"{count} healthy backend(s)", asyncio.run(run(args, backends, "ewma")))
+
+    for strategy in ("least_outstanding", "ewma"):
+        backends = [SimulatedBackend(args.capacity) for _ in range(3)]
+        backends.append(SimulatedBackend(args.capacity, slowdown=args.slowdown))
+        report(f"3 healthy + 1 slow, {strategy}", asyncio.run(run(args, backends, strategy)))
+
+    backends = [SimulatedBackend(args.capacity) for _ in range(3)]
+    backends.append(SimulatedBackend(args.capacity, failing=True))
+    report("3 healthy + 1 failing, ewma", asyncio.run(run(args, backends, "ewma")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Load-test the chat API against a local fake LLM and record latency figures.
+
+Starts ``fake_openai_server.py`` and the production server (``server.py``)
+pointed at it, registers a user with one session per simulated client, then
+drives each scenario at each concurrency level for a fixed duration::
+
+    python benchmarks/bench_load.py --concurrency 1 8 32 --duration 10 --ttft 0.3 --tokens-per-second 50
+
+Scenarios: ``health`` (GET /health), ``chat`` (POST /chatbot/chat) and
+``stream`` (POST /chatbot/chat/stream). For every run it reports throughput,
+p50/p95/p99 latency, time to first token for streams and the framework
+overhead: the mean latency minus the mean time the fake LLM spent serving the
+calls of one request, i.e. what the app adds on top of its upstream.
+
+``--tool-call-ratio`` only makes a difference with an agent that binds tools:
+the fake LLM only calls tools offered by the request, and the default agent
+(``NormalAgent(tools=[])``) offers none. Every run reports the tool calls the
+fake LLM made, and a warning is printed when a ratio was asked for but none
+were made.
+
+Results are written as JSON (``--output``) together with the settings and the
+git revision, so runs of different releases can be compared. The server needs
+a reachable DATABASE_URL, taken from the environment like for ``server.py``;
+``--base-url`` drives an already running server instead, in which case it must
+be configured against the fake server itself.
+
+Clients run in this single process: on small machines the load generator
+competes with the server for CPU, which shows in the health scenario first.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai_server import add_arguments  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+
+
+def wait_until(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def start_fake_llm(args: argparse.Namespace) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        str(ROOT / "benchmarks" / "fake_openai_server.py"),
+        "--port", str(args.fake_port),
+        "--ttft", str(args.ttft),
+        "--ttft-sigma", str(args.ttft_sigma),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--output-tokens", str(args.output_tokens),
+        "--tool-call-ratio", str(args.tool_call_ratio),
+    ]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until(f"http://127.0.0.1:{args.fake_port}/stats", timeout=30)
+    return process
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(args.port),
+        "SERVER_WORKERS": str(args.workers),
+        "LLM_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+        "LLM_API_KEY": "fake",
+        "LLM_ENDPOINTS": "[]",
+        # Measure the full path: every request reaches the (fake) upstream
+        "LLM_CACHE_ENABLED": "false",
+        # The simulated clients share one user, whose request rate must not be the bottleneck
+        "LLM_ADMISSION_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_until(f"http://127.0.0.1:{args.port}{API}/ready", timeout=120)
+    return process
+
+
+def stop(process: Optional[subprocess.Popen]) -> None:
+    if process is not None and process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+async def create_sessions(client: httpx.AsyncClient, count: int) -> list[str]:
+    """Register a throwaway user and return session tokens for the clients."""
+
+    credentials = {"email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password": "Bench-passw0rd"}
+    response = await client.post(f"{API}/auth/register", json=credentials)
+    response.raise_for_status()
+    user_token = response.json()["token"]["access_token"]
+
+    tokens = []
+    for _ in range(count):
+        response = await client.post(f"{API}/auth/session", headers={"Authorization": f"Bearer {user_token}"})
+        response.raise_for_status()
+        tokens.append(response.json()["token"]["access_token"])
+    return tokens
+
+
+async def fake_llm_stats(args: argparse.Namespace) -> Optional[dict]:
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            return (await client.get(f"http://127.0.0.1:{args.fake_port}/stats")).json()
+    except httpx.HTTPError:
+        return None
+
+
+class Sample:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.first_tokens: list[float] = []
+        self.errors = 0
+
+
+async def one_request(client: httpx.AsyncClient, scenario: str, token: str, sample: Sample) -> None:
+    started = time.perf_counter()
+    if scenario == "health":
+        response = await client.get(f"{API}/health")
+        ok = response.status_code == 200
+    else:
+        # Unique prompts, so concurrent requests are never coalesced into one upstream call
+        body = {"messages": [{"role": "user", "content": f"benchmark question {uuid.uuid4().hex}"}]}
+        headers = {"Authorization": f"Bearer {token}"}
+        if scenario == "chat":
+            response = await client.post(f"{API}/chatbot/chat", json=body, headers=headers)
+            ok = response.status_code == 200
+        else:
+            ok = False
+            first_token = None
+            async with client.stream("POST", f"{API}/chatbot/chat/stream", json=body, headers=headers) as response:
+                if response.status_code == 200:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+                        frame = json.loads(line[len("data: "):])
+                        if frame["done"]:
+                            # An error is reported as a final frame with content
+                            ok = first_token is not None and not frame["content"]
+                            break
+                        if frame["content"] and first_token is None:
+                            first_token = time.perf_counter() - started
+            if ok:
+                sample.first_tokens.append(first_token)
+    if ok:
+        sample.latencies.append(time.perf_counter() - started)
+    else:
+        sample.errors += 1
+
+
+def percentiles(values: list[float]) -> dict:
+    if len(values) < 2:
+        value = values[0] * 1000 if values else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(values, n=100)
+    return {"p50_ms": cuts[49] * 1000, "p95_ms": cuts[94] * 1000, "p99_ms": cuts[98] * 1000}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, args: argparse.Namespace, scenario: str, tokens: list[str], concurrency: int
+) -> dict:
+    async def drive(token: str, sample: Sample, duration: float) -> None:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            try:
+                await one_request(client, scenario, token, sample)
+            except httpx.HTTPError:
+                sample.errors += 1
+
+    # Warm up connections and code paths, then measure
+    await asyncio.gather(*(drive(tokens[i], Sample(), args.warmup) for i in range(concurrency)))
+    before = await fake_llm_stats(args)
+    sample = Sample()
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(tokens[i], sample, args.duration) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await fake_llm_stats(args)
+
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(sample.latencies),
+        "errors": sample.errors,
+        "throughput_rps": len(sample.latencies) / elapsed,
+        "latency": percentiles(sample.latencies),
+        "ttft": percentiles(sample.first_tokens) if scenario == "stream" else None,
+        "llm_calls_per_request": None,
+        "tool_calls_per_request": None,
+        "llm_ms_per_request": None,
+        "overhead_ms": None,
+    }
+    if scenario != "health" and sample.latencies and before is not None and after is not None:
+        served = len(sample.latencies) + sample.errors
+        llm_ms = (after["busy_seconds"] - before["busy_seconds"]) * 1000 / served
+        result["llm_calls_per_request"] = (after["completions"] - before["completions"]) / served
+        result["tool_calls_per_request"] = (after["tool_calls"] - before["tool_calls"]) / served
+        result["llm_ms_per_request"] = llm_ms
+        result["overhead_ms"] = statistics.fmean(sample.latencies) * 1000 - llm_ms
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value: Optional[float]) -> str:
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+async def bench(args: argparse.Namespace, base_url: str) -> list[dict]:
+    concurrency = max(args.concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        tokens = await create_sessions(client, concurrency)
+        print(
+            f"{'scenario':<8} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'ttft p50':>8} {'ttft p99':>8} {'overhead':>8} {'errors':>6}"
+        )
+        for scenario in args.scenarios:
+            for level in args.concurrency:
+                result = await run_scenario(client, args, scenario, tokens, level)
+                results.append(result)
+                ttft = result["ttft"] or {}
+                print(
+                    f"{scenario:<8} {level:>5} {result['throughput_rps']:>8.1f} "
+                    f"{format_ms(result['latency']['p50_ms'])} {format_ms(result['latency']['p95_ms'])} "
+                    f"{format_ms(result['latency']['p99_ms'])} {format_ms(ttft.get('p50_ms'))} "
+                    f"{format_ms(ttft.get('p99_ms'))} {format_ms(result['overhead_ms'])} {result['errors']:>6}",
+                    flush=True,
+                )
+    if args.tool_call_ratio > 0 and not any(result["tool_calls_per_request"] for result in results):
+        print("warning: --tool-call-ratio had no effect, the agent offers no tools to the LLM", flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=["health", "chat", "stream"], default=["health", "chat", "stream"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Simulated clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load before each run")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Request timeout, in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="Server workers")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--fake-port", type=int, default=8299)
+    parser.add_argument("--base-url", help="Drive this running server instead of starting one")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON file for the results; defaults to benchmarks/results/load-<timestamp>.json",
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc)
+    fake_llm = server = None
+    try:
+        fake_llm = start_fake_llm(args)
+        if args.base_url is None:
+            server = start_server(args)
+        results = asyncio.run(bench(args, args.base_url or f"http://127.0.0.1:{args.port}"))
+    finally:
+        stop(server)
+        stop(fake_llm)
+
+    output = args.output or ROOT / "benchmarks" / "results" / f"load-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "timestamp": started_at.isoformat(),
+        "git_revision": git_revision(),
+        "settings": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
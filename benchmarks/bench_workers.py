@@ -0,0 +1,134 @@
+"""Measure requests per second of the production server by worker count.
+
+Starts ``server.py`` once per worker count, waits until it is ready, then drives
+it from several client processes over keep-alive connections::
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --duration 10
+
+The client processes need CPU too: on a machine with fewer cores than
+``workers + clients`` the numbers stop scaling because of the load generator.
+The default endpoint (/api/v1/health) exercises the HTTP stack, middleware and
+routing without calling the LLM.
+
+A worker only reports ready once its agent graph is compiled, which needs the
+Postgres checkpointer: DATABASE_URL, taken from the environment like for
+``server.py``, must point to a reachable Postgres database.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# No LLM call is made, but the config requires a key
+os.environ.setdefault("LLM_API_KEY", "fake")
+
+from extensions import ext_db_pool  # noqa: E402
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode} before being ready")
+        try:
+            if httpx.get(f"{base_url}/api/v1/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout}s")
+
+
+async def _drive(url: str, connections: int, duration: float) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+
+        async def loop() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(loop() for _ in range(connections)))
+    return latencies
+
+
+def client_process(url: str, connections: int, duration: float) -> list[float]:
+    return asyncio.run(_drive(url, connections, duration))
+
+
+def run_load(url: str, clients: int, connections: int, duration: float) -> tuple[float, float, float]:
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(client_process, [(url, connections, duration)] * clients)
+    latencies = sorted(latency for result in results for latency in result)
+    if not latencies:
+        return 0.0, 0.0, 0.0
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / duration, statistics.median(latencies) * 1000, p99 * 1000
+
+
+def bench(workers: int, args: argparse.Namespace) -> tuple[float, float, float]:
+    env = {
+        **os.environ,
+        "SERVER_WORKERS": str(workers),
+        "SERVER_PORT": str(args.port),
+        "SERVER_HOST": "127.0.0.1",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": "",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, server, timeout=120)
+        # Warm up every worker's connections and code paths
+        run_load(base_url + args.path, args.clients, args.connections, min(2.0, args.duration))
+        return run_load(base_url + args.path, args.clients, args.connections, args.duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="keep-alive connections per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--path", default="/api/v1/health")
+    parser.add_argument("--port", type=int, default=8199)
+    args = parser.parse_args()
+    if not ext_db_pool.is_enabled():
+        parser.error(
+            "DATABASE_URL must be a postgresql:// URL: workers are only ready once "
+            "the agent graph is compiled, which needs the Postgres checkpointer"
+        )
+
+    print(f"cpus={os.cpu_count()} clients={args.clients} connections={args.connections} path={args.path}")
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        rps, p50, p99 = bench(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {p50:>8.1f} {p99:>8.1f} {rps / baseline:>7.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Local stand-in for an OpenAI-compatible chat completions API.
+
+Answers ``POST /v1/chat/completions``, streamed or not, with a configurable
+time to first token, generation speed and answer length. When the request
+offers tools, a fraction of the answers to user messages can be calls to one
+of them instead, so the agent's tool loop is exercised too: the next call,
+whose last message is the tool result, gets a text answer. Requests without
+tools always get a text answer, like from a real model. ``GET /stats`` reports the number of completions served and the
+total time spent serving them, which ``bench_load.py`` subtracts from the
+latency of the app to get its own overhead::
+
+    python benchmarks/fake_openai_server.py --port 8299 --ttft 0.3 --tokens-per-second 50
+
+No API key is checked.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+
+@dataclass
+class FakeLLMSettings:
+    """Behaviour of the fake upstream.
+
+    Attributes:
+        ttft: Median seconds before the first token.
+        ttft_sigma: Log-normal spread of the time to first token, 0 for a fixed delay.
+        tokens_per_second: Generation speed after the first token.
+        output_tokens: Tokens per text answer.
+        tool_call_ratio: Fraction of answers to a user message offering tools
+            that are a call to one of them.
+    """
+
+    ttft: float = 0.3
+    ttft_sigma: float = 0.0
+    tokens_per_second: float = 50.0
+    output_tokens: int = 64
+    tool_call_ratio: float = 0.0
+
+    def first_token_delay(self) -> float:
+        if self.ttft_sigma <= 0:
+            return self.ttft
+        return random.lognormvariate(0, self.ttft_sigma) * self.ttft
+
+
+def fake_arguments(tool: dict) -> dict:
+    """Arguments for a call to an offered tool: a placeholder for every required parameter."""
+
+    parameters = tool.get("function", {}).get("parameters") or {}
+    placeholders = {"integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}}
+    return {
+        name: placeholders.get(schema.get("type"), "benchmark")
+        for name, schema in (parameters.get("properties") or {}).items()
+        if name in parameters.get("required", [])
+    }
+
+
+def create_app(settings: FakeLLMSettings) -> FastAPI:
+    """Build the fake API; ``app.state.stats`` holds what it served."""
+
+    app = FastAPI()
+    app.state.stats = {"completions": 0, "tool_calls": 0, "busy_seconds": 0.0}
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason: Any = None) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n"
+
+    def usage(prompt_tokens: int, completion_tokens: int) -> dict:
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        started = time.perf_counter()
+        body = await request.json()
+        model = body.get("model", "fake")
+        messages = body.get("messages", [])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        prompt_tokens = sum(len(str(message.get("content") or "").split()) for message in messages)
+        # Only the tools offered by the request can be called, as the app rejects any other
+        tools = [tool for tool in body.get("tools") or [] if tool.get("type") == "function"]
+        call_tool = (
+            bool(tools)
+            and bool(messages)
+            and messages[-1].get("role") == "user"
+            and random.random() < settings.tool_call_ratio
+        )
+        if call_tool:
+            tool = random.choice(tools)
+            tool_call = {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": tool["function"]["name"], "arguments": json.dumps(fake_arguments(tool))},
+            }
+        tokens = [random.choice(WORDS) + " " for _ in range(settings.output_tokens)]
+
+        def done() -> None:
+            app.state.stats["completions"] += 1
+            app.state.stats["tool_calls"] += int(call_tool)
+            app.state.stats["busy_seconds"] += time.perf_counter() - started
+
+        if not body.get("stream"):
+            await asyncio.sleep(settings.first_token_delay() + len(tokens) / settings.tokens_per_second)
+            message: dict[str, Any] = {"role": "assistant", "content": None if call_tool else "".join(tokens)}
+            if call_tool:
+                message["tool_calls"] = [tool_call]
+            done()
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": "tool_calls" if call_tool else "stop"}
+                ],
+                "usage": usage(prompt_tokens, 1 if call_tool else len(tokens)),
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                await asyncio.sleep(settings.first_token_delay())
+                if call_tool:
+                    yield chunk(completion_id, model, {"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]})
+                    yield chunk(completion_id, model, {}, "tool_calls")
+                else:
+                    yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                    for token in tokens:
+                        yield chunk(completion_id, model, {"content": token})
+                        await asyncio.sleep(1 / settings.tokens_per_second)
+                    yield chunk(completion_id, model, {}, "stop")
+                if include_usage:
+                    final = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [],
+                        "usage": usage(prompt_tokens, 1 if call_tool else len(tokens)),
+                    }
+                    yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                done()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of ``FakeLLMSettings`` to a parser."""
+
+    parser.add_argument("--ttft", type=float, default=0.3, help="Median time to first token, in seconds")
+    parser.add_argument("--ttft-sigma", type=float, default=0.0, help="Log-normal spread of the time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--output-tokens", type=int, default=64, help="Tokens per text answer")
+    parser.add_argument(
+        "--tool-call-ratio",
+        type=float,
+        default=0.0,
+        help="Fraction of answers to a user message that are a tool call; only requests offering tools get one",
+    )
+
+
+def settings_from_args(args: argparse.Namespace) -> FakeLLMSettings:
+    return FakeLLMSettings(
+        ttft=args.ttft,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        tool_call_ratio=args.tool_call_ratio,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8299)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,15 @@
 """
 
 from pydantic_settings import SettingsConfigDict
+from .deploy import DeploymentConfig
+from .feature import FeatureConfig
 from .middleware import MiddlewareConfig
 
 
 # Tell pydantic to load env files in order
 class AppConfig(
+    DeploymentConfig,
+    FeatureConfig,
     MiddlewareConfig
 ):
     model_config = SettingsConfigDict(
@@ -15,4 +19,4 @@ class AppConfig(
         case_sensitive=False,
     )
 
-    
\ No newline at end of file
+    
@@ -0,0 +1,85 @@
+from enum import Enum
+
+from typing import Optional
+
+from pydantic import Field, NonNegativeInt, PositiveInt
+from pydantic_settings import BaseSettings
+
+
+class Environment(str, Enum):
+    """
+    Deployment environments.
+    """
+
+    DEVELOPMENT = "development"
+    STAGING = "staging"
+    PRODUCTION = "production"
+    TEST = "test"
+
+
+class ServerConfig(BaseSettings):
+    """
+    Configuration for the production server started by server.py
+    """
+
+    SERVER_HOST: str = Field(
+        description="Interface the server binds to",
+        default="0.0.0.0",
+    )
+
+    SERVER_PORT: PositiveInt = Field(
+        description="Port the server listens on",
+        default=8002,
+    )
+
+    SERVER_WORKERS: NonNegativeInt = Field(
+        description="Number of worker processes, 0 for one per available CPU",
+        default=0,
+    )
+
+    SERVER_BACKLOG: PositiveInt = Field(
+        description="Maximum number of pending connections in the listen queue",
+        default=2048,
+    )
+
+    SERVER_KEEPALIVE: PositiveInt = Field(
+        description="Seconds an idle keep-alive connection is kept open; "
+        "keep it above the load balancer's idle timeout to avoid resets",
+        default=65,
+    )
+
+    SERVER_LIMIT_CONCURRENCY: Optional[PositiveInt] = Field(
+        description="Maximum concurrent connections and tasks per worker before answering 503",
+        default=1000,
+    )
+
+    SERVER_TIMEOUT: PositiveInt = Field(
+        description="Seconds a silent worker is given before it is killed and restarted",
+        default=60,
+    )
+
+    SERVER_GRACEFUL_TIMEOUT: PositiveInt = Field(
+        description="Seconds workers get to finish in-flight requests on SIGTERM",
+        default=30,
+    )
+
+    SERVER_MAX_REQUESTS: NonNegativeInt = Field(
+        description="Restart a worker after this many requests, 0 to disable",
+        default=0,
+    )
+
+    SERVER_MAX_REQUESTS_JITTER: NonNegativeInt = Field(
+        description="Random extra requests added to SERVER_MAX_REQUESTS so workers do not restart together",
+        default=0,
+    )
+
+
+class DeploymentConfig(ServerConfig):
+    """
+    Configuration settings for application deployment
+    """
+
+    ENVIRONMENT: Environment = Field(
+        description="Deployment environment, e.g. 'development', 'staging' or 'production'",
+        default=Environment.DEVELOPMENT,
+    )
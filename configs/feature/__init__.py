@@ -0,0 +1,453 @@
+from typing import Literal, Optional
+
+from pydantic import Field, NonNegativeInt, PositiveFloat, PositiveInt, SecretStr
+from pydantic_settings import BaseSettings
+
+
+class AuthConfig(BaseSettings):
+    """
+    Configuration for access tokens and authentication caches.
+    """
+
+    JWT_SECRET_KEY: SecretStr = Field(
+        description="Secret key used to sign access tokens",
+    )
+
+    JWT_ALGORITHM: str = Field(
+        description="Algorithm used to sign access tokens",
+        default="HS256",
+    )
+
+    JWT_ACCESS_TOKEN_EXPIRE_DAYS: PositiveInt = Field(
+        description="Number of days an access token stays valid",
+        default=30,
+    )
+
+    AUTH_TOKEN_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of verified tokens cached per worker",
+        default=10000,
+    )
+
+    AUTH_TOKEN_CACHE_TTL: PositiveFloat = Field(
+        description="Seconds a verified token is trusted without checking its signature again",
+        default=300.0,
+    )
+
+    AUTH_ENTITY_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of users and of sessions cached per worker",
+        default=10000,
+    )
+
+    AUTH_ENTITY_CACHE_TTL: PositiveFloat = Field(
+        description="Seconds a cached user or session is used before it is read from the database again",
+        default=30.0,
+    )
+
+
+class PasswordHashingConfig(BaseSettings):
+    """
+    Configuration for password hashing.
+    """
+
+    BCRYPT_ROUNDS: int = Field(
+        description="bcrypt work factor; each increment doubles the hashing time",
+        default=12,
+        ge=4,
+        le=31,
+    )
+
+    PASSWORD_HASH_WORKERS: PositiveInt = Field(
+        description="Threads dedicated to password hashing per worker process",
+        default=2,
+    )
+
+    PASSWORD_HASH_MAX_QUEUE: NonNegativeInt = Field(
+        description="Hashing operations allowed to wait for a thread before requests are rejected",
+        default=32,
+    )
+
+
+class StreamingConfig(BaseSettings):
+    """
+    Configuration for the streaming chat endpoint.
+    """
+
+    CHAT_STREAM_BUFFER_SIZE: PositiveInt = Field(
+        description="Maximum number of generated chunks buffered for a client before generation is paused",
+        default=64,
+    )
+
+    CHAT_STREAM_SEND_TIMEOUT: PositiveFloat = Field(
+        description="Seconds to wait for a slow client to drain the buffer before generation is stopped",
+        default=30.0,
+    )
+
+
+class ChatBatchConfig(BaseSettings):
+    """
+    Configuration for the batch chat endpoint.
+    """
+
+    CHAT_BATCH_MAX_REQUESTS: PositiveInt = Field(
+        description="Maximum number of conversations in one batch request",
+        default=500,
+    )
+
+    CHAT_BATCH_CONCURRENCY: PositiveInt = Field(
+        description="Conversations of a batch run at the same time; LLM calls are further bounded by LLM_MAX_CONCURRENCY",
+        default=8,
+    )
+
+
+class TokenizerConfig(BaseSettings):
+    """
+    Configuration for local token counting used when trimming the prompt.
+    """
+
+    TOKENIZER_ENCODING: str = Field(
+        description="tiktoken encoding used when the model name is unknown to tiktoken",
+        default="o200k_base",
+    )
+
+    TOKENIZER_CACHE_DIR: str = Field(
+        description="Directory holding pre-downloaded tiktoken files so counting works offline; empty for tiktoken's default",
+        default="",
+    )
+
+    TOKEN_COUNT_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of per-message token counts kept in memory",
+        default=10000,
+    )
+
+
+class SummarizationConfig(BaseSettings):
+    """
+    Configuration for the rolling summary replacing older turns in the prompt.
+    """
+
+    SUMMARIZATION_ENABLED: bool = Field(
+        description="Summarize older turns instead of only dropping the ones that do not fit in MAX_TOKENS",
+        default=True,
+    )
+
+    SUMMARIZATION_MODEL: Optional[str] = Field(
+        description="Model writing the summaries, e.g. a smaller one; defaults to LLM_MODEL",
+        default=None,
+    )
+
+    SUMMARIZATION_TRIGGER_TOKENS: PositiveInt = Field(
+        description="Conversation size in tokens from which older turns are summarized",
+        default=1024,
+    )
+
+    SUMMARIZATION_KEEP_TURNS: PositiveInt = Field(
+        description="Most recent turns always sent verbatim",
+        default=2,
+    )
+
+    SUMMARIZATION_REFRESH_TURNS: PositiveInt = Field(
+        description="Turns that must leave the verbatim window before the summary is refreshed",
+        default=4,
+    )
+
+    SUMMARIZATION_MAX_TOKENS: PositiveInt = Field(
+        description="Maximum length of the summary in tokens",
+        default=512,
+    )
+
+
+class ToolConfig(BaseSettings):
+    """
+    Configuration for tool execution in the agent graph.
+    """
+
+    TOOL_MAX_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of tool calls of one request executed at the same time",
+        default=4,
+    )
+
+    TOOL_CALL_TIMEOUT: PositiveFloat = Field(
+        description="Seconds a single tool call may run before it is reported as failed",
+        default=30.0,
+    )
+
+    TOOL_CACHE_ENABLED: bool = Field(
+        description="Cache results of tools declaring metadata={'idempotent': True}",
+        default=False,
+    )
+
+    TOOL_CACHE_TTL: PositiveFloat = Field(
+        description="Seconds a cached tool result stays valid",
+        default=300.0,
+    )
+
+    TOOL_CACHE_MAX_ENTRIES: PositiveInt = Field(
+        description="Maximum number of tool results kept in the in-process cache",
+        default=1024,
+    )
+
+    TOOL_CACHE_SHARED: bool = Field(
+        description="Also share cached tool results across workers through PostgreSQL",
+        default=False,
+    )
+
+
+class LLMCacheConfig(BaseSettings):
+    """
+    Configuration for the exact-match LLM response cache.
+    """
+
+    LLM_CACHE_ENABLED: bool = Field(
+        description="Cache LLM responses for identical prompts when the temperature is 0",
+        default=False,
+    )
+
+    LLM_CACHE_TTL: PositiveFloat = Field(
+        description="Seconds a cached LLM response stays valid",
+        default=3600.0,
+    )
+
+    LLM_CACHE_MAX_ENTRIES: PositiveInt = Field(
+        description="Maximum number of LLM responses kept in the in-process cache",
+        default=512,
+    )
+
+    LLM_CACHE_SHARED: bool = Field(
+        description="Also share cached LLM responses across workers through PostgreSQL",
+        default=False,
+    )
+
+
+class LLMCoalescingConfig(BaseSettings):
+    """
+    Configuration for coalescing identical concurrent LLM calls.
+    """
+
+    LLM_COALESCING_ENABLED: bool = Field(
+        description="Share one upstream LLM call between concurrent calls with the same prompt and parameters",
+        default=True,
+    )
+
+
+class LLMResilienceConfig(BaseSettings):
+    """
+    Configuration for retries, circuit breaking and hedging of upstream LLM calls.
+    """
+
+    LLM_MAX_ATTEMPTS: PositiveInt = Field(
+        description="Attempts per LLM call, the first one included; transient errors are retried",
+        default=3,
+    )
+
+    LLM_BACKOFF_BASE: PositiveFloat = Field(
+        description="Backoff ceiling in seconds before the first retry, doubled on every further retry",
+        default=0.5,
+    )
+
+    LLM_BACKOFF_MAX: PositiveFloat = Field(
+        description="Maximum backoff between two attempts, in seconds",
+        default=8.0,
+    )
+
+    LLM_CIRCUIT_FAILURE_THRESHOLD: PositiveInt = Field(
+        description="Consecutive transient failures after which LLM calls fail fast",
+        default=5,
+    )
+
+    LLM_CIRCUIT_RESET_TIMEOUT: PositiveFloat = Field(
+        description="Seconds LLM calls fail fast before a probe call is let through",
+        default=30.0,
+    )
+
+    LLM_HEDGE_ENABLED: bool = Field(
+        description="Start a second attempt when an LLM call is slow to produce its first token",
+        default=False,
+    )
+
+    LLM_HEDGE_QUANTILE: float = Field(
+        description="Quantile of recent times to first token after which a call is hedged",
+        default=0.95,
+        gt=0,
+        lt=1,
+    )
+
+    LLM_HEDGE_MIN_SAMPLES: PositiveInt = Field(
+        description="Calls observed before hedging starts",
+        default=50,
+    )
+
+
+class LLMAdmissionConfig(BaseSettings):
+    """
+    Configuration for admission control of LLM calls.
+    """
+
+    LLM_ADMISSION_ENABLED: bool = Field(
+        description="Apply per-user rate limits and a concurrency cap to LLM calls",
+        default=True,
+    )
+
+    LLM_USER_REQUESTS_PER_MINUTE: PositiveFloat = Field(
+        description="Chat requests a user may make per minute, sustained",
+        default=20.0,
+    )
+
+    LLM_USER_BURST: PositiveInt = Field(
+        description="Chat requests a user may make at once after being idle",
+        default=10,
+    )
+
+    LLM_MAX_CONCURRENCY: PositiveInt = Field(
+        description="LLM calls in flight per worker, or per deployment with LLM_ADMISSION_SHARED",
+        default=32,
+    )
+
+    LLM_MAX_QUEUE: NonNegativeInt = Field(
+        description="LLM calls allowed to wait for a free slot before requests are rejected with 429",
+        default=64,
+    )
+
+    LLM_QUEUE_TIMEOUT: PositiveFloat = Field(
+        description="Seconds an LLM call may wait for a free slot",
+        default=30.0,
+    )
+
+    LLM_ADMISSION_SHARED: bool = Field(
+        description="Enforce the user rates and the concurrency cap across workers through PostgreSQL",
+        default=False,
+    )
+
+    LLM_ADMISSION_LEASE_TTL: PositiveFloat = Field(
+        description="Seconds after which the slot of a crashed worker is released in shared mode",
+        default=300.0,
+    )
+
+
+class LoggingConfig(BaseSettings):
+    """
+    Configuration for the logging pipeline.
+    """
+
+    LOG_LEVEL: Optional[Literal["DEBUG", "INFO", "WARNING", "ERROR"]] = Field(
+        description="Root log level; defaults to DEBUG in development, WARNING in test and INFO otherwise",
+        default=None,
+    )
+
+    LOG_FORMAT: Literal["json", "text"] = Field(
+        description="Output format: one JSON object per line, or human-readable text with key=value fields",
+        default="json",
+    )
+
+    LOG_FILE: str = Field(
+        description="Path of the rotating log file, empty to log to the console only",
+        default="app.log",
+    )
+
+    LOG_FILE_MAX_BYTES: PositiveInt = Field(
+        description="Size at which the log file is rotated",
+        default=10 * 1024 * 1024,
+    )
+
+    LOG_FILE_BACKUP_COUNT: NonNegativeInt = Field(
+        description="Number of rotated log files kept",
+        default=5,
+    )
+
+    LOG_QUEUE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of records waiting to be written, 0 for unbounded",
+        default=10000,
+    )
+
+    LOG_SAMPLE_RATES: dict[str, float] = Field(
+        description="Fraction of INFO/DEBUG records kept for high-volume events, by event name, "
+        'e.g. {"health_check_called": 0.01}',
+        default={"health_check_called": 0.01},
+    )
+
+
+class MetricsConfig(BaseSettings):
+    """
+    Configuration for Prometheus metrics.
+    """
+
+    METRICS_ENABLED: bool = Field(
+        description="Collect metrics and expose them on /metrics",
+        default=True,
+    )
+
+    METRICS_POOL_SAMPLE_INTERVAL: PositiveFloat = Field(
+        description="Seconds between two samples of the database pool statistics",
+        default=5.0,
+    )
+
+    GRAPH_PROFILE_HEADER_ENABLED: bool = Field(
+        description="Add the graph run profile (LLM, tools, checkpoint time) to chat responses "
+        "as a Server-Timing header, for debugging",
+        default=False,
+    )
+
+
+class CheckpointRetentionConfig(BaseSettings):
+    """
+    Configuration for pruning the Postgres checkpointer tables.
+    """
+
+    CHECKPOINT_RETENTION_ENABLED: bool = Field(
+        description="Periodically delete old checkpoints, expired threads and threads of deleted sessions",
+        default=True,
+    )
+
+    CHECKPOINT_RETENTION_INTERVAL: PositiveFloat = Field(
+        description="Seconds between two retention passes",
+        default=3600.0,
+    )
+
+    CHECKPOINT_RETENTION_KEEP_LAST: PositiveInt = Field(
+        description="Checkpoints kept per conversation thread; older ones are deleted",
+        default=10,
+    )
+
+    CHECKPOINT_RETENTION_MAX_AGE_DAYS: NonNegativeInt = Field(
+        description="Delete conversation threads idle for more than this many days, 0 to keep them",
+        default=0,
+    )
+
+    CHECKPOINT_RETENTION_DELETE_ORPHANS: bool = Field(
+        description="Delete conversation threads whose chat session no longer exists",
+        default=True,
+    )
+
+    CHECKPOINT_RETENTION_BATCH_SIZE: PositiveInt = Field(
+        description="Threads pruned per transaction",
+        default=100,
+    )
+
+    CHECKPOINT_RETENTION_BATCH_PAUSE: float = Field(
+        description="Seconds to pause between two batches, to spread the load",
+        default=0.05,
+        ge=0,
+    )
+
+    CHECKPOINT_RETENTION_LOCK_TIMEOUT_MS: PositiveInt = Field(
+        description="Milliseconds a batch waits for a row lock before it is skipped until the next pass",
+        default=1000,
+    )
+
+
+class FeatureConfig(
+    AuthConfig,
+    ChatBatchConfig,
+    CheckpointRetentionConfig,
+    LoggingConfig,
+    PasswordHashingConfig,
+    StreamingConfig,
+    SummarizationConfig,
+    TokenizerConfig,
+    ToolConfig,
+    LLMCacheConfig,
+    LLMCoalescingConfig,
+    LLMAdmissionConfig,
+    LLMResilienceConfig,
+    MetricsConfig,
+):
+    pass
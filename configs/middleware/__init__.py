@@ -1,5 +1,7 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field, NonNegativeInt, SecretStr, HttpUrl
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveFloat, PositiveInt, SecretStr, HttpUrl
 
 
 class DatabaseConfig(BaseSettings):
@@ -19,6 +21,68 @@ class DatabaseConfig(BaseSettings):
         default=10
     )
 
+    DATABASE_ASYNC_MODE: bool = Field(
+        description="Use an asyncio engine (psycopg / aiosqlite drivers) and request-scoped AsyncSession",
+        default=True,
+    )
+
+    DATABASE_POOL_TIMEOUT: PositiveFloat = Field(
+        description="Seconds to wait for a pooled connection before giving up",
+        default=30,
+    )
+
+    DATABASE_POOL_RECYCLE: PositiveInt = Field(
+        description="Recycle pooled connections after this many seconds",
+        default=1800,
+    )
+
+class PsycopgPoolConfig(BaseSettings):
+    """
+    Configuration for the shared psycopg connection pool used by the
+    LangGraph checkpointer and raw SQL queries.
+    """
+
+    PSYCOPG_POOL_MIN_SIZE: NonNegativeInt = Field(
+        description="Connections opened and kept warm at startup",
+        default=2,
+    )
+
+    PSYCOPG_POOL_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of connections held by the pool per worker",
+        default=10,
+    )
+
+    PSYCOPG_POOL_TIMEOUT: PositiveFloat = Field(
+        description="Seconds a client waits for a connection before failing",
+        default=30,
+    )
+
+    PSYCOPG_POOL_MAX_IDLE: PositiveFloat = Field(
+        description="Seconds an idle connection above the minimum size is kept open",
+        default=600,
+    )
+
+    PSYCOPG_POOL_OPEN_TIMEOUT: PositiveFloat = Field(
+        description="Seconds to wait at startup for the minimum number of connections",
+        default=10,
+    )
+
+    PSYCOPG_SETUP_LOCK_TIMEOUT_MS: PositiveInt = Field(
+        description="Milliseconds a worker waits at startup for another one to finish the schema migrations",
+        default=60000,
+    )
+
+class LLMEndpointConfig(BaseModel):
+    """
+    One OpenAI-compatible backend of the LLM pool.
+    Unset fields fall back to LLM_BASE_URL, LLM_API_KEY and LLM_MODEL.
+    """
+
+    name: str = Field(description="Name of the endpoint in logs and metrics")
+    base_url: Optional[HttpUrl] = Field(default=None, description="Base URL of the endpoint's HTTP API")
+    api_key: Optional[SecretStr] = Field(default=None, description="API key for the endpoint")
+    model: Optional[str] = Field(default=None, description="Model name served by the endpoint")
+
 class LLMConfig(BaseSettings):
     """
     Configuration for the language model client.
@@ -53,9 +117,21 @@ class LLMConfig(BaseSettings):
         description="Maximum number of tokens to generate per call",
         ge=0
     )
+    LLM_ENDPOINTS: list[LLMEndpointConfig] = Field(
+        default_factory=list,
+        description="JSON list of backends to spread LLM calls over, e.g. "
+        '[{"name": "a", "base_url": "..."}, {"name": "b", "api_key": "..."}]; '
+        "empty to use LLM_BASE_URL and LLM_API_KEY only",
+    )
+    LLM_ROUTING_STRATEGY: Literal["least_outstanding", "ewma"] = Field(
+        "ewma",
+        description="How a backend is picked: fewest calls in flight, or lowest recent time to "
+        "first token weighted by the calls in flight",
+    )
 
 class MiddlewareConfig(
     DatabaseConfig,
+    PsycopgPoolConfig,
     LLMConfig    
 ):
     pass
\ No newline at end of file
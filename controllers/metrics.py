@@ -0,0 +1,16 @@
+# controllers/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from core import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose the Prometheus metrics of every worker."""
+
+    payload, content_type = metrics.render_latest()
+    return Response(content=payload, media_type=content_type)
@@ -5,15 +5,20 @@ endpoints like authentication and chatbot functionality.
 """
 
 
-import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from extensions import ext_db_pool
+from libs.logger import get_logger
+from .auth import router as auth_router
 from .chatbot import router as chatbot_router
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 api_router = APIRouter()
 
 # include routers
+api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
 api_router.include_router(chatbot_router, prefix="/chatbot", tags=["chatbot"])
 
 @api_router.get("/health")
@@ -27,5 +32,22 @@ async def health_check():
     logger.info("health_check_called")
     return {
         "status": "healthy",
-        "version": "1.0.0"    
-    }
\ No newline at end of file
+        "version": "1.0.0",
+        "database_pool": ext_db_pool.get_pool_stats(),
+    }
+
+@api_router.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness check endpoint.
+
+    Reports ready only once the agent graph has been compiled and the
+    checkpointer schema is set up, so traffic is not routed to a cold worker.
+
+    Returns:
+        JSONResponse: Readiness status, 503 while the worker is not ready.
+    """
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None or not agent.is_ready:
+        return JSONResponse(status_code=503, content={"status": "not_ready"})
+
+    return {"status": "ready"}
@@ -1,20 +1,46 @@
-import logging
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from extensions.ext_database import get_db_session
+from libs.logger import get_logger
+from libs.password import PasswordHasherBusyError
+from libs.sanitization import sanitize_email, validate_password_strength
+from libs.token import create_access_token
 from models.account import User
+from models.session import Session
+from schemas.auth import SessionResponse, Token, UserCreate, UserLogin, UserResponse
+from services.account_service import AccountService
+from services.auth_service import AuthService
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 router = APIRouter()
 security = HTTPBearer()
 
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=401,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)        
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db_session),
 ) -> User:
     """Get the current user ID from the token.
     
+    Tokens, users and sessions are resolved through the AuthService caches, so
+    repeat requests with the same token skip both the signature check and the
+    database lookup.
+
     Args:
         credentials: The HTTP authorization credentials containing the JWT token.
+        db: The database session, only used on a cache miss.
 
     Returns:
         User: The user extracted from the token.
@@ -22,11 +48,48 @@ async def get_current_user(
     Raises:
         HTTPException: If the token is invalid or missing.
     """
+    user_id = await AuthService.resolve_token(db, credentials.credentials, "user")
+    if user_id is None or not user_id.isdigit():
+        raise _unauthorized("Invalid authentication credentials")
+
+    user = await AuthService.get_user(db, int(user_id))
+    if user is None:
+        raise _unauthorized("User not found")
+    return user
+
+
+async def get_current_session(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db_session),
+) -> Session:
+    """Get the current session from the token.
+
+    Args:
+        credentials: The HTTP authorization credentials containing the JWT token.
+        db: The database session, only used on a cache miss.
+
+    Returns:
+        Session: The chat session extracted from the token.
+
+    Raises:
+        HTTPException: If the token is invalid or the session does not exist.
+    """
+    session_id = await AuthService.resolve_token(db, credentials.credentials, "session")
+    if session_id is None:
+        raise _unauthorized("Invalid authentication credentials")
+
+    session = await AuthService.get_session(db, session_id)
+    if session is None:
+        raise _unauthorized("Session not found")
+    return session
 
-    pass
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(request: Request, user_data: UserCreate):
+async def register_user(
+    request: Request,
+    user_data: UserCreate,
+    db: AsyncSession = Depends(get_db_session),
+):
     try:
         # Sanitize email 
         sanitized_email = sanitize_email(user_data.email)
@@ -36,17 +99,83 @@ async def register_user(request: Request, user_data: UserCreate):
         validate_password_strength(password)
 
         # Check if user exists
-        if await user_service.get_user_by_email(sanitized_email):
+        if await AccountService.get_user_by_email(db, sanitized_email):
             raise HTTPException(status_code=400, detail="Email already registered.")
         
         # Create user
-        user = await user_service.create_user(email=sanitized_email, password=User.hash_password(password))
+        # bcrypt runs in the hashing pool so the event loop keeps serving other requests
+        hashed_password = await User.ahash_password(password)
+        user = await AccountService.create_user(db, email=sanitized_email, password=hashed_password)
 
         # Create access token
-        token = create_access_token(str(user.id))
+        token = create_access_token(str(user.id), "user")
 
         return UserResponse(id=user.id, email=user.email, token=token)
     
+    except PasswordHasherBusyError as e:
+        logger.warning("password_hasher_busy", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent requests, please retry.",
+            headers={"Retry-After": "1"},
+        )
+
     except ValueError as ve:
         logger.error("user_registration_validation_failed", error=str(ve), exc_info=True)
-        raise HTTPException(status_code=422, detail=str(ve))
\ No newline at end of file
+        raise HTTPException(status_code=422, detail=str(ve))
+
+
+@router.post("/login", response_model=Token)
+async def login(
+    user_data: UserLogin,
+    db: AsyncSession = Depends(get_db_session),
+):
+    try:
+        user = await AccountService.get_user_by_email(db, sanitize_email(user_data.email))
+        if user is None or not await user.averify_password(user_data.password.get_secret_value()):
+            raise _unauthorized("Incorrect email or password")
+    except PasswordHasherBusyError as e:
+        logger.warning("password_hasher_busy", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent requests, please retry.",
+            headers={"Retry-After": "1"},
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+    return create_access_token(str(user.id), "user")
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    await AuthService.revoke_token(db, credentials.credentials)
+
+
+@router.post("/session", response_model=SessionResponse)
+async def create_session(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    session = await AccountService.create_session(db, session_id=str(uuid.uuid4()), user_id=user.id)
+    token = create_access_token(session.id, "session")
+    return SessionResponse(session_id=session.id, name=session.name, token=token)
+
+
+@router.delete("/session/{session_id}", status_code=204)
+async def delete_session(
+    session_id: str,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session),
+):
+    session = await AuthService.get_session(db, session_id)
+    if session is None or session.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    await AccountService.delete_session(db, session_id)
+    # Tokens of the deleted session stop resolving on this worker right away
+    AuthService.invalidate_session(session_id)
@@ -1,41 +1,114 @@
 """Chatbot API endpoints for handling chat interactions.
 
 This module provides endpoints for chat interactions, including regular chat,
-streaming chat, message history management, and chat history clearing.
+streaming chat, batch chat, message history management, and chat history clearing.
 """
-import logging
-from fastapi import Depends, HTTPException, Request
-from fastapi.routing import APIRoute
+import math
+from typing import TYPE_CHECKING
 
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from configs import config
+from controllers.v1.auth import get_current_session
+from core.admission import AdmissionRejectedError, llm_admission
+from core.agent import profiling
+from extensions.ext_agent import get_agent
+from libs.circuit_breaker import CircuitOpenError
+from libs.logger import get_logger
+from libs.streaming import SlowConsumerError, bounded_stream
 from models.session import Session
+from schemas.chat import BatchChatRequest, BatchChatResult, ChatRequest, ChatResponse, StreamResponse
+
+if TYPE_CHECKING:
+    # Only for annotations: the agent stack is imported when the lifespan builds the agent
+    from core.agent.graph_agent_base import BaseGraphAgent
+
+logger = get_logger(__name__)
+
+
+router = APIRouter()
+
+def check_history_mode(chat_request: ChatRequest, agent: "BaseGraphAgent"):
+    """Reject delta requests when the agent cannot rebuild the history itself.
+
+    Raises:
+        HTTPException: 400 if the request is a delta but no checkpointer is configured.
+    """
+    if chat_request.history_mode == "delta" and agent.is_ready and not agent.keeps_history:
+        raise HTTPException(
+            status_code=400,
+            detail="Delta history mode is unavailable: conversation history is not persisted.",
+        )
+
+def too_many_requests(error: AdmissionRejectedError) -> HTTPException:
+    """Build the 429 response telling the client when to retry."""
+
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please retry later.",
+        headers={"Retry-After": error.retry_after_header},
+    )
 
-from core.agent.graph_agent_base import LangGraphAgent
+async def admit_chat_request(session: Session = Depends(get_current_session)) -> Session:
+    """Charge the request to its user's LLM budget before any work is done.
 
-logger = logging.getLogger(__name__)
+    Raises:
+        HTTPException: 429 with ``Retry-After`` if the user is over their rate
+            or the LLM call queue is full.
+    """
+    try:
+        await llm_admission.admit_request(session.user_id)
+    except AdmissionRejectedError as e:
+        logger.warning("chat_request_rejected", session_id=session.id, reason=e.reason, retry_after=e.retry_after)
+        raise too_many_requests(e)
+    return session
 
+def wants_fresh_response(request: Request) -> bool:
+    """Whether the client asked to skip cached LLM responses (``Cache-Control: no-cache``)."""
 
-router = APIRoute
-agent = LangGraphAgent()
+    return "no-cache" in request.headers.get("cache-control", "").lower()
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: Request,
+    response: Response,
     chat_request: ChatRequest,
-    session: Session = Depends(get_current_session)    
+    session: Session = Depends(admit_chat_request),
+    agent: "BaseGraphAgent" = Depends(get_agent),
 ):
+    check_history_mode(chat_request, agent)
     try:
         logger.info(
             "chat_request_received",
             session_id=session.id,
             message_count=len(chat_request.messages),    
+            history_mode=chat_request.history_mode,
         )
-        result = await agent.get_response(
-            chat_request.messages, session.id, user_id=session.user_id
-        )
+        with profiling.capture_trace() as trace:
+            result = await agent.get_response(
+                chat_request.messages,
+                session.id,
+                user_id=session.user_id,
+                history_mode=chat_request.history_mode,
+                bypass_cache=wants_fresh_response(request),
+            )
 
         logger.info("chat_request_processed", session_id=session.id)
+        if config.GRAPH_PROFILE_HEADER_ENABLED:
+            response.headers.append("Server-Timing", trace.server_timing())
 
         return ChatResponse(messages=result)
+    except AdmissionRejectedError as e:
+        logger.warning("chat_request_rejected", session_id=session.id, reason=e.reason, retry_after=e.retry_after)
+        raise too_many_requests(e)
+    except CircuitOpenError as e:
+        logger.warning("chat_request_failed_fast", session_id=session.id, error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="The language model is unavailable, please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
     except Exception as e:
         logger.error("chat_request_failed", session_id=session.id, error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -44,10 +117,62 @@ async def chat(
 async def chat_stream(
     request: Request,
     chat_request: ChatRequest,
-    session: Session = Depends(get_current_session) 
+    session: Session = Depends(admit_chat_request),
+    agent: "BaseGraphAgent" = Depends(get_agent),
 ):
+    check_history_mode(chat_request, agent)
     try:
-        pass
+        logger.info(
+            "stream_chat_request_received",
+            session_id=session.id,
+            message_count=len(chat_request.messages),
+            history_mode=chat_request.history_mode,
+        )
+
+        async def event_generator():
+            """Generate SSE frames from the agent's token stream.
+
+            Tokens are relayed through a bounded buffer: if the client stops reading,
+            the buffer fills up and the generation is stopped; if the client disconnects,
+            closing this generator cancels the graph run.
+            """
+            tokens = bounded_stream(
+                agent.get_stream_response(
+                    chat_request.messages,
+                    session.id,
+                    user_id=session.user_id,
+                    history_mode=chat_request.history_mode,
+                    bypass_cache=wants_fresh_response(request),
+                ),
+                maxsize=config.CHAT_STREAM_BUFFER_SIZE,
+                send_timeout=config.CHAT_STREAM_SEND_TIMEOUT,
+            )
+            try:
+                async for chunk in tokens:
+                    response = StreamResponse(content=chunk, done=False)
+                    yield f"data: {response.model_dump_json()}\n\n"
+
+                # Send final message indicating completion
+                final_response = StreamResponse(content="", done=True)
+                yield f"data: {final_response.model_dump_json()}\n\n"
+
+            except SlowConsumerError as e:
+                logger.warning("stream_chat_client_too_slow", session_id=session.id, error=str(e))
+
+            except Exception as e:
+                logger.error(
+                    "stream_chat_request_failed",
+                    session_id=session.id,
+                    error=str(e),
+                    exc_info=True,
+                )
+                error_response = StreamResponse(content=str(e), done=True)
+                yield f"data: {error_response.model_dump_json()}\n\n"
+
+            finally:
+                await tokens.aclose()
+
+        return StreamingResponse(event_generator(), media_type="text/event-stream")
 
     except Exception as e:
         logger.error(
@@ -57,3 +182,85 @@ async def chat_stream(
             exc_info=True,
         )
         raise HTTPException(status_code=500, detail=str(e))
+
+def batch_error_status(error: Exception) -> int:
+    """HTTP status the chat endpoint would have answered a failed conversation with."""
+
+    if isinstance(error, AdmissionRejectedError):
+        return 429
+    if isinstance(error, CircuitOpenError):
+        return 503
+    return 500
+
+@router.post("/chat/batch")
+async def chat_batch(
+    request: Request,
+    batch_request: BatchChatRequest,
+    session: Session = Depends(get_current_session),
+    agent: "BaseGraphAgent" = Depends(get_agent),
+):
+    """Answer many independent conversations, streaming results as NDJSON.
+
+    Each line is a ``BatchChatResult``, sent as soon as its conversation is
+    answered, so lines come in completion order and carry the index of their
+    conversation. A failed conversation gets an error line instead of failing
+    the batch. Every conversation is charged to the user's rate like a chat
+    request, the batch being paced once the user's bucket is empty; its LLM
+    calls share the worker's LLM concurrency limit with chat requests.
+    """
+    if len(batch_request.requests) > config.CHAT_BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch holds at most {config.CHAT_BATCH_MAX_REQUESTS} conversations.",
+        )
+    logger.info("batch_chat_request_received", session_id=session.id, request_count=len(batch_request.requests))
+
+    async def result_lines():
+        results = agent.get_batch_responses(
+            batch_request.requests,
+            session.id,
+            user_id=session.user_id,
+            bypass_cache=wants_fresh_response(request),
+        )
+        failed = 0
+        try:
+            async for index, result in results:
+                if isinstance(result, Exception):
+                    failed += 1
+                    status = batch_error_status(result)
+                    logger.warning(
+                        "batch_chat_item_failed",
+                        session_id=session.id,
+                        index=index,
+                        status=status,
+                        error=str(result),
+                        exc_info=result if status == 500 else None,
+                    )
+                    line = BatchChatResult(index=index, status=status, error=str(result))
+                else:
+                    line = BatchChatResult(index=index, status=200, messages=result)
+                yield line.model_dump_json(exclude_none=True) + "\n"
+        finally:
+            # Cancels the conversations still running if the client went away
+            await results.aclose()
+            logger.info("batch_chat_request_processed", session_id=session.id, failed=failed)
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+@router.get("/messages", response_model=ChatResponse)
+async def get_session_messages(
+    request: Request,
+    session: Session = Depends(get_current_session),
+    agent: "BaseGraphAgent" = Depends(get_agent),
+):
+    """Get the conversation stored for the session.
+
+    Clients using the delta protocol call this to rebuild their view of the
+    conversation instead of keeping (and resending) it themselves.
+    """
+    try:
+        messages = await agent.get_chat_history(session.id)
+        return ChatResponse(messages=messages)
+    except Exception as e:
+        logger.error("get_messages_failed", session_id=session.id, error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,385 @@
+"""Admission control for LLM calls.
+
+Two limits protect the upstream LLM quota:
+
+* a token bucket per user, refilled at ``LLM_USER_REQUESTS_PER_MINUTE`` with
+  bursts of up to ``LLM_USER_BURST`` requests, charged once per chat request;
+* a cap of ``LLM_MAX_CONCURRENCY`` LLM calls in flight. Calls beyond it wait in
+  a FIFO queue of at most ``LLM_MAX_QUEUE`` entries for ``LLM_QUEUE_TIMEOUT``
+  seconds.
+
+Requests over a limit fail fast with ``AdmissionRejectedError``, carrying the
+delay after which a retry may succeed, instead of piling up.
+
+Both limits are per worker by default. With ``LLM_ADMISSION_SHARED`` they are
+enforced across all workers through PostgreSQL: buckets live in a table updated
+with a single atomic statement, and in-flight calls hold leases in another one.
+If PostgreSQL is unavailable the per-worker limits apply, so the limiter never
+fails a call by itself.
+"""
+
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from psycopg import AsyncConnection
+
+from configs import config
+from core.metrics import (
+    llm_admission_in_flight,
+    llm_admission_queue_length,
+    llm_admission_rejections_total,
+    llm_admission_wait_seconds,
+)
+from extensions import ext_db_pool
+from libs.cache import MISSING, LRUTTLCache
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+RATE_LIMIT_TABLE = "llm_rate_limit"
+LEASE_TABLE = "llm_admission_lease"
+
+# Serializes lease acquisition across workers, held for one short transaction
+ADMISSION_LOCK_ID = 7_291_530_120
+
+# Seconds between two attempts to get a lease while waiting in shared mode
+LEASE_POLL_INTERVAL = 0.05
+
+_TAKE_SHARED_TOKEN = f"""
+INSERT INTO {RATE_LIMIT_TABLE} AS b (key, tokens, updated_at)
+VALUES (%(key)s, %(burst)s - 1, now())
+ON CONFLICT (key) DO UPDATE SET
+    tokens = least(%(burst)s, b.tokens + extract(epoch FROM now() - b.updated_at) * %(rate)s) - 1,
+    updated_at = now()
+WHERE least(%(burst)s, b.tokens + extract(epoch FROM now() - b.updated_at) * %(rate)s) >= 1
+RETURNING tokens
+"""
+
+_READ_SHARED_TOKENS = f"""
+SELECT least(%(burst)s, tokens + extract(epoch FROM now() - updated_at) * %(rate)s) AS tokens
+FROM {RATE_LIMIT_TABLE} WHERE key = %(key)s
+"""
+
+_TAKE_LEASE = f"""
+INSERT INTO {LEASE_TABLE} (id, expires_at)
+SELECT %(id)s, now() + make_interval(secs => %(ttl)s)
+WHERE (SELECT count(*) FROM {LEASE_TABLE} WHERE expires_at > now()) < %(limit)s
+"""
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when an LLM call is over a user or capacity limit.
+
+    Attributes:
+        reason: Which limit was hit: "user_rate", "queue_full" or "queue_timeout".
+        retry_after: Seconds after which a retry may be admitted.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM call rejected ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """The delay as a ``Retry-After`` header value (whole seconds, at least 1)."""
+
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Tokens left in a user's bucket, refilled lazily when it is read."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+        self.updated = time.monotonic()
+
+    def take(self, rate: float, burst: float) -> float:
+        """Take a token.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class LLMAdmission:
+    """Per-user rate limits and a bounded concurrency queue for LLM calls.
+
+    Not thread-safe; meant to be used from the worker's event loop.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        burst: int,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        shared: bool = False,
+        lease_ttl: float = 300.0,
+        max_users: int = 100_000,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            requests_per_minute: Sustained chat requests allowed per user.
+            burst: Requests a user may make at once after being idle.
+            max_concurrency: LLM calls allowed in flight.
+            max_queue: LLM calls allowed to wait for a free slot.
+            queue_timeout: Seconds a call may wait for a slot.
+            shared: Enforce the limits across workers through PostgreSQL.
+            lease_ttl: Seconds after which a lease of a crashed worker expires.
+            max_users: Buckets kept in memory; evicted users start with a full bucket.
+        """
+        self.rate = requests_per_minute / 60
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.shared = shared
+        self.lease_ttl = lease_ttl
+        # A bucket untouched for burst / rate seconds is full again, like a new one
+        self._buckets: LRUTTLCache[str, TokenBucket] = LRUTTLCache(max_entries=max_users, ttl=burst / self.rate)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._waiting = 0
+        # Moving average of how long a slot is held, to estimate Retry-After
+        self._hold_time = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return config.LLM_ADMISSION_ENABLED
+
+    def _use_shared(self) -> bool:
+        return self.shared and ext_db_pool.db_pool is not None
+
+    async def setup(self, conn: AsyncConnection) -> None:
+        """Create the tables of the shared mode; a no-op otherwise.
+
+        Args:
+            conn: The connection to run the statements on.
+        """
+        if not self._use_shared():
+            return
+
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {RATE_LIMIT_TABLE} (
+                key TEXT PRIMARY KEY,
+                tokens DOUBLE PRECISION NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL
+            )
+            """
+        )
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {LEASE_TABLE} (
+                id UUID PRIMARY KEY,
+                expires_at TIMESTAMPTZ NOT NULL
+            )
+            """
+        )
+        await conn.execute(f"DELETE FROM {LEASE_TABLE} WHERE expires_at < now()")
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejectedError:
+        llm_admission_rejections_total.labels(reason=reason).inc()
+        return AdmissionRejectedError(reason, retry_after)
+
+    def _queue_retry_after(self) -> float:
+        # Time for the calls ahead to drain through the available slots
+        return self._hold_time * (self._waiting + 1) / self.max_concurrency
+
+    async def admit_request(self, user_id: object) -> None:
+        """Charge a chat request to the user's bucket and check the queue has room.
+
+        Called by the chat routes before running the graph, so that requests
+        which would be rejected anyway fail before any work is done.
+
+        Raises:
+            AdmissionRejectedError: If the user is over their rate or the queue is full.
+        """
+        if not self.enabled:
+            return
+
+        if self._waiting >= self.max_queue:
+            raise self._reject("queue_full", self._queue_retry_after())
+
+        key = str(user_id)
+        retry_after = None
+        if self._use_shared():
+            retry_after = await self._take_shared_token(key)
+        if retry_after is None:
+            bucket = self._buckets.get(key)
+            if bucket is MISSING:
+                bucket = TokenBucket(self.burst)
+            retry_after = bucket.take(self.rate, self.burst)
+            self._buckets.set(key, bucket)
+        if retry_after:
+            raise self._reject("user_rate", retry_after)
+
+    async def _take_shared_token(self, key: str) -> Optional[float]:
+        """Take a token from the user's shared bucket.
+
+        Returns:
+            Optional[float]: 0 if a token was taken, the seconds until one is
+            available, or None if PostgreSQL could not be reached.
+        """
+        params = {"key": key, "rate": self.rate, "burst": self.burst}
+        try:
+            async with ext_db_pool.db_pool.connection() as conn:
+                cursor = await conn.execute(_TAKE_SHARED_TOKEN, params)
+                if await cursor.fetchone() is not None:
+                    return 0.0
+                cursor = await conn.execute(_READ_SHARED_TOKENS, params)
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning("shared_rate_limit_failed", error=str(e))
+            return None
+        tokens = row["tokens"] if row is not None else 0.0
+        return max((1 - tokens) / self.rate, 0.001)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the LLM call slots for the duration of the block.
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or no slot freed up in time.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        lease_id = await self._acquire_shared() if self._use_shared() else None
+        if lease_id is None:
+            await self._acquire_local()
+        llm_admission_wait_seconds.observe(time.perf_counter() - started)
+
+        llm_admission_in_flight.inc()
+        held_since = time.perf_counter()
+        try:
+            yield
+        finally:
+            llm_admission_in_flight.dec()
+            self._hold_time = 0.9 * self._hold_time + 0.1 * (time.perf_counter() - held_since)
+            if lease_id is None:
+                self._release_local()
+            else:
+                await self._release_shared(lease_id)
+
+    async def _acquire_local(self) -> None:
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+
+        if self._waiting >= self.max_queue:
+            raise self._reject("queue_full", self._queue_retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._waiting += 1
+        llm_admission_queue_length.inc()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout", self._queue_retry_after())
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller went away; pass it on
+                self._release_local()
+            raise
+        finally:
+            self._waiting -= 1
+            llm_admission_queue_length.dec()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release_local(self) -> None:
+        # Hand the slot to the oldest live waiter, or free it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def _acquire_shared(self) -> Optional[uuid.UUID]:
+        """Get a lease on one of the deployment's slots, waiting in the queue if needed.
+
+        Returns:
+            Optional[uuid.UUID]: The lease, or None if PostgreSQL could not be
+            reached and the per-worker slots apply instead.
+        """
+        lease_id = uuid.uuid4()
+        taken = await self._take_lease(lease_id)
+        if taken is None:
+            return None
+        if taken:
+            return lease_id
+
+        if self._waiting >= self.max_queue:
+            raise self._reject("queue_full", self._queue_retry_after())
+
+        self._waiting += 1
+        llm_admission_queue_length.inc()
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                # Jittered, so workers waiting at the same time do not poll in lockstep
+                await asyncio.sleep(LEASE_POLL_INTERVAL * random.uniform(0.5, 1.5))
+                taken = await self._take_lease(lease_id)
+                if taken is None:
+                    return None
+                if taken:
+                    return lease_id
+            raise self._reject("queue_timeout", self._queue_retry_after())
+        finally:
+            self._waiting -= 1
+            llm_admission_queue_length.dec()
+
+    async def _take_lease(self, lease_id: uuid.UUID) -> Optional[bool]:
+        try:
+            async with ext_db_pool.db_pool.connection() as conn:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock(%s)", (ADMISSION_LOCK_ID,))
+                    cursor = await conn.execute(
+                        _TAKE_LEASE, {"id": lease_id, "ttl": self.lease_ttl, "limit": self.max_concurrency}
+                    )
+                    return cursor.rowcount == 1
+        except Exception as e:
+            logger.warning("shared_admission_failed", error=str(e))
+            return None
+
+    async def _release_shared(self, lease_id: uuid.UUID) -> None:
+        try:
+            async with ext_db_pool.db_pool.connection() as conn:
+                await conn.execute(f"DELETE FROM {LEASE_TABLE} WHERE id = %s", (lease_id,))
+        except Exception as e:
+            # The lease expires after lease_ttl seconds
+            logger.warning("shared_admission_release_failed", error=str(e))
+
+
+llm_admission = LLMAdmission(
+    requests_per_minute=config.LLM_USER_REQUESTS_PER_MINUTE,
+    burst=config.LLM_USER_BURST,
+    max_concurrency=config.LLM_MAX_CONCURRENCY,
+    max_queue=config.LLM_MAX_QUEUE,
+    queue_timeout=config.LLM_QUEUE_TIMEOUT,
+    shared=config.LLM_ADMISSION_SHARED,
+    lease_ttl=config.LLM_ADMISSION_LEASE_TTL,
+)
@@ -0,0 +1,115 @@
+"""This file contains the two-tier cache shared by the agent's caching layers."""
+
+from typing import Any, Optional
+
+from psycopg import AsyncConnection
+from psycopg.types.json import Jsonb
+
+from extensions import ext_db_pool
+from libs.cache import MISSING, LRUTTLCache
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_TABLE = "agent_cache"
+
+
+class TieredCache:
+    """Cache with an in-process LRU/TTL tier and an optional PostgreSQL tier.
+
+    The in-process tier answers repeated lookups on the same worker without any
+    I/O. The shared tier, stored in the ``agent_cache`` table through the
+    per-worker psycopg pool, lets workers reuse each other's entries. Failures of
+    the shared tier are logged and treated as misses: a cache never fails a call.
+
+    Values must be JSON serializable to be stored in the shared tier.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, ttl: float, shared: bool = False):
+        """Initialize the cache.
+
+        Args:
+            namespace: Name separating this cache's keys from other caches in the table.
+            max_entries: Maximum number of entries of the in-process tier.
+            ttl: Time-to-live of an entry, in seconds.
+            shared: Whether to also use the PostgreSQL tier when a pool is available.
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.shared = shared
+        self._memory: LRUTTLCache[str, Any] = LRUTTLCache(max_entries=max_entries, ttl=ttl)
+
+    @staticmethod
+    async def setup(conn: AsyncConnection) -> None:
+        """Create the shared cache table and drop expired rows.
+
+        Called once at startup; a no-op without a PostgreSQL pool.
+
+        Args:
+            conn: The connection to run the statements on.
+        """
+        if ext_db_pool.db_pool is None:
+            return
+
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value JSONB NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        await conn.execute(f"DELETE FROM {CACHE_TABLE} WHERE expires_at < now()")
+
+    async def aget(self, key: str) -> Any:
+        """Return the cached value for ``key``, or ``MISSING``."""
+
+        value = self._memory.get(key)
+        if value is not MISSING or not self._use_shared_tier():
+            return value
+
+        try:
+            async with ext_db_pool.db_pool.connection() as conn:
+                cursor = await conn.execute(
+                    f"SELECT value FROM {CACHE_TABLE} WHERE namespace = %s AND key = %s AND expires_at > now()",
+                    (self.namespace, key),
+                )
+                row = await cursor.fetchone()
+        except Exception as e:
+            logger.warning("shared_cache_read_failed", namespace=self.namespace, error=str(e))
+            return MISSING
+
+        if row is None:
+            return MISSING
+
+        value = row["value"]
+        self._memory.set(key, value)
+        return value
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key`` in every enabled tier."""
+
+        ttl = self.ttl if ttl is None else ttl
+        self._memory.set(key, value, ttl)
+        if not self._use_shared_tier():
+            return
+
+        try:
+            async with ext_db_pool.db_pool.connection() as conn:
+                await conn.execute(
+                    f"""
+                    INSERT INTO {CACHE_TABLE} (namespace, key, value, expires_at)
+                    VALUES (%s, %s, %s, now() + make_interval(secs => %s))
+                    ON CONFLICT (namespace, key)
+                    DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                    """,
+                    (self.namespace, key, Jsonb(value), ttl),
+                )
+        except Exception as e:
+            logger.warning("shared_cache_write_failed", namespace=self.namespace, error=str(e))
+
+    def _use_shared_tier(self) -> bool:
+        return self.shared and ext_db_pool.db_pool is not None
@@ -0,0 +1,240 @@
+"""This file contains the retention job for the Postgres checkpointer tables.
+
+``AsyncPostgresSaver`` writes a checkpoint on every graph step and never deletes
+any. The job below removes, thread by thread:
+
+* checkpoints beyond the latest ``CHECKPOINT_RETENTION_KEEP_LAST`` of each
+  thread (and namespace),
+* whole threads whose last checkpoint is older than
+  ``CHECKPOINT_RETENTION_MAX_AGE_DAYS``,
+* whole threads whose chat ``Session`` row no longer exists,
+
+followed by the pending writes and channel blobs no remaining checkpoint refers
+to. Threads are processed in small batches, each in its own short transaction
+with a lock timeout, so the job never holds many locks nor waits on rows a
+running graph is writing. A pass runs on the single pool connection holding
+its advisory lock, so it never takes more than one connection from requests.
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from psycopg import errors
+from psycopg_pool import AsyncConnectionPool
+
+from configs import config
+from libs.logger import get_logger
+from models.session import Session
+
+logger = get_logger(__name__)
+
+# Advisory lock held while a pass runs, so only one worker of the deployment prunes
+RETENTION_LOCK_ID = 7_291_530_119
+
+_SELECT_THREADS = """
+SELECT DISTINCT thread_id FROM checkpoints
+WHERE thread_id > %(after)s
+ORDER BY thread_id
+LIMIT %(limit)s
+"""
+
+_SELECT_ORPHAN_THREADS = """
+SELECT t.thread_id FROM unnest(%(threads)s::text[]) AS t(thread_id)
+WHERE NOT EXISTS (SELECT 1 FROM {session_table} s WHERE s.id = t.thread_id)
+"""
+
+_SELECT_EXPIRED_THREADS = """
+SELECT thread_id FROM checkpoints
+WHERE thread_id = ANY(%(threads)s)
+GROUP BY thread_id
+HAVING max((checkpoint->>'ts')::timestamptz) < now() - make_interval(days => %(max_age_days)s)
+"""
+
+_DELETE_THREADS = [
+    "DELETE FROM checkpoints WHERE thread_id = ANY(%(threads)s)",
+    "DELETE FROM checkpoint_writes WHERE thread_id = ANY(%(threads)s)",
+    "DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%(threads)s)",
+]
+
+# checkpoint_id values are time-ordered (UUIDv6), so the newest sort last
+_DELETE_OLD_CHECKPOINTS = """
+DELETE FROM checkpoints c
+USING (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rank
+    FROM checkpoints
+    WHERE thread_id = ANY(%(threads)s)
+) old
+WHERE old.rank > %(keep_last)s
+  AND c.thread_id = old.thread_id
+  AND c.checkpoint_ns = old.checkpoint_ns
+  AND c.checkpoint_id = old.checkpoint_id
+"""
+
+_DELETE_ORPHAN_WRITES = """
+DELETE FROM checkpoint_writes w
+WHERE w.thread_id = ANY(%(threads)s)
+  AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = w.thread_id
+      AND c.checkpoint_ns = w.checkpoint_ns
+      AND c.checkpoint_id = w.checkpoint_id
+  )
+"""
+
+# A blob holds one version of one channel and is alive while a checkpoint points at
+# that version. The saver writes blobs before the checkpoint referencing them, so
+# only versions older than a referenced one are deleted, never ones being written
+# (versions are zero-padded and compare as strings).
+_DELETE_ORPHAN_BLOBS = """
+DELETE FROM checkpoint_blobs b
+WHERE b.thread_id = ANY(%(threads)s)
+  AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = b.thread_id
+      AND c.checkpoint_ns = b.checkpoint_ns
+      AND c.checkpoint->'channel_versions'->>b.channel = b.version
+  )
+  AND EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = b.thread_id
+      AND c.checkpoint_ns = b.checkpoint_ns
+      AND c.checkpoint->'channel_versions'->>b.channel > b.version
+  )
+"""
+
+
+@dataclass
+class RetentionStats:
+    """Outcome of a retention pass."""
+
+    threads_scanned: int = 0
+    threads_deleted: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    batches_skipped: int = 0
+    duration_seconds: float = 0.0
+
+
+class CheckpointRetention:
+    """Prune the checkpointer tables of a PostgreSQL database.
+
+    Args:
+        pool: Connection pool of the checkpointer database.
+        keep_last: Checkpoints kept per thread and namespace.
+        max_age_days: Threads idle for longer are deleted; 0 disables it.
+        delete_orphans: Delete threads whose chat session no longer exists.
+        batch_size: Threads handled per transaction.
+        batch_pause: Seconds to wait between two batches.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        keep_last: int = config.CHECKPOINT_RETENTION_KEEP_LAST,
+        max_age_days: int = config.CHECKPOINT_RETENTION_MAX_AGE_DAYS,
+        delete_orphans: bool = config.CHECKPOINT_RETENTION_DELETE_ORPHANS,
+        batch_size: int = config.CHECKPOINT_RETENTION_BATCH_SIZE,
+        batch_pause: float = config.CHECKPOINT_RETENTION_BATCH_PAUSE,
+    ):
+        self.pool = pool
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self.delete_orphans = delete_orphans
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+
+    async def run_once(self) -> Optional[RetentionStats]:
+        """Run a full pass over all threads.
+
+        Returns:
+            Optional[RetentionStats]: What was deleted, or None if another
+            process is already running a pass.
+        """
+        async with self.pool.connection() as lock_conn:
+            locked = await lock_conn.execute("SELECT pg_try_advisory_lock(%s) AS locked", (RETENTION_LOCK_ID,))
+            if not (await locked.fetchone())["locked"]:
+                return None
+            try:
+                return await self._run(lock_conn)
+            finally:
+                await lock_conn.execute("SELECT pg_advisory_unlock(%s)", (RETENTION_LOCK_ID,))
+
+    async def _run(self, conn) -> RetentionStats:
+        stats = RetentionStats()
+        started = time.perf_counter()
+
+        session_table = None
+        if self.delete_orphans:
+            # The sessions live in the application schema, which may not be migrated yet
+            cursor = await conn.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (Session.__tablename__,))
+            if (await cursor.fetchone())["present"]:
+                session_table = f'"{Session.__tablename__}"'
+
+        after = ""
+        while True:
+            cursor = await conn.execute(_SELECT_THREADS, {"after": after, "limit": self.batch_size})
+            threads = [row["thread_id"] for row in await cursor.fetchall()]
+            if not threads:
+                break
+            after = threads[-1]
+            stats.threads_scanned += len(threads)
+
+            try:
+                deleted = await self._prune_batch(conn, threads, session_table)
+            except errors.LockNotAvailable:
+                # Rows of this batch are being written right now; the next pass gets them
+                stats.batches_skipped += 1
+            else:
+                stats.threads_deleted += deleted.threads_deleted
+                stats.checkpoints_deleted += deleted.checkpoints_deleted
+                stats.writes_deleted += deleted.writes_deleted
+                stats.blobs_deleted += deleted.blobs_deleted
+
+            if self.batch_pause:
+                await asyncio.sleep(self.batch_pause)
+
+        stats.duration_seconds = time.perf_counter() - started
+        logger.info("checkpoint_retention_finished", **asdict(stats))
+        return stats
+
+    async def _prune_batch(self, conn, threads: list[str], session_table: Optional[str]) -> RetentionStats:
+        # Counted apart from the pass totals, which must not include a rolled back batch
+        stats = RetentionStats()
+        # On the connection holding the pass lock: a pass never takes a second pool connection
+        async with conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{config.CHECKPOINT_RETENTION_LOCK_TIMEOUT_MS}ms'")
+            params = {"threads": threads}
+
+            doomed: set[str] = set()
+            if session_table is not None:
+                cursor = await conn.execute(_SELECT_ORPHAN_THREADS.format(session_table=session_table), params)
+                doomed.update(row["thread_id"] for row in await cursor.fetchall())
+            if self.max_age_days:
+                cursor = await conn.execute(_SELECT_EXPIRED_THREADS, {**params, "max_age_days": self.max_age_days})
+                doomed.update(row["thread_id"] for row in await cursor.fetchall())
+
+            if doomed:
+                counts = []
+                for statement in _DELETE_THREADS:
+                    cursor = await conn.execute(statement, {"threads": list(doomed)})
+                    counts.append(cursor.rowcount)
+                stats.threads_deleted += len(doomed)
+                stats.checkpoints_deleted += counts[0]
+                stats.writes_deleted += counts[1]
+                stats.blobs_deleted += counts[2]
+
+            remaining = [thread for thread in threads if thread not in doomed]
+            if not remaining:
+                return stats
+            params = {"threads": remaining}
+            cursor = await conn.execute(_DELETE_OLD_CHECKPOINTS, {**params, "keep_last": self.keep_last})
+            stats.checkpoints_deleted += cursor.rowcount
+            cursor = await conn.execute(_DELETE_ORPHAN_WRITES, params)
+            stats.writes_deleted += cursor.rowcount
+            cursor = await conn.execute(_DELETE_ORPHAN_BLOBS, params)
+            stats.blobs_deleted += cursor.rowcount
+        return stats
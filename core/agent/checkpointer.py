@@ -0,0 +1,29 @@
+"""This file contains the checkpointer used by the agent graphs."""
+
+import time
+from typing import Any
+
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+from core.agent.profiling import phase
+from core.metrics import checkpoint_write_duration_seconds
+
+
+class ProfiledPostgresSaver(AsyncPostgresSaver):
+    """``AsyncPostgresSaver`` timing its checkpoint writes."""
+
+    async def aput(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            with phase("checkpoint"):
+                return await super().aput(*args, **kwargs)
+        finally:
+            checkpoint_write_duration_seconds.labels(operation="put").observe(time.perf_counter() - started)
+
+    async def aput_writes(self, *args: Any, **kwargs: Any) -> None:
+        started = time.perf_counter()
+        try:
+            with phase("checkpoint"):
+                await super().aput_writes(*args, **kwargs)
+        finally:
+            checkpoint_write_duration_seconds.labels(operation="put_writes").observe(time.perf_counter() - started)
@@ -1,59 +1,378 @@
 """This file contains the LangGraph Agent/workflow and interactions with the LLMs."""
 
-import logging
+import asyncio
+import uuid
 from abc import ABC, abstractmethod
-from ast import Dict, List
-from typing import Any, Literal, Optional
+from typing import Any, AsyncGenerator, Dict, Generic, List, Literal, Optional, Sequence, TypeVar, Union
 
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessageChunk, BaseMessage, RemoveMessage, convert_to_openai_messages
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from langgraph.graph.state import CompiledStateGraph
 from psycopg_pool import AsyncConnectionPool
 
 from configs import config
+from core.admission import AdmissionRejectedError, llm_admission
+from core.agent.llm_cache import LLMResponseCache
+from core.agent.llm_pool import LLMPool
+from core.agent.profiling import trace_run
+from core.agent.resilience import ResilientLLMCaller
+from core.agent.token_counter import TokenCounter
+from core.agent.tool_cache import ToolResultCache
+from core.metrics import llm_coalesced_calls_total
+from libs.logger import get_logger
+from libs.single_flight import SingleFlight
 from models.base import BaseModel
+from schemas.chat import ChatRequest, Message
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-class BaseGraphAgent(ABC):
+StateT = TypeVar("StateT", bound=BaseModel)
+
+
+def dump_messages(messages: list[Message]) -> list[dict]:
+    """Dump the messages to a list of dictionaries.
+
+    Args:
+        messages (list[Message]): The messages to dump.
+
+    Returns:
+        list[dict]: The dumped messages.
+    """
+    return [message.model_dump() for message in messages]
+
+
+def report_coalesced_call(role: str) -> None:
+    """Count an LLM call by whether it went upstream or joined a call in flight."""
+
+    llm_coalesced_calls_total.labels(role=role).inc()
+
+
+class BaseGraphAgent(ABC, Generic[StateT]):
     """Mananges the LangGraph Agent/Workflow and interactions with the LLM.
-    
+
     This class handles the creation and management of the LangGraph workflow,
     including LLM interactions, database connections, and response processing.
     """
-    
+
+    # Name of the graph node whose LLM tokens are streamed back to the client
+    stream_node: str = "chat"
+
     def __init__(self, tools: List[Any]):
         """Initialize the langgraph agent with necessary components."""
 
-        # use environment-specific LLM model
-        self.llm = ChatOpenAI(
-            model=config.LLM_MODEL,
+        # One client per configured LLM backend
+        self.llm_pool = LLMPool.from_config(
             temperature=config.DEFAULT_LLM_TEMPERATURE,
-            api_key=config.LLM_API_KEY,
-            base_url=config.LLM_BASE_URL,
             max_tokens=config.MAX_TOKENS,
+            # Report token usage on streamed responses too, for the token metrics
+            stream_usage=True,
+            # Retries are made by self.llm_caller, which also knows when a call can no longer be retried
+            max_retries=0,
             **self._get_model_kwargs(),
-        ).bind_tools(tools)
+        )
+        if tools:
+            self.llm_pool = self.llm_pool.map_llm(lambda llm: llm.bind_tools(tools))
+        # Client of the first backend: identifies calls for the response cache and coalescing
+        self.llm = self.llm_pool.primary.llm
+
+        # Tokenizer is loaded once here so prompt trimming never hits the network
+        self.token_counter = TokenCounter(config.LLM_MODEL)
 
         self.tools_by_name = {
-            tool.name for tool in tools    
+            tool.name: tool for tool in tools
         }
+        self.tool_cache = ToolResultCache()
+        self.llm_cache = LLMResponseCache()
+        # Concurrent identical LLM calls of this worker share one upstream call
+        self.llm_flights: SingleFlight[AIMessageChunk] = SingleFlight(on_call=report_coalesced_call)
+        # Routing, retries, circuit breaking and hedging of the upstream calls
+        self.llm_caller = ResilientLLMCaller(self.llm_pool, admission=llm_admission.slot)
         self._connection_pool: Optional[AsyncConnectionPool] = None
-        self._graph: Optional[CompiledStateGraph]
+        self._graph: Optional[CompiledStateGraph] = None
+        # Serializes graph compilation so concurrent first callers compile it only once
+        self._graph_lock = asyncio.Lock()
+
+        logger.info(
+            "llm_initialized",
+            model=config.LLM_MODEL,
+            endpoints=[endpoint.name for endpoint in self.llm_pool.endpoints],
+            routing=self.llm_pool.strategy,
+        )
+
+    def _get_model_kwargs(self) -> Dict[str, Any]:
+        """Extra keyword arguments passed to the chat model, overridable by subclasses."""
+
+        return {}
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the workflow graph has been compiled and can serve requests."""
+
+        return self._graph is not None
 
-        logger.info("llm_initialized", model=config.LLM_MODEL)
+    @property
+    def keeps_history(self) -> bool:
+        """Whether conversation history is persisted by a checkpointer.
 
-    def get_model_kwargs(self) -> Dict[str, Any]:
-        pass 
+        Delta requests, which only carry the new turn, need this to rebuild the
+        conversation on the server side.
+        """
+        return self._graph is not None and self._graph.checkpointer is not None
 
     @abstractmethod
     async def create_graph(self) -> Any:
-        """Construct and compile the workflow graph."""
+        """Construct and compile the workflow graph.
+
+        Implementations must be idempotent and guard compilation with
+        ``self._graph_lock``, since it is called both at startup and lazily
+        by the first requests.
+        """
 
         raise NotImplementedError("Subclasses must implement create_graph method")
-    
 
+    async def get_response(
+        self,
+        messages: list[Message],
+        session_id: str,
+        user_id: Optional[int] = None,
+        history_mode: Literal["full", "delta"] = "full",
+        bypass_cache: bool = False,
+    ) -> list[Message]:
+        """Run the graph to completion and return the resulting conversation.
+
+        Args:
+            messages: The messages to send to the agent.
+            session_id: The session ID, used as the checkpointer thread.
+            user_id: The ID of the user owning the session.
+            history_mode: "full" if ``messages`` is the whole conversation,
+                "delta" if it only holds the new turn.
+            bypass_cache: Skip the LLM response cache for this request.
+
+        Returns:
+            list[Message]: The whole conversation in "full" mode, or only the
+            messages generated for this turn in "delta" mode.
+
+        The run is profiled: its trace is logged, added to the aggregate metrics
+        and available to callers through ``profiling.capture_trace``.
+        """
+        if self._graph is None:
+            self._graph = await self.create_graph()
+
+        graph_input = self._build_input(messages, session_id, history_mode)
+        with trace_run(session_id=session_id, streaming=False):
+            response = await self._graph.ainvoke(
+                graph_input,
+                self._get_run_config(session_id, user_id, bypass_cache),
+            )
+
+        result_messages = response["messages"]
+        if history_mode == "delta":
+            result_messages = self._messages_after(result_messages, graph_input["messages"][-1]["id"])
+        return self._process_messages(result_messages)
 
+    async def get_stream_response(
+        self,
+        messages: list[Message],
+        session_id: str,
+        user_id: Optional[int] = None,
+        history_mode: Literal["full", "delta"] = "full",
+        bypass_cache: bool = False,
+    ) -> AsyncGenerator[str, None]:
+        """Run the graph and yield LLM tokens as soon as they are generated.
 
+        Closing the returned generator cancels the underlying graph run, so a
+        consumer that goes away also stops the LLM call.
 
+        The run is profiled like in ``get_response``; the trace is logged once
+        the stream ends.
+
+        Args:
+            messages: The messages to send to the agent.
+            session_id: The session ID, used as the checkpointer thread.
+            user_id: The ID of the user owning the session.
+            history_mode: "full" if ``messages`` is the whole conversation,
+                "delta" if it only holds the new turn.
+            bypass_cache: Skip the LLM response cache for this request.
+
+        Yields:
+            str: Content tokens generated by the LLM.
+        """
+        if self._graph is None:
+            self._graph = await self.create_graph()
+
+        stream = self._graph.astream(
+            self._build_input(messages, session_id, history_mode),
+            self._get_run_config(session_id, user_id, bypass_cache),
+            stream_mode="messages",
+        )
+        try:
+            with trace_run(session_id=session_id, streaming=True):
+                async for chunk, metadata in stream:
+                    # Only forward assistant tokens, not tool outputs or other nodes' messages
+                    if metadata.get("langgraph_node") != self.stream_node:
+                        continue
+                    if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+                        yield chunk.content
+        finally:
+            await stream.aclose()
+
+    async def get_batch_responses(
+        self,
+        requests: Sequence[ChatRequest],
+        session_id: str,
+        user_id: Optional[int] = None,
+        concurrency: int = config.CHAT_BATCH_CONCURRENCY,
+        bypass_cache: bool = False,
+    ) -> AsyncGenerator[tuple[int, Union[list[Message], Exception]], None]:
+        """Answer independent conversations and yield each result once it is ready.
+
+        At most ``concurrency`` conversations run at the same time, over the
+        compiled graph; results come in completion order, not request order.
+        Every conversation runs in a throwaway checkpoint thread deleted after
+        the run, so the session's own history is left untouched and "delta"
+        requests start from an empty history.
+
+        Every conversation is charged to the user's LLM request rate, like a
+        chat request: once the user's bucket is empty, the batch proceeds at
+        the user's rate instead of failing.
+
+        Closing the returned generator cancels the conversations still running.
+
+        Args:
+            requests: The conversations to answer.
+            session_id: The session ID the batch runs for.
+            user_id: The ID of the user owning the session; conversations are
+                not charged to any rate without one.
+            concurrency: Maximum number of conversations running at once.
+            bypass_cache: Skip the LLM response cache for this batch.
+
+        Yields:
+            tuple: The index of the conversation in ``requests`` and either its
+            messages, as returned by ``get_response``, or the exception it failed with.
+        """
+        if self._graph is None:
+            self._graph = await self.create_graph()
+
+        results: asyncio.Queue[tuple[int, Union[list[Message], Exception]]] = asyncio.Queue()
+        # Shared by the workers, each taking the next conversation once it is done with one
+        pending = iter(range(len(requests)))
+
+        async def worker() -> None:
+            for index in pending:
+                request = requests[index]
+                thread_id = f"{session_id}-batch-{uuid.uuid4().hex}"
+                try:
+                    await self._admit_batch_item(user_id)
+                    result: Union[list[Message], Exception] = await self.get_response(
+                        request.messages,
+                        thread_id,
+                        user_id=user_id,
+                        history_mode=request.history_mode,
+                        bypass_cache=bypass_cache,
+                    )
+                except Exception as e:
+                    result = e
+                finally:
+                    await self._delete_thread(thread_id)
+                results.put_nowait((index, result))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(requests)))]
+        try:
+            for _ in range(len(requests)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    @staticmethod
+    async def _admit_batch_item(user_id: Optional[int]) -> None:
+        """Charge one conversation of a batch, waiting while the user is over their rate.
+
+        Raises:
+            AdmissionRejectedError: If the LLM call queue is full.
+        """
+        if user_id is None:
+            return
+        while True:
+            try:
+                await llm_admission.admit_request(user_id)
+                return
+            except AdmissionRejectedError as e:
+                if e.reason != "user_rate":
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    async def _delete_thread(self, thread_id: str) -> None:
+        """Delete a checkpoint thread; left to the retention job if that fails."""
+
+        if self._graph is None or self._graph.checkpointer is None:
+            return
+        try:
+            await self._graph.checkpointer.adelete_thread(thread_id)
+        except Exception as e:
+            logger.warning("checkpoint_thread_delete_failed", thread_id=thread_id, error=str(e))
+
+    async def get_chat_history(self, session_id: str) -> list[Message]:
+        """Load the conversation stored in the session's checkpoint thread.
+
+        Args:
+            session_id: The session ID, used as the checkpointer thread.
+
+        Returns:
+            list[Message]: The stored conversation, empty if there is none.
+        """
+        if self._graph is None:
+            self._graph = await self.create_graph()
+
+        state = await self._graph.aget_state(self._get_run_config(session_id))
+        return self._process_messages(state.values.get("messages", []) if state.values else [])
+
+    def _build_input(
+        self,
+        messages: list[Message],
+        session_id: str,
+        history_mode: Literal["full", "delta"],
+    ) -> Dict[str, Any]:
+        """Build the graph input for a request.
+
+        Incoming messages get explicit IDs so the turn can be located in the
+        resulting state. In "full" mode the stored history is replaced by the
+        client's copy instead of having the resent messages appended to it again.
+        """
+        input_messages: list[Any] = [
+            {**message, "id": str(uuid.uuid4())} for message in dump_messages(messages)
+        ]
+        if history_mode == "full":
+            input_messages = [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + input_messages
+        return {"messages": input_messages, "session_id": session_id}
+
+    @staticmethod
+    def _messages_after(messages: list[BaseMessage], message_id: str) -> list[BaseMessage]:
+        """Return the messages following the one with ``message_id``."""
+
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].id == message_id:
+                return messages[index + 1:]
+        return messages
+
+    def _get_run_config(
+        self, session_id: str, user_id: Optional[int] = None, bypass_cache: bool = False
+    ) -> Dict[str, Any]:
+        """Build the runnable config for a graph run."""
+
+        return {
+            "configurable": {"thread_id": session_id, "llm_cache_bypass": bypass_cache},
+            "metadata": {"user_id": user_id, "session_id": session_id},
+        }
 
+    def _process_messages(self, messages: list[BaseMessage]) -> list[Message]:
+        """Convert graph messages into user/assistant messages for the API."""
 
+        openai_style_messages = convert_to_openai_messages(messages)
+        # keep just assistant and user messages
+        return [
+            Message(role=message["role"], content=str(message["content"]))
+            for message in openai_style_messages
+            if message["role"] in ["assistant", "user"] and message["content"]
+        ]
@@ -0,0 +1,118 @@
+"""This file contains the exact-match response cache placed in front of the LLM."""
+
+import hashlib
+import json
+from typing import Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.runnables import Runnable
+
+from configs import config
+from core.agent.cache import TieredCache
+from core.metrics import llm_cache_requests_total
+from libs.cache import MISSING
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def split_model(llm: Runnable) -> tuple[BaseChatModel, dict]:
+    """Return the underlying chat model and the kwargs bound to it (e.g. tools)."""
+
+    return getattr(llm, "bound", llm), dict(getattr(llm, "kwargs", {}) or {})
+
+
+def make_llm_call_key(llm: Runnable, messages: Sequence[BaseMessage]) -> str:
+    """Build a key identifying an LLM call.
+
+    Two calls with the same key are interchangeable: same model, parameters,
+    bound tools and prompt.
+
+    Args:
+        llm: The (possibly tool-bound) chat model.
+        messages: The prompt, after trimming and with the system prompt.
+
+    Returns:
+        str: A hex digest identifying the model, parameters, tools and prompt.
+    """
+    chat_model, bound_kwargs = split_model(llm)
+    normalized_messages = [
+        {
+            "type": message.type,
+            "content": message.content,
+            "name": message.name,
+            "tool_calls": [
+                {"name": tool_call["name"], "args": tool_call["args"]}
+                for tool_call in getattr(message, "tool_calls", None) or []
+            ],
+            "tool_call_id": getattr(message, "tool_call_id", None),
+        }
+        for message in messages
+    ]
+    payload = json.dumps(
+        {
+            "model": chat_model._identifying_params,
+            "bound": bound_kwargs,
+            "messages": normalized_messages,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Exact-match cache of LLM responses.
+
+    Responses are cached only for deterministic settings (temperature 0), keyed by
+    the model, its parameters, the bound tools and the normalized prompt messages.
+    Entries live in a bounded in-process tier and, optionally, in the shared
+    PostgreSQL tier so every worker benefits from them.
+    """
+
+    def __init__(self):
+        self.enabled = config.LLM_CACHE_ENABLED
+        self._cache = TieredCache(
+            namespace="llm",
+            max_entries=config.LLM_CACHE_MAX_ENTRIES,
+            ttl=config.LLM_CACHE_TTL,
+            shared=config.LLM_CACHE_SHARED,
+        )
+
+    def is_cacheable(self, llm: Runnable) -> bool:
+        """Whether responses of ``llm`` are deterministic enough to be cached."""
+
+        if not self.enabled:
+            return False
+        chat_model, bound_kwargs = split_model(llm)
+        temperature = bound_kwargs.get("temperature", getattr(chat_model, "temperature", None))
+        return temperature == 0
+
+    def make_key(self, llm: Runnable, messages: Sequence[BaseMessage]) -> str:
+        """Build the cache key of a call, see ``make_llm_call_key``."""
+
+        return make_llm_call_key(llm, messages)
+
+    async def aget(self, key: str) -> Optional[AIMessage]:
+        """Return the cached response for ``key``, or None on a miss."""
+
+        value = await self._cache.aget(key)
+        if value is MISSING:
+            llm_cache_requests_total.labels(result="miss").inc()
+            return None
+
+        llm_cache_requests_total.labels(result="hit").inc()
+        return messages_from_dict([value])[0]
+
+    async def aset(self, key: str, response: AIMessage) -> None:
+        """Cache ``response`` under ``key``."""
+
+        await self._cache.aset(key, message_to_dict(response))
+
+    def record_bypass(self) -> None:
+        """Count a call that skipped the cache on request."""
+
+        llm_cache_requests_total.labels(result="bypass").inc()
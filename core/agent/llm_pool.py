@@ -0,0 +1,227 @@
+"""This file contains the pool of LLM backends the agent spreads its calls over.
+
+Each endpoint of ``LLM_ENDPOINTS`` (or the single ``LLM_BASE_URL`` backend) gets
+its own chat model client and health state: a circuit breaker, the number of
+calls in flight and a moving average of its time to first token. Every call
+attempt acquires an endpoint, picked by ``LLM_ROUTING_STRATEGY`` among those
+whose circuit is not open. An endpoint that keeps failing is thus ejected from
+the rotation until a probe call succeeds, and capacity grows with every
+endpoint added.
+"""
+
+import random
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from configs import config
+from configs.middleware import LLMEndpointConfig
+from core.metrics import llm_circuit_state, llm_endpoint_outstanding_calls, llm_endpoint_requests_total
+from libs.circuit_breaker import CircuitBreaker, CircuitOpenError
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Value of the llm_circuit_state gauge for each state
+CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+# Weight of the newest sample in the time-to-first-token average
+EWMA_ALPHA = 0.3
+
+
+def report_circuit_state(name: str, state: str) -> None:
+    """Publish a circuit breaker transition."""
+
+    llm_circuit_state.labels(circuit=name).set(CIRCUIT_STATE_VALUES[state])
+    logger.warning("llm_circuit_state_changed", circuit=name, state=state)
+
+
+class EndpointHealth:
+    """Health of one backend, shared by every client talking to it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=config.LLM_CIRCUIT_RESET_TIMEOUT,
+            on_state_change=report_circuit_state,
+        )
+        self.outstanding = 0
+        self.ttft_ewma: Optional[float] = None
+
+    def observe_first_chunk(self, seconds: float) -> None:
+        """Fold a time to first token into the average.
+
+        Slower samples are taken as they are ("peak" EWMA), so a backend that
+        slows down is avoided at once and only regains traffic gradually. Times
+        are counted from the call's admission: waiting for a local admission
+        slot says nothing about the backend.
+        """
+        if self.ttft_ewma is None or seconds > self.ttft_ewma:
+            self.ttft_ewma = seconds
+        else:
+            self.ttft_ewma += EWMA_ALPHA * (seconds - self.ttft_ewma)
+
+
+class LLMEndpoint:
+    """A chat model client bound to one backend."""
+
+    def __init__(self, settings: LLMEndpointConfig, llm: Runnable, model: str, health: EndpointHealth):
+        self.settings = settings
+        self.llm = llm
+        self.model = model
+        self.health = health
+
+    @property
+    def name(self) -> str:
+        return self.settings.name
+
+    def start_call(self) -> None:
+        """Register a call to the endpoint, which must be allowed by its circuit.
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit does not let the call through.
+        """
+        self.health.breaker.before_call()
+        self.health.outstanding += 1
+        llm_endpoint_outstanding_calls.labels(endpoint=self.name).inc()
+
+    def finish_call(self, outcome: str) -> None:
+        """Report the end of a call started with ``start_call``.
+
+        Args:
+            outcome: "ok", "error" (a failure of the backend, counted by its
+                circuit) or "cancelled" (an ending telling nothing about it).
+        """
+        self.health.outstanding -= 1
+        llm_endpoint_outstanding_calls.labels(endpoint=self.name).dec()
+        llm_endpoint_requests_total.labels(endpoint=self.name, outcome=outcome).inc()
+        if outcome == "ok":
+            self.health.breaker.record_success()
+        elif outcome == "error":
+            self.health.breaker.record_failure()
+        else:
+            self.health.breaker.release()
+
+
+class LLMPool:
+    """Chat model clients for every configured backend, with routing.
+
+    Not thread-safe; meant to be used from the worker's event loop.
+    """
+
+    def __init__(self, endpoints: Sequence[LLMEndpoint], strategy: str = config.LLM_ROUTING_STRATEGY):
+        if not endpoints:
+            raise ValueError("an LLM pool needs at least one endpoint")
+        self.endpoints = list(endpoints)
+        self.strategy = strategy
+
+    @staticmethod
+    def endpoint_settings() -> list[LLMEndpointConfig]:
+        """The configured backends, or the LLM_BASE_URL one if none is."""
+
+        return config.LLM_ENDPOINTS or [LLMEndpointConfig(name="default")]
+
+    @classmethod
+    def from_config(cls, model: Optional[str] = None, **llm_kwargs: Any) -> "LLMPool":
+        """Create a client for every configured backend.
+
+        Args:
+            model: Model used on every backend, instead of each one's own model.
+            **llm_kwargs: Further ``ChatOpenAI`` arguments, e.g. the temperature.
+        """
+        settings = cls.endpoint_settings()
+        return cls._build(settings, [EndpointHealth(endpoint.name) for endpoint in settings], model, llm_kwargs)
+
+    @classmethod
+    def _build(
+        cls,
+        settings: Sequence[LLMEndpointConfig],
+        health: Sequence[EndpointHealth],
+        model: Optional[str],
+        llm_kwargs: dict[str, Any],
+    ) -> "LLMPool":
+        endpoints = []
+        for endpoint, endpoint_health in zip(settings, health):
+            endpoint_model = model or endpoint.model or config.LLM_MODEL
+            llm = ChatOpenAI(
+                model=endpoint_model,
+                api_key=endpoint.api_key or config.LLM_API_KEY,
+                base_url=str(endpoint.base_url or config.LLM_BASE_URL),
+                **llm_kwargs,
+            )
+            endpoints.append(LLMEndpoint(endpoint, llm, endpoint_model, endpoint_health))
+        return cls(endpoints)
+
+    def derive(self, model: Optional[str] = None, **llm_kwargs: Any) -> "LLMPool":
+        """Create other clients for the same backends, sharing their health.
+
+        E.g. for a different model or other parameters; calls of both pools
+        count towards the load and the circuit of each backend.
+        """
+        return self._build(
+            [endpoint.settings for endpoint in self.endpoints],
+            [endpoint.health for endpoint in self.endpoints],
+            model,
+            llm_kwargs,
+        )
+
+    def map_llm(self, func: Callable[[Runnable], Runnable]) -> "LLMPool":
+        """Return a pool whose clients are ``func(llm)``, e.g. with tools bound."""
+
+        endpoints = [
+            LLMEndpoint(endpoint.settings, func(endpoint.llm), endpoint.model, endpoint.health)
+            for endpoint in self.endpoints
+        ]
+        return LLMPool(endpoints, self.strategy)
+
+    @property
+    def primary(self) -> LLMEndpoint:
+        """The first endpoint, whose client identifies calls for caching."""
+
+        return self.endpoints[0]
+
+    def _score(self, endpoint: LLMEndpoint) -> float:
+        health = endpoint.health
+        if self.strategy == "least_outstanding":
+            return health.outstanding
+        # Backends without a sample yet score 0, so each one gets tried early
+        return (health.ttft_ewma or 0.0) * (health.outstanding + 1)
+
+    def acquire(self, exclude: Iterable[str] = ()) -> LLMEndpoint:
+        """Pick an endpoint for a call attempt and register the call on it.
+
+        Endpoints in ``exclude`` (e.g. those already tried for this call) are
+        only used if no other endpoint is available.
+
+        Raises:
+            CircuitOpenError: If the circuit of every endpoint is open.
+        """
+        excluded = set(exclude)
+        available = [endpoint for endpoint in self.endpoints if endpoint.health.breaker.available]
+        candidates = [endpoint for endpoint in available if endpoint.name not in excluded] or available
+        if not candidates:
+            retry_after = min(endpoint.health.breaker.retry_after for endpoint in self.endpoints)
+            raise CircuitOpenError("llm", retry_after)
+
+        # Shuffled first, so ties are broken at random instead of always favouring the first endpoint
+        random.shuffle(candidates)
+        endpoint = min(candidates, key=self._score)
+        endpoint.start_call()
+        return endpoint
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Return the health of every endpoint."""
+
+        return [
+            {
+                "name": endpoint.name,
+                "model": endpoint.model,
+                "circuit": endpoint.health.breaker.state,
+                "outstanding": endpoint.health.outstanding,
+                "ttft_ewma": endpoint.health.ttft_ewma,
+            }
+            for endpoint in self.endpoints
+        ]
@@ -2,65 +2,68 @@
 
 
 
-import logging
+import asyncio
 import re
-from typing import Annotated, List, Literal, Optional
+import time
+import uuid
+from typing import Annotated, Any, List, Literal, Optional
 
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import trim_messages as _trim_message
-from langchain_core.messages import ToolMessage
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
 from langgraph.graph.message import add_messages
 from langgraph.graph.state import CompiledStateGraph, StateGraph
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.config import get_config
 from langgraph.graph import END
+from psycopg_pool import AsyncConnectionPool
 
 from pydantic import Field, field_validator
 
-from asyncio import graph
+from core.admission import llm_admission
+from core.agent.cache import TieredCache
 from core.agent.graph_agent_base import BaseGraphAgent
+from core.agent.llm_cache import make_llm_call_key
+from core.agent.llm_pool import LLMEndpoint
+from core.agent.replay import ReplayChatModel
+from core.agent.summary import ConversationSummarizer, summary_message
+from core.agent.token_counter import TokenCounter
+from core.agent.checkpointer import ProfiledPostgresSaver
+from core.agent.profiling import phase, profile_node, profile_router
+from core.metrics import llm_inference_duration_seconds, observe_llm_stream, tool_call_duration_seconds
+from extensions import ext_db_pool
+from libs.cache import MISSING
+from libs.logger import get_logger
 from models.base import BaseModel
 
 from configs import config
-from schemas.chat import Message
+from configs.deploy import Environment
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
-def dump_messages(messages: list[Message]) -> list[dict]:
-    """Dump the messages to a list of dictionaries.
+# Arbitrary application-wide key for pg_advisory_lock around checkpointer migrations
+CHECKPOINTER_SETUP_LOCK_ID = 7_291_530_118
 
-    Args:
-        messages (list[Message]): The messages to dump.
+SYSTEM_PROMPT = "You are a helpful assistant."
 
-    Returns:
-        list[dict]: The dumped messages.
+def prepare_message(
+    messages: List[BaseMessage], token_counter: TokenCounter, system_prompt: str, summary: str = ""
+) -> List[BaseMessage]:
+    """Prepare the messages for the LLM.
+
+    Prepends the system prompt and, if older turns were summarized, their
+    running summary to the messages not covered by it. Those are still trimmed
+    to the most recent turns that fit in ``MAX_TOKENS`` with the summary, as a
+    safety net for when the summary could not be refreshed. Token counts are
+    memoized per message by ``token_counter``, so only messages added since the
+    previous step are tokenized.
     """
-    return [message.model_dump() for message in messages]
-
-def prepare_message(messages: List[Message], llm: BaseChatModel, system_prompt: str) -> List[dict]:
-    """Prepare the messages for the LLM."""
-
-    # 对于 trim_message 这个方法来说要么给他 langchain 官方的消息类型的列表
-    # 要么给它字典列表，但是每个字典要有相应的键，role content 都要有
-    # trimmed = trim_messages(
-    #     [
-    #         {"role": "system", "content": "你好"},
-    #         {"role": "user", "content": "今天天气怎样?"}
-    #     ],
-    #     token_counter=...,
-    #     max_tokens=100
-    # )
-
-    trimmed_messages = _trim_message(
-        dump_messages(messages),
-        strategy="last",
-        token_counter=llm,
-        max_tokens=config.MAX_TOKENS,
-        start_on="human",
-        include_system=False,
-        allow_partial=False    
-    )
 
-    return [Message(role="system", content=system_prompt)] + trimmed_messages
+    prompt: List[BaseMessage] = [SystemMessage(content=system_prompt)]
+    max_tokens = config.MAX_TOKENS
+    if summary:
+        prompt.append(summary_message(summary))
+        max_tokens = max(max_tokens - token_counter.count_message(prompt[-1]), 0)
+
+    return prompt + token_counter.trim(messages, max_tokens=max_tokens)
 
 class GraphState(BaseModel):
     """state definition for the langgraph agent/worlflow."""
@@ -69,6 +72,9 @@ class GraphState(BaseModel):
         default_factory=list, description="The messages in the conversation"    
     )
     session_id: str = Field(..., description="The unique identifier for the conversation session")
+    summary: str = Field(default="", description="Running summary of the oldest messages")
+    summarized_count: int = Field(default=0, description="Number of leading messages covered by the summary")
+    summary_fingerprint: str = Field(default="", description="Fingerprint of the messages covered by the summary")
 
     @field_validator("session_id")
     @classmethod
@@ -85,7 +91,8 @@ class GraphState(BaseModel):
             ValueError: If the session ID is not valid
         """
         try:
-            pass 
+            uuid.UUID(v)
+            return v
         except ValueError:
             # If not a UUID, check for safe characters only
             if not re.match(r"^[a-zA-Z0-9_\-]+$", v):
@@ -95,33 +102,47 @@ class GraphState(BaseModel):
 class NormalAgent(BaseGraphAgent[GraphState]):
     """This is simple implement of base agent."""
 
+    def __init__(self, tools: List[Any]):
+        super().__init__(tools)
+        self.summarizer = ConversationSummarizer(self.token_counter, self.llm_pool)
 
     async def create_graph(self) -> Optional[CompiledStateGraph]:
         """Create and configure the LangGraph workflow."""
 
-        if self._graph is None:
+        if self._graph is not None:
+            return self._graph
+
+        async with self._graph_lock:
+            # Another caller may have compiled the graph while we waited for the lock
+            if self._graph is not None:
+                return self._graph
+
             try:
 
                 graph_builder = StateGraph(GraphState)
-                graph_builder.add_node("chat", self._chat)
-                graph_builder.add_node("tool_call", self._tool_call)
+                # Nodes and the router are wrapped to profile every run
+                graph_builder.add_node("summarize", profile_node("summarize", self._summarize))
+                graph_builder.add_node("chat", profile_node("chat", self._chat))
+                graph_builder.add_node("tool_call", profile_node("tool_call", self._tool_call))
                 graph_builder.add_conditional_edges(
                     "chat",
-                    self._should_continue,
+                    profile_router(self._should_continue),
                     {
                         "continue": "tool_call",
                         "end": END    
                     }    
                 )
                 graph_builder.add_edge("tool_call", "chat")
-                graph_builder.set_entry_point("chat")
+                # Summarization runs once per turn, not after every tool call
+                graph_builder.add_edge("summarize", "chat")
+                graph_builder.set_entry_point("summarize")
                 graph_builder.set_finish_point("chat")
 
                 # Get connection pool (may be None in production if DB unavailable)
                 connection_pool = await self._get_connection_pool()
                 if connection_pool:
-                    checkpointer = AsyncPostgresSaver(connection_pool)
-                    await checkpointer.setup()
+                    checkpointer = ProfiledPostgresSaver(connection_pool)
+                    await self._setup_storage(connection_pool)
                 else:
                     # In production, proceed without checkpointer if needed
                     checkpointer = None
@@ -146,51 +167,181 @@ class NormalAgent(BaseGraphAgent[GraphState]):
                     logger.warning("continuing_without_graph")
                     return None
                 raise e
-            
+
+        return self._graph
+
+    async def _summarize(self, state: GraphState):
+        """Fold older turns into the running summary once enough have accumulated."""
+
+        if not config.SUMMARIZATION_ENABLED:
+            # A summary written while it was enabled is dropped from the prompt
+            return {"summary": "", "summarized_count": 0, "summary_fingerprint": ""} if state.summary else {}
+
+        return await self.summarizer.update(
+            state.messages, state.summary, state.summarized_count, state.summary_fingerprint
+        )
+
     async def _chat(self, state: GraphState):
         """Process the chat state and generate a response."""
 
-        messages = prepare_message(state.messages, self.llm, SYSTEM_PROMPT)
-        llm_calls_num = 0
+        messages = prepare_message(
+            state.messages[state.summarized_count:], self.token_counter, SYSTEM_PROMPT, state.summary
+        )
 
-        # Configure retry attempts based on env
-        max_retries = config.MAX_LLM_CALL_RETRIES
+        call_key = None
+        if self.llm_cache.is_cacheable(self.llm) or config.LLM_COALESCING_ENABLED:
+            call_key = make_llm_call_key(self.llm, messages)
 
-        for attempt in range(max_retries):
-            try:
-                with llm_inference_duration_seconds.labels(model=self.llm.model_name).time():
-                    generated_state = {
-                        "message": [await self.llm.ainvoke(dump_messages(messages))]
-                    }
+        cache_key = call_key if self._should_use_llm_cache() else None
+        if cache_key is not None:
+            cached_response = await self.llm_cache.aget(cache_key)
+            if cached_response is not None:
+                # Replayed through a chat model so stream consumers still receive the tokens
+                return {
+                    "messages": [await ReplayChatModel(response=cached_response).ainvoke(messages)]
+                }
 
-                    return generated_state
-            except OpenAIError as e:
+        # Retries and the circuit breaker are handled by self.llm_caller
+        with phase("llm"), llm_inference_duration_seconds.labels(model=config.LLM_MODEL).time():
+            response = await self._invoke_llm(messages, call_key)
 
-                llm_calls_num += 1
+        if cache_key is not None:
+            await self.llm_cache.aset(cache_key, response)
 
-                continue
+        generated_state = {
+            "messages": [response]
+        }
+
+        return generated_state
+
+
+    def _should_use_llm_cache(self) -> bool:
+        """Whether the current call may be served from and stored in the LLM cache."""
+
+        if not self.llm_cache.is_cacheable(self.llm):
+            return False
+
+        if get_config().get("configurable", {}).get("llm_cache_bypass"):
+            self.llm_cache.record_bypass()
+            return False
+
+        return True
+
+    async def _invoke_llm(self, messages: List[BaseMessage], call_key: Optional[str]) -> BaseMessage:
+        """Call the LLM, sharing the upstream call with identical concurrent calls.
+
+        With coalescing enabled, the first call for ``call_key`` streams from the
+        model and every concurrent identical call subscribes to that stream. Each
+        caller replays the chunks through ``ReplayChatModel``, so all of them
+        stream tokens to their own clients and get their own response message.
+
+        The upstream stream is observed once, before any fan-out, so time to
+        first token and token usage are recorded per upstream call. Only upstream
+        calls take an admission slot, held by ``self.llm_caller`` for each
+        attempt; cache hits and coalesced calls do not.
+        Upstream calls go through ``self.llm_caller``, which routes them to a
+        backend of the pool and retries and hedges them until their first chunk.
+        """
+        async def attempt(endpoint: LLMEndpoint):
+            # No callbacks: the node's stream consumers get the tokens from the replay
+            # below, they would otherwise receive them from the upstream call too
+            upstream_chunks = endpoint.llm.astream(messages, config={"callbacks": []})
+            async for chunk in observe_llm_stream(upstream_chunks, endpoint.model):
+                yield chunk
+
+        def upstream():
+            return self.llm_caller.stream(attempt)
+
+        if not config.LLM_COALESCING_ENABLED or call_key is None:
+            chunks = upstream()
+        else:
+            chunks = self.llm_flights.stream(call_key, upstream)
+        return await ReplayChatModel(chunks=chunks).ainvoke(messages)
 
-            raise Exception(f"Failed to get a response from the LLM after {max_retries} attempts")
-        
     # Define our tool node
     async def _tool_call(self, state: GraphState) -> GraphState:
-        """Process tool calls from the last message."""
-
-        outputs = []
-        for tool_call in state.messages[-1].tool_calls:
-            tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(tool_call["args"])
-            outputs.append(
-                ToolMessage(
-                    content=tool_result,
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"]    
-                )    
+        """Process tool calls from the last message.
+
+        Independent tool calls are executed concurrently, at most
+        ``TOOL_MAX_CONCURRENCY`` at a time, and the resulting ToolMessages are
+        returned in the order of the original tool calls.
+        """
+
+        semaphore = asyncio.Semaphore(config.TOOL_MAX_CONCURRENCY)
+
+        async def run_tool(tool_call: dict) -> ToolMessage:
+            async with semaphore:
+                return await self._run_tool(tool_call)
+
+        with phase("tools"):
+            outputs = await asyncio.gather(
+                *(run_tool(tool_call) for tool_call in state.messages[-1].tool_calls)
             )
-        
+
         return {
-            "messages": outputs    
+            "messages": list(outputs)
         }
 
+    async def _run_tool(self, tool_call: dict) -> ToolMessage:
+        """Execute a single tool call with a timeout.
+
+        A tool that times out or raises yields an error ToolMessage, so the model
+        can react to the failure instead of the whole turn failing. Results of
+        idempotent tools are served from and stored in ``self.tool_cache``.
+        """
+        started = None
+        try:
+            tool = self.tools_by_name[tool_call["name"]]
+            cacheable = self.tool_cache.is_cacheable(tool)
+            if cacheable:
+                tool_result = await self.tool_cache.aget(tool.name, tool_call["args"])
+                if tool_result is not MISSING:
+                    return ToolMessage(
+                        content=tool_result,
+                        name=tool_call["name"],
+                        tool_call_id=tool_call["id"]
+                    )
+
+            started = time.perf_counter()
+            tool_result = await asyncio.wait_for(
+                tool.ainvoke(tool_call["args"]),
+                timeout=config.TOOL_CALL_TIMEOUT,
+            )
+            self._observe_tool(tool_call["name"], "ok", started)
+        except asyncio.TimeoutError:
+            self._observe_tool(tool_call["name"], "timeout", started)
+            logger.warning("tool_call_timeout", tool=tool_call["name"], timeout=config.TOOL_CALL_TIMEOUT)
+            return ToolMessage(
+                content=f"Error: tool '{tool_call['name']}' timed out after {config.TOOL_CALL_TIMEOUT}s",
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+        except Exception as e:
+            self._observe_tool(tool_call["name"], "error", started)
+            logger.error("tool_call_failed", tool=tool_call["name"], error=str(e), exc_info=True)
+            return ToolMessage(
+                content=f"Error: tool '{tool_call['name']}' failed: {e}",
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+
+        if cacheable:
+            await self.tool_cache.aset(tool.name, tool_call["args"], tool_result)
+
+        return ToolMessage(
+            content=tool_result,
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"]    
+        )
+
+    @staticmethod
+    def _observe_tool(name: str, status: str, started: Optional[float]) -> None:
+        # started is None when the call failed before the tool ran, e.g. an unknown tool name
+        if started is not None:
+            tool_call_duration_seconds.labels(tool=name, status=status).observe(time.perf_counter() - started)
+
     def _should_continue(self, state: GraphState) -> Literal["end", "continue"]:
         """Determine if the agent should continue or end based on the last message."""
 
@@ -202,4 +353,41 @@ class NormalAgent(BaseGraphAgent[GraphState]):
         else:
             return "continue"
         
-    def _get_connection_pool(self, )
\ No newline at end of file
+    async def _setup_storage(self, connection_pool: AsyncConnectionPool) -> None:
+        """Create or migrate the checkpointer, cache and admission tables.
+
+        Every worker compiles its own graph at startup, so the schema migration is
+        serialized across processes with a PostgreSQL advisory lock; workers that
+        get the lock after the first one only find the migrations already applied.
+        The migrations run on the connection holding the lock, so a pool of one
+        connection is enough, and the wait for the lock is bounded by
+        ``PSYCOPG_SETUP_LOCK_TIMEOUT_MS``.
+        """
+        async with connection_pool.connection() as conn:
+            # Session-level setting on a pooled connection: reset before the migrations
+            # so they are not bounded by it, and before the connection goes back to the pool
+            await conn.execute(f"SET lock_timeout = '{config.PSYCOPG_SETUP_LOCK_TIMEOUT_MS}ms'")
+            try:
+                await conn.execute("SELECT pg_advisory_lock(%s)", (CHECKPOINTER_SETUP_LOCK_ID,))
+            finally:
+                await conn.execute("RESET lock_timeout")
+            try:
+                await AsyncPostgresSaver(conn).setup()
+                await TieredCache.setup(conn)
+                await llm_admission.setup(conn)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock(%s)", (CHECKPOINTER_SETUP_LOCK_ID,))
+
+    async def _get_connection_pool(self) -> Optional[AsyncConnectionPool]:
+        """Get the PostgreSQL connection pool used by the checkpointer.
+
+        The agent does not own a pool: it borrows the per-worker pool opened by
+        ``extensions.ext_db_pool`` during the app lifespan, so the checkpointer and
+        app queries share the same connection budget.
+        """
+        if self._connection_pool is None:
+            self._connection_pool = ext_db_pool.db_pool
+            if self._connection_pool is None:
+                logger.warning("connection_pool_unavailable")
+
+        return self._connection_pool
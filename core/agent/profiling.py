@@ -0,0 +1,175 @@
+"""This file contains per-run profiling of the agent graph.
+
+Nodes and routers are wrapped when the graph is built, and the LLM call, the
+tool calls and the checkpoint writes are timed as phases. Measurements of one
+graph run are collected in a ``GraphRunTrace`` held in a contextvar; LangGraph
+copies the caller's context into the tasks running nodes and checkpoint writes,
+so they all report to the trace of the request that started the run.
+
+Only lightweight modules are imported here, so controllers can use the trace
+helpers without loading LangGraph; the checkpointer wrapper lives in
+``core.agent.checkpointer``.
+"""
+
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from core.metrics import graph_node_duration_seconds, graph_run_iterations, graph_run_phase_seconds
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Phases timed inside a run; the rest of the wall time is graph overhead
+PHASES = ("llm", "tools", "checkpoint", "router")
+
+
+@dataclass
+class GraphRunTrace:
+    """Timings of a single graph run.
+
+    Attributes:
+        started: ``perf_counter`` time at which the run started.
+        wall_time: Duration of the whole run, set once it finished.
+        phases: Seconds spent in each phase (LLM, tools, checkpoint writes, routers).
+        node_times: Seconds spent in each node.
+        node_counts: Number of executions of each node.
+    """
+
+    started: float = field(default_factory=time.perf_counter)
+    wall_time: Optional[float] = None
+    phases: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    node_times: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    node_counts: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def iterations(self) -> int:
+        """Number of model -> tools -> model loop iterations."""
+
+        return self.node_counts.get("tool_call", 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the trace in milliseconds, e.g. for logging."""
+
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self.started
+        return {
+            "wall_ms": round(wall_time * 1000, 1),
+            **{f"{phase}_ms": round(self.phases.get(phase, 0.0) * 1000, 1) for phase in PHASES},
+            "iterations": self.iterations,
+            "nodes": {
+                node: {"count": self.node_counts[node], "ms": round(seconds * 1000, 1)}
+                for node, seconds in self.node_times.items()
+            },
+        }
+
+    def server_timing(self) -> str:
+        """Render the trace as a ``Server-Timing`` header value."""
+
+        summary = self.to_dict()
+        entries = [f'graph;dur={summary["wall_ms"]};desc="{self.iterations} iterations"']
+        entries += [f"{phase};dur={summary[f'{phase}_ms']}" for phase in PHASES]
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[GraphRunTrace]] = ContextVar("graph_run_trace", default=None)
+
+
+def current_trace() -> Optional[GraphRunTrace]:
+    """Return the trace of the graph run in progress, if any."""
+
+    return _current_trace.get()
+
+
+@contextmanager
+def capture_trace() -> Iterator[GraphRunTrace]:
+    """Provide the trace the next graph run in this context records into.
+
+    Lets a caller, e.g. a controller adding a debug header, read the trace of a
+    run it does not start itself.
+    """
+    trace = GraphRunTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def trace_run(**log_fields: Any) -> Iterator[GraphRunTrace]:
+    """Profile a graph run and report it once it finished.
+
+    Uses the trace provided by ``capture_trace`` if there is one. When the run
+    ends, the trace is logged with ``log_fields`` and added to the aggregate
+    metrics.
+    """
+    trace = _current_trace.get()
+    token = None
+    if trace is None:
+        trace = GraphRunTrace()
+        token = _current_trace.set(trace)
+    trace.started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.wall_time = time.perf_counter() - trace.started
+        graph_run_phase_seconds.labels(phase="total").observe(trace.wall_time)
+        for phase in PHASES:
+            graph_run_phase_seconds.labels(phase=phase).observe(trace.phases.get(phase, 0.0))
+        graph_run_iterations.observe(trace.iterations)
+        logger.info("graph_run_profile", **log_fields, **trace.to_dict())
+        if token is not None:
+            try:
+                _current_trace.reset(token)
+            except ValueError:
+                # A streaming run closed from another task than the one that started it
+                pass
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to phase ``name`` of the current run."""
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.phases[name] += time.perf_counter() - started
+
+
+def profile_node(name: str, node: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Wrap an async graph node to record its execution time."""
+
+    @functools.wraps(node)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        started = time.perf_counter()
+        try:
+            return await node(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            graph_node_duration_seconds.labels(node=name).observe(elapsed)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.node_times[name] += elapsed
+                trace.node_counts[name] += 1
+
+    return wrapper
+
+
+def profile_router(router: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a conditional edge function to record its execution time."""
+
+    @functools.wraps(router)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        with phase("router"):
+            return router(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,113 @@
+"""This file contains a chat model that replays an already generated response."""
+
+import json
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+
+def message_to_chunk(message: AIMessage) -> AIMessageChunk:
+    """Convert a complete AI message into a single equivalent chunk."""
+
+    return AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        usage_metadata=message.usage_metadata,
+        tool_call_chunks=[
+            {
+                "name": tool_call["name"],
+                "args": json.dumps(tool_call["args"]),
+                "id": tool_call["id"],
+                "index": index,
+            }
+            for index, tool_call in enumerate(message.tool_calls)
+        ],
+    )
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model returning a response produced elsewhere.
+
+    The response is either a complete message (e.g. read from a cache) or a stream
+    of chunks generated by another call (e.g. a coalesced upstream call). Invoking
+    it inside a graph node goes through the regular chat model callbacks, so a
+    replayed response is streamed to ``stream_mode="messages"`` consumers and
+    traced exactly like a response coming from the real model.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    response: Optional[AIMessage] = None
+    chunks: Optional[AsyncIterator[AIMessageChunk]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.response is None:
+            raise NotImplementedError("Replaying a chunk stream is only supported asynchronously")
+        # Fresh ID on every replay, so the reply is appended to the state instead of
+        # replacing an earlier message carrying the same ID
+        return ChatResult(generations=[ChatGeneration(message=self.response.model_copy(update={"id": None}))])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.response is None:
+            raise NotImplementedError("Replaying a chunk stream is only supported asynchronously")
+        chunk = ChatGenerationChunk(message=message_to_chunk(self.response))
+        if run_manager:
+            run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+        yield chunk
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.chunks is None:
+            chunk = ChatGenerationChunk(message=message_to_chunk(self.response))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        try:
+            async for message_chunk in self.chunks:
+                # Drop the upstream run's ID so this run assigns its own
+                chunk = ChatGenerationChunk(message=message_chunk.model_copy(update={"id": None}))
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            # Unsubscribe right away if this run is cancelled
+            aclose = getattr(self.chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
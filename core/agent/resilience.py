@@ -0,0 +1,309 @@
+"""This file contains the resilient call layer around upstream LLM calls.
+
+Each upstream call is a stream of chunks that the chat node relays to clients,
+so a call can only be retried or hedged until its first chunk: once tokens have
+been forwarded, a failure is reported as is. Before that point:
+
+* transient errors (connection errors, timeouts, 429 and 5xx responses) are
+  retried with exponential backoff and full jitter, honouring ``Retry-After``,
+  on another endpoint of the pool when there is one;
+* every endpoint has a circuit breaker counting its consecutive transient
+  failures; once open, the endpoint gets no calls, and once all are open calls
+  fail immediately instead of queueing behind a dead upstream;
+* optionally, a call with no first chunk after the ``LLM_HEDGE_QUANTILE`` of
+  recent times to first token gets a second, hedged attempt, on another
+  endpoint when possible; the first attempt to produce a chunk is used and the
+  other one is cancelled.
+
+Calls may have to wait for an admission slot before going upstream. That wait
+is not the endpoint's doing: times to first token are measured from the
+admission, and the hedge delay only starts once the first attempt has a slot.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncContextManager, AsyncIterator, Callable, Optional
+
+import openai
+from langchain_core.messages import AIMessageChunk
+
+from configs import config
+from core.agent.llm_pool import LLMEndpoint, LLMPool
+from core.metrics import llm_call_retries_total, llm_hedged_calls_total
+from libs.circuit_breaker import CircuitOpenError
+from libs.histogram import RollingQuantile
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+TRANSIENT_STATUS_CODES = {408, 409, 429}
+
+Attempt = Callable[[LLMEndpoint], AsyncIterator[AIMessageChunk]]
+Admission = Callable[[], AsyncContextManager[None]]
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an upstream error may go away on a retry."""
+
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in TRANSIENT_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def call_outcome(error: Optional[BaseException]) -> str:
+    """Classify how a call ended, for the endpoint's circuit and metrics."""
+
+    if error is None:
+        return "ok"
+    if is_transient(error):
+        return "error"
+    # A bad request or a cancelled call tells nothing about the endpoint's health
+    return "rejected" if isinstance(error, Exception) else "cancelled"
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Seconds to wait requested by the upstream through ``Retry-After``, if any."""
+
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ResilientLLMCaller:
+    """Run upstream LLM calls over a pool with retries, circuit breakers and hedging.
+
+    Args:
+        pool: The endpoints calls are spread over.
+        max_attempts: Attempts per call, the first one included.
+        backoff_base: Backoff ceiling of the first retry, in seconds; doubled on
+            every further retry.
+        backoff_max: Maximum backoff, in seconds.
+        hedge_quantile: Quantile of recent times to first token after which a
+            hedged attempt is started; None disables hedging.
+        hedge_min_samples: Times to first token needed before hedging starts.
+        admission: Returns the context holding an admission slot for the
+            duration of one attempt; None if attempts need no slot.
+    """
+
+    def __init__(
+        self,
+        pool: LLMPool,
+        max_attempts: int = config.LLM_MAX_ATTEMPTS,
+        backoff_base: float = config.LLM_BACKOFF_BASE,
+        backoff_max: float = config.LLM_BACKOFF_MAX,
+        hedge_quantile: Optional[float] = config.LLM_HEDGE_QUANTILE if config.LLM_HEDGE_ENABLED else None,
+        hedge_min_samples: int = config.LLM_HEDGE_MIN_SAMPLES,
+        admission: Optional[Admission] = None,
+    ):
+        self.pool = pool
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.admission = admission
+        self.first_chunk_times = RollingQuantile()
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Delay before retry number ``attempt`` (0-based), with full jitter."""
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        hint = retry_after_hint(error)
+        if hint is not None:
+            delay = max(delay, min(hint, self.backoff_max))
+        return delay
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds without a first chunk after which a hedged attempt starts."""
+
+        if self.hedge_quantile is None or len(self.first_chunk_times) < self.hedge_min_samples:
+            return None
+        return self.first_chunk_times.quantile(self.hedge_quantile)
+
+    async def stream(self, attempt: Attempt) -> AsyncIterator[AIMessageChunk]:
+        """Stream the chunks of an upstream call.
+
+        Args:
+            attempt: Starts one upstream call on the given endpoint; invoked
+                once per attempt.
+
+        Yields:
+            AIMessageChunk: The chunks of the successful attempt.
+
+        Raises:
+            CircuitOpenError: If the circuit of every endpoint is open.
+        """
+        tried: list[str] = []
+        for attempt_number in range(self.max_attempts):
+            try:
+                started = await self._first_chunk(attempt, tried)
+            except Exception as e:
+                if not is_transient(e) or attempt_number + 1 >= self.max_attempts:
+                    raise
+                llm_call_retries_total.labels(upstream=tried[-1], error=type(e).__name__).inc()
+                fresh_endpoint = any(
+                    endpoint.health.breaker.available and endpoint.name not in tried
+                    for endpoint in self.pool.endpoints
+                )
+                # Another endpoint is tried at once; the same one only after a backoff
+                delay = 0.0 if fresh_endpoint else self.backoff(attempt_number, e)
+                logger.warning(
+                    "llm_call_retry",
+                    upstream=tried[-1],
+                    attempt=attempt_number + 1,
+                    delay=round(delay, 3),
+                    error=str(e),
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            # Chunks are forwarded from here on, so the call can no longer be retried
+            error: Optional[BaseException] = None
+            try:
+                if started.first_chunk is not None:
+                    yield started.first_chunk
+                    async for chunk in started.chunks:
+                        yield chunk
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                await started.close(error)
+            return
+
+    def _start(self, attempt: Attempt, tried: list[str]) -> "_StartedAttempt":
+        endpoint = self.pool.acquire(exclude=tried)
+        tried.append(endpoint.name)
+        try:
+            return _StartedAttempt(endpoint, attempt, self.admission)
+        except BaseException as e:
+            endpoint.finish_call(call_outcome(e))
+            raise
+
+    def _observe(self, started: "_StartedAttempt") -> None:
+        # From the admission: a busy local limiter must not make the endpoint look slow
+        elapsed = time.perf_counter() - started.admitted_at
+        self.first_chunk_times.observe(elapsed)
+        started.endpoint.health.observe_first_chunk(elapsed)
+
+    async def _first_chunk(self, attempt: Attempt, tried: list[str]) -> "_StartedAttempt":
+        """Start an attempt, hedged if it is slow, and wait for its first chunk.
+
+        Returns:
+            _StartedAttempt: The attempt that produced the first chunk, whose
+            stream is positioned after that chunk.
+        """
+        primary = self._start(attempt, tried)
+        delay = self.hedge_delay()
+        if delay is not None:
+            try:
+                # A call waiting for an admission slot is not slow upstream: no hedge meanwhile.
+                # asyncio.wait does not cancel the attempt if the caller is cancelled meanwhile
+                await asyncio.wait({primary.admission})
+                done, _ = await asyncio.wait({primary.task}, timeout=delay)
+            except BaseException as e:
+                await primary.close(e)
+                raise
+            if not done:
+                try:
+                    hedge = self._start(attempt, tried)
+                except CircuitOpenError:
+                    # No endpoint can take the hedge; keep waiting for the first attempt
+                    hedge = None
+                except BaseException as e:
+                    await primary.close(e)
+                    raise
+                if hedge is not None:
+                    return await self._race(primary, hedge)
+
+        try:
+            await primary.task
+        except BaseException as e:
+            await primary.close(e)
+            raise
+        self._observe(primary)
+        return primary
+
+    async def _race(self, primary: "_StartedAttempt", hedge: "_StartedAttempt") -> "_StartedAttempt":
+        llm_hedged_calls_total.labels(upstream=hedge.endpoint.name, outcome="fired").inc()
+        pending = {primary.task: primary, hedge.task: hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    started = pending.pop(task)
+                    if task.exception() is not None:
+                        # The other attempt may still succeed
+                        error = task.exception()
+                        await started.close(error)
+                        continue
+                    if started is hedge:
+                        llm_hedged_calls_total.labels(upstream=hedge.endpoint.name, outcome="won").inc()
+                    self._observe(started)
+                    return started
+            raise error
+        finally:
+            for loser in pending.values():
+                await loser.close(asyncio.CancelledError())
+
+
+class _StartedAttempt:
+    """An attempt whose first chunk is awaited in its own task, so it can be raced.
+
+    The admission slot, if any, is taken in its own task too, and held until the
+    attempt is closed.
+    """
+
+    def __init__(self, endpoint: LLMEndpoint, attempt: Attempt, admission: Optional[Admission] = None):
+        self.endpoint = endpoint
+        self.admitted_at = time.perf_counter()
+        self._slot = AsyncExitStack()
+        self.chunks = aiter(attempt(endpoint))
+        self.admission = asyncio.ensure_future(self._admit(admission))
+        self.task = asyncio.ensure_future(self._first_chunk())
+        self._closed = False
+
+    async def _admit(self, admission: Optional[Admission]) -> None:
+        if admission is not None:
+            await self._slot.enter_async_context(admission())
+        self.admitted_at = time.perf_counter()
+
+    async def _first_chunk(self) -> Optional[AIMessageChunk]:
+        await self.admission
+        return await anext(self.chunks, None)
+
+    @property
+    def first_chunk(self) -> Optional[AIMessageChunk]:
+        return self.task.result()
+
+    async def close(self, error: Optional[BaseException]) -> None:
+        """Stop the attempt and report how it ended to its endpoint.
+
+        Args:
+            error: What ended the attempt, None if it completed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for task in (self.task, self.admission):
+            if not task.done():
+                task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        try:
+            await self.chunks.aclose()
+        finally:
+            try:
+                await self._slot.aclose()
+            finally:
+                self.endpoint.finish_call(call_outcome(error))
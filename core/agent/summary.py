@@ -0,0 +1,170 @@
+"""This file contains the rolling summary of older conversation turns.
+
+Instead of dropping the turns that no longer fit in the prompt, the older part
+of a conversation is compressed into a running summary stored in the graph
+state next to the messages. The summary is cached there across runs and only
+refreshed once ``SUMMARIZATION_REFRESH_TURNS`` new turns have moved out of the
+recent window, so most graph runs make no summarization call at all.
+
+The messages themselves are never removed from the state: the chat history API
+still returns the whole conversation, and only the prompt sent to the model
+replaces the summarized turns with their summary.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+
+from configs import config
+from core.admission import llm_admission
+from core.agent.llm_pool import LLMEndpoint, LLMPool
+from core.agent.resilience import ResilientLLMCaller
+from core.agent.token_counter import TokenCounter
+from core.metrics import llm_inference_duration_seconds, observe_llm_stream
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages below. Keep the facts, names, numbers, "
+    "decisions, open questions and user preferences the assistant needs to continue the "
+    "conversation; drop small talk. Answer with the updated summary only."
+)
+
+
+def history_fingerprint(messages: Sequence[BaseMessage]) -> str:
+    """Identify a conversation prefix by the content of its messages.
+
+    Message IDs cannot be used: in "full" history mode the client resends the
+    conversation and every message gets a new ID.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for message in messages:
+        digest.update(message.type.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(TokenCounter._message_text(message).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def summary_message(summary: str) -> SystemMessage:
+    """Render the running summary as a message placed before the recent turns."""
+
+    return SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+
+
+class ConversationSummarizer:
+    """Keep the running summary of a conversation up to date.
+
+    Args:
+        token_counter: Counter of the agent, shared so messages are tokenized once.
+        llm_pool: Pool of the agent; summaries are written on the same
+            backends, whose health and load they share.
+    """
+
+    def __init__(self, token_counter: TokenCounter, llm_pool: LLMPool):
+        self.token_counter = token_counter
+        self.model = config.SUMMARIZATION_MODEL or config.LLM_MODEL
+        # Plain model without tools, deterministic so equal histories get equal summaries
+        self.llm_pool = llm_pool.derive(
+            model=config.SUMMARIZATION_MODEL,
+            temperature=0,
+            max_tokens=config.SUMMARIZATION_MAX_TOKENS,
+            stream_usage=True,
+            max_retries=0,
+        )
+        # Retried like chat calls, but never hedged: nobody waits on a summary's first token
+        self.caller = ResilientLLMCaller(self.llm_pool, hedge_quantile=None, admission=llm_admission.slot)
+
+    @staticmethod
+    def _turn_starts(messages: Sequence[BaseMessage]) -> list[int]:
+        return [index for index, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+    async def update(
+        self, messages: Sequence[BaseMessage], summary: str, summarized_count: int, summary_fingerprint: str
+    ) -> dict[str, Any]:
+        """Refresh the summary stored in the state if enough turns accumulated.
+
+        Args:
+            messages: The whole conversation, oldest first.
+            summary: The summary currently stored in the state.
+            summarized_count: Number of leading messages covered by ``summary``.
+            summary_fingerprint: Fingerprint of those messages.
+
+        Returns:
+            dict: The state update, empty if the stored summary is kept as is.
+        """
+        reset: dict[str, Any] = {}
+        if summarized_count and (
+            summarized_count > len(messages)
+            or history_fingerprint(messages[:summarized_count]) != summary_fingerprint
+        ):
+            # The client replaced the history; the summary describes another conversation
+            logger.info("conversation_summary_discarded", summarized_count=summarized_count)
+            summary, summarized_count = "", 0
+            reset = {"summary": "", "summarized_count": 0, "summary_fingerprint": ""}
+
+        turn_starts = self._turn_starts(messages)
+        if len(turn_starts) <= config.SUMMARIZATION_KEEP_TURNS:
+            return reset
+
+        # Everything before the recent window may be summarized
+        boundary = turn_starts[-config.SUMMARIZATION_KEEP_TURNS]
+        new_turns = sum(1 for start in turn_starts if summarized_count <= start < boundary)
+        if summarized_count:
+            if new_turns < config.SUMMARIZATION_REFRESH_TURNS:
+                return reset
+        elif self.token_counter(messages) <= config.SUMMARIZATION_TRIGGER_TOKENS:
+            # Short conversations are sent as they are
+            return reset
+
+        try:
+            new_summary = await self._summarize(summary, messages[summarized_count:boundary])
+        except Exception as e:
+            # The prompt falls back to the previous summary and history trimming
+            logger.warning("conversation_summary_failed", error=str(e))
+            return reset
+
+        logger.info(
+            "conversation_summary_updated",
+            summarized_count=boundary,
+            new_turns=new_turns,
+            summary_tokens=self.token_counter.count_message(AIMessage(content=new_summary)),
+        )
+        return {
+            "summary": new_summary,
+            "summarized_count": boundary,
+            "summary_fingerprint": history_fingerprint(messages[:boundary]),
+        }
+
+    async def _summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        transcript = "\n".join(
+            f"{message.type}: {TokenCounter._message_text(message)}"
+            for message in messages
+            if message.type in ("human", "ai", "tool")
+        )
+        prompt = [
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(
+                content=f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+            ),
+        ]
+
+        async def attempt(endpoint: LLMEndpoint):
+            async for chunk in observe_llm_stream(endpoint.llm.astream(prompt), endpoint.model):
+                yield chunk
+
+        response: Optional[AIMessageChunk] = None
+        with llm_inference_duration_seconds.labels(model=self.model).time():
+            async for chunk in self.caller.stream(attempt):
+                response = chunk if response is None else response + chunk
+
+        content = response.content if response is not None else ""
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        if not content.strip():
+            raise ValueError("empty summary")
+        return content.strip()
@@ -0,0 +1,135 @@
+"""This file contains the local token counter used to trim conversation history."""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from configs import config
+from libs.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-message overhead of the chat format (role and separators), as counted by OpenAI
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+
+
+class TokenCounter:
+    """Count message tokens locally with a memoized per-message cache.
+
+    Counts are computed with a tiktoken encoding loaded once at construction and
+    cached by a hash of the message's role, content and tool calls, so a message
+    is tokenized only the first time it is seen rather than on every graph step.
+    If the encoding cannot be loaded (e.g. no network and no local cache), a
+    character-based estimate is used instead so counting never leaves the process.
+
+    Instances are also callable on a list of messages, which makes them usable as
+    ``token_counter`` for ``langchain_core.messages.trim_messages``.
+    """
+
+    def __init__(self, model: str, max_entries: int = config.TOKEN_COUNT_CACHE_SIZE):
+        """Initialize the counter.
+
+        Args:
+            model: The model name, used to pick the tiktoken encoding.
+            max_entries: Maximum number of per-message counts to cache.
+        """
+        self._encode = self._load_encoder(model)
+        self._max_entries = max_entries
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    @staticmethod
+    def _load_encoder(model: str) -> Callable[[str], int]:
+        """Load the tokenizer for ``model``, falling back to an estimate."""
+
+        if config.TOKENIZER_CACHE_DIR:
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", config.TOKENIZER_CACHE_DIR)
+
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(config.TOKENIZER_ENCODING)
+        except Exception as e:
+            logger.warning("tokenizer_unavailable_using_estimate", model=model, error=str(e))
+            # Roughly four characters per token for English text
+            return lambda text: (len(text) + 3) // 4
+
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    @staticmethod
+    def _message_text(message: BaseMessage) -> str:
+        """Flatten the parts of a message that are sent to the model."""
+
+        content = message.content
+        text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, sort_keys=True)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            text += json.dumps(
+                [(tool_call["name"], tool_call["args"]) for tool_call in message.tool_calls],
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+        return text
+
+    def count_message(self, message: BaseMessage) -> int:
+        """Count the tokens of a single message, using the cache when possible."""
+
+        text = self._message_text(message)
+        key = hashlib.blake2b(
+            f"{message.type}\0{message.name or ''}\0{text}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+        count = self._cache.get(key)
+        if count is not None:
+            self._cache.move_to_end(key)
+            return count
+
+        count = TOKENS_PER_MESSAGE + self._encode(text)
+        if message.name:
+            count += TOKENS_PER_NAME
+
+        self._cache[key] = count
+        if len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+        return count
+
+    def __call__(self, messages: Sequence[BaseMessage]) -> int:
+        """Count the tokens of a list of messages."""
+
+        return sum(self.count_message(message) for message in messages)
+
+    def trim(self, messages: Sequence[BaseMessage], max_tokens: int) -> list[BaseMessage]:
+        """Keep the most recent messages that fit in ``max_tokens``.
+
+        Equivalent to ``trim_messages(strategy="last", start_on="human",
+        allow_partial=False)``, but walks the history once from the end instead
+        of recounting candidate prefixes, stopping as soon as the budget is spent.
+
+        Args:
+            messages: The conversation history, oldest first.
+            max_tokens: The token budget for the kept messages.
+
+        Returns:
+            list[BaseMessage]: The kept messages, starting on a human message.
+        """
+        total = 0
+        start = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            total += self.count_message(messages[index])
+            if total > max_tokens:
+                break
+            start = index
+
+        # The kept window must start on a human turn, so that it never opens with
+        # an orphaned tool result or assistant reply
+        while start < len(messages) and not isinstance(messages[start], HumanMessage):
+            start += 1
+
+        return list(messages[start:])
+
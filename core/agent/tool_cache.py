@@ -0,0 +1,57 @@
+"""This file contains the result cache for idempotent tools."""
+
+import hashlib
+import json
+from typing import Any
+
+from langchain_core.tools import BaseTool
+
+from configs import config
+from core.agent.cache import TieredCache
+
+
+class ToolResultCache:
+    """Cache of tool results keyed by tool name and canonicalized arguments.
+
+    Only tools that opt in are cached, by carrying ``{"idempotent": True}`` in their
+    ``metadata`` (e.g. ``StructuredTool.from_function(..., metadata={"idempotent": True})``
+    or ``my_tool.metadata = {"idempotent": True}``): a cached result is returned
+    without executing the tool, which is only correct for tools without side
+    effects whose result does not change within the TTL.
+    """
+
+    def __init__(self):
+        self.enabled = config.TOOL_CACHE_ENABLED
+        self._cache = TieredCache(
+            namespace="tool",
+            max_entries=config.TOOL_CACHE_MAX_ENTRIES,
+            ttl=config.TOOL_CACHE_TTL,
+            shared=config.TOOL_CACHE_SHARED,
+        )
+
+    def is_cacheable(self, tool: BaseTool) -> bool:
+        """Whether results of ``tool`` may be served from the cache."""
+
+        return self.enabled and bool((tool.metadata or {}).get("idempotent"))
+
+    @staticmethod
+    def make_key(tool_name: str, args: Any) -> str:
+        """Build the cache key from the tool name and its canonicalized arguments."""
+
+        canonical_args = json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{tool_name}\0{canonical_args}".encode("utf-8")).hexdigest()
+
+    async def aget(self, tool_name: str, args: Any) -> Any:
+        """Return the cached result of a call, or ``libs.cache.MISSING``."""
+
+        return await self._cache.aget(self.make_key(tool_name, args))
+
+    async def aset(self, tool_name: str, args: Any, result: Any) -> None:
+        """Cache the result of a successful call if it is JSON serializable."""
+
+        try:
+            json.dumps(result)
+        except (TypeError, ValueError):
+            return
+        await self._cache.aset(self.make_key(tool_name, args), result)
+
@@ -0,0 +1,312 @@
+"""Prometheus metrics for the application.
+
+Metrics are process-local by default. For multi-worker deployments set the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable to an empty, writable
+directory before the workers start: every worker then writes its samples to
+memory-mapped files there and ``/metrics`` aggregates them across workers.
+"""
+
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessageChunk
+
+# Latencies of LLM calls range from sub-second cache replays to long generations
+LLM_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+TOOL_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+llm_inference_duration_seconds = Histogram(
+    "llm_inference_duration_seconds",
+    "Time spent waiting for an LLM response in the chat node, cache hits excluded",
+    ["model"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+
+llm_time_to_first_token_seconds = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending an upstream LLM request to receiving its first chunk",
+    ["model"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+
+llm_prompt_tokens_total = Counter(
+    "llm_prompt_tokens_total",
+    "Prompt tokens sent upstream, counted once per upstream call",
+    ["model"],
+)
+
+llm_completion_tokens_total = Counter(
+    "llm_completion_tokens_total",
+    "Completion tokens received from upstream, counted once per upstream call",
+    ["model"],
+)
+
+llm_call_retries_total = Counter(
+    "llm_call_retries_total",
+    "Upstream LLM calls retried after a transient error, by error type",
+    ["upstream", "error"],
+)
+
+llm_hedged_calls_total = Counter(
+    "llm_hedged_calls_total",
+    "Hedged attempts of slow upstream LLM calls (fired) and how many of them answered first (won)",
+    ["upstream", "outcome"],
+)
+
+llm_cache_requests_total = Counter(
+    "llm_cache_requests_total",
+    "LLM calls looked up in the response cache (hit, miss) or sent upstream without a lookup on request (bypass)",
+    ["result"],
+)
+
+llm_coalesced_calls_total = Counter(
+    "llm_coalesced_calls_total",
+    "LLM calls that started an upstream call (leader) or shared one already in flight (follower)",
+    ["role"],
+)
+
+llm_endpoint_requests_total = Counter(
+    "llm_endpoint_requests_total",
+    "Upstream LLM call attempts by endpoint and outcome (ok, error, rejected, cancelled)",
+    ["endpoint", "outcome"],
+)
+
+llm_endpoint_outstanding_calls = Gauge(
+    "llm_endpoint_outstanding_calls",
+    "Upstream LLM calls in flight, by endpoint",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+
+# 0 closed, 1 half-open, 2 open; the worst state over the workers is reported
+llm_circuit_state = Gauge(
+    "llm_circuit_state",
+    "State of the circuit breaker of an LLM upstream",
+    ["circuit"],
+    multiprocess_mode="max",
+)
+
+tool_call_duration_seconds = Histogram(
+    "tool_call_duration_seconds",
+    "Execution time of tool calls, cache hits excluded",
+    ["tool", "status"],
+    buckets=TOOL_LATENCY_BUCKETS,
+)
+
+graph_node_duration_seconds = Histogram(
+    "graph_node_duration_seconds",
+    "Execution time of graph steps, by node; the count is the number of steps executed",
+    ["node"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+
+graph_run_phase_seconds = Histogram(
+    "graph_run_phase_seconds",
+    "Time a graph run spent in each phase (llm, tools, checkpoint, router) and in total",
+    ["phase"],
+    buckets=(0.001, 0.005, 0.01, 0.025) + LLM_LATENCY_BUCKETS,
+)
+
+graph_run_iterations = Histogram(
+    "graph_run_iterations",
+    "Model -> tools -> model loop iterations per graph run",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21),
+)
+
+checkpoint_write_duration_seconds = Histogram(
+    "checkpoint_write_duration_seconds",
+    "Time spent writing checkpoints, by checkpointer operation",
+    ["operation"],
+    buckets=TOOL_LATENCY_BUCKETS,
+)
+
+llm_admission_rejections_total = Counter(
+    "llm_admission_rejections_total",
+    "Chat requests and LLM calls rejected by admission control, by limit hit",
+    ["reason"],
+)
+
+llm_admission_wait_seconds = Histogram(
+    "llm_admission_wait_seconds",
+    "Time LLM calls waited for a concurrency slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+llm_admission_in_flight = Gauge(
+    "llm_admission_in_flight",
+    "LLM calls holding a concurrency slot",
+    multiprocess_mode="livesum",
+)
+
+llm_admission_queue_length = Gauge(
+    "llm_admission_queue_length",
+    "LLM calls waiting for a concurrency slot",
+    multiprocess_mode="livesum",
+)
+
+password_hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "Time password operations took, waiting for a hashing thread included",
+    ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+password_hash_pending = Gauge(
+    "password_hash_pending",
+    "Password operations running or waiting for a hashing thread",
+    multiprocess_mode="livesum",
+)
+
+# Pool gauges are summed over the live workers in multiprocess mode
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Connections of a database pool, by state",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+
+db_pool_waiting_requests = Gauge(
+    "db_pool_waiting_requests",
+    "Requests currently waiting for a connection",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+db_pool_requests_total = Counter(
+    "db_pool_requests_total",
+    "Connection requests served by a database pool",
+    ["pool"],
+)
+
+db_pool_wait_seconds_total = Counter(
+    "db_pool_wait_seconds_total",
+    "Cumulative time requests spent waiting for a connection",
+    ["pool"],
+)
+
+db_pool_errors_total = Counter(
+    "db_pool_errors_total",
+    "Connection requests that failed, e.g. on timeout",
+    ["pool"],
+)
+
+
+def is_multiprocess() -> bool:
+    """Whether metrics are aggregated across worker processes."""
+
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: The exposition payload and its content type.
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """Drop the live gauges of an exiting worker from the aggregation."""
+
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+async def observe_llm_stream(
+    chunks: AsyncIterator["AIMessageChunk"], model: str
+) -> AsyncIterator["AIMessageChunk"]:
+    """Pass an upstream LLM stream through, recording its TTFT and token usage.
+
+    Token counts are taken from the usage metadata reported by the provider, so
+    wrap the upstream stream itself (not a coalesced subscriber) to count every
+    upstream call exactly once.
+
+    Args:
+        chunks: The chunks streamed by the chat model.
+        model: The model name used as metric label.
+
+    Yields:
+        AIMessageChunk: The chunks, unchanged.
+    """
+    start = time.perf_counter()
+    first_chunk = True
+    input_tokens = output_tokens = 0
+    try:
+        async for chunk in chunks:
+            if first_chunk:
+                llm_time_to_first_token_seconds.labels(model=model).observe(time.perf_counter() - start)
+                first_chunk = False
+            if chunk.usage_metadata:
+                input_tokens += chunk.usage_metadata.get("input_tokens", 0)
+                output_tokens += chunk.usage_metadata.get("output_tokens", 0)
+            yield chunk
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        if input_tokens:
+            llm_prompt_tokens_total.labels(model=model).inc(input_tokens)
+        if output_tokens:
+            llm_completion_tokens_total.labels(model=model).inc(output_tokens)
+
+
+class PoolMetricsSampler:
+    """Copy pool statistics of this worker into the pool metrics.
+
+    Pool libraries expose cumulative counters; the sampler remembers the last
+    values seen so it can increment the Prometheus counters by the difference.
+    """
+
+    def __init__(self):
+        self._last: dict[tuple[str, str], float] = {}
+
+    def _inc_by_delta(self, counter: Counter, pool: str, name: str, value: float) -> None:
+        previous = self._last.get((pool, name), 0)
+        # A smaller value means the pool was recreated and its counters restarted
+        delta = value - previous if value >= previous else value
+        if delta:
+            counter.labels(pool=pool).inc(delta)
+        self._last[(pool, name)] = value
+
+    def sample_psycopg(self, pool: str, stats: dict[str, Any]) -> None:
+        """Record stats as returned by ``ext_db_pool.get_pool_stats``."""
+
+        if not stats:
+            return
+        db_pool_connections.labels(pool=pool, state="in_use").set(stats["in_use"])
+        db_pool_connections.labels(pool=pool, state="idle").set(stats["available"])
+        db_pool_connections.labels(pool=pool, state="max").set(stats["max_size"])
+        db_pool_waiting_requests.labels(pool=pool).set(stats["waiting"])
+        self._inc_by_delta(db_pool_requests_total, pool, "requests", stats["requests_num"])
+        self._inc_by_delta(db_pool_wait_seconds_total, pool, "wait", stats["requests_wait_ms"] / 1000)
+        self._inc_by_delta(db_pool_errors_total, pool, "errors", stats["requests_errors"])
+
+    def sample_sqlalchemy(self, pool: str, sa_pool: Any, max_size: int) -> None:
+        """Record the state of a SQLAlchemy ``QueuePool``.
+
+        SQLAlchemy does not track checkout wait time, so only utilization is
+        reported for these pools.
+        """
+        db_pool_connections.labels(pool=pool, state="in_use").set(sa_pool.checkedout())
+        db_pool_connections.labels(pool=pool, state="idle").set(sa_pool.checkedin())
+        db_pool_connections.labels(pool=pool, state="overflow").set(max(sa_pool.overflow(), 0))
+        db_pool_connections.labels(pool=pool, state="max").set(max_size)
@@ -0,0 +1,48 @@
+# extensions/ext_agent.py
+
+import importlib
+import logging
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI, HTTPException, Request
+
+if TYPE_CHECKING:
+    from core.agent.graph_agent_base import BaseGraphAgent
+
+logger = logging.getLogger(__name__)
+
+# LangChain / LangGraph / OpenAI 客户端导入很慢，只在 lifespan 中加载，不在 import app 时加载
+AGENT_MODULE = "core.agent.normal_agent"
+
+def is_enabled() -> bool:
+    return True
+
+def preload():
+    # 在线程中提前导入，与其他扩展的启动工作（如连接池建连）并行
+    importlib.import_module(AGENT_MODULE)
+
+async def init_app(app: FastAPI):
+    from core.agent.normal_agent import NormalAgent
+
+    # 在 lifespan 中构建 agent 和 LLM 客户端，并编译图、执行 checkpointer.setup()，首批请求不再承担冷启动开销
+    agent = NormalAgent(tools=[])
+    try:
+        await agent.create_graph()
+    except Exception:
+        # 编译失败时不阻断启动：/ready 会一直返回 503，首个请求会在锁保护下重试编译
+        logger.exception("Agent graph compilation failed at startup")
+
+    app.state.agent = agent
+
+    logger.info(f"Agent graph warm: {agent.is_ready}")
+
+def get_agent(request: Request) -> "BaseGraphAgent":
+    """FastAPI dependency returning the agent built during startup.
+
+    Raises:
+        HTTPException: 503 if the application has not finished starting up.
+    """
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None:
+        raise HTTPException(status_code=503, detail="Agent is not initialized.")
+    return agent
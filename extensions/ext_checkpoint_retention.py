@@ -0,0 +1,53 @@
+# extensions/ext_checkpoint_retention.py
+
+import asyncio
+import logging
+import random
+from typing import Optional
+
+from fastapi import FastAPI
+
+from configs import config
+from extensions import ext_db_pool
+
+logger = logging.getLogger(__name__)
+
+_retention_task: Optional[asyncio.Task] = None
+
+
+def is_enabled() -> bool:
+    # 检查点只保存在 PostgreSQL 中，依赖 ext_db_pool 的连接池
+    return config.CHECKPOINT_RETENTION_ENABLED and ext_db_pool.is_enabled()
+
+
+async def _run_forever() -> None:
+    from core.agent.checkpoint_retention import CheckpointRetention
+
+    # 随机错开各 worker 的首次执行；同一时刻只有拿到 advisory lock 的 worker 真正执行清理
+    await asyncio.sleep(random.uniform(0, config.CHECKPOINT_RETENTION_INTERVAL))
+    while True:
+        try:
+            if ext_db_pool.db_pool is not None:
+                await CheckpointRetention(ext_db_pool.db_pool).run_once()
+        except Exception:
+            logger.exception("Checkpoint retention pass failed")
+        await asyncio.sleep(config.CHECKPOINT_RETENTION_INTERVAL)
+
+
+def init_app(app: FastAPI):
+    global _retention_task
+
+    _retention_task = asyncio.create_task(_run_forever())
+    logger.info(f"Checkpoint retention scheduled every {config.CHECKPOINT_RETENTION_INTERVAL}s")
+
+
+async def shutdown_app(app: FastAPI):
+    global _retention_task
+
+    if _retention_task is not None:
+        _retention_task.cancel()
+        try:
+            await _retention_task
+        except asyncio.CancelledError:
+            pass
+        _retention_task = None
@@ -1,27 +1,80 @@
-import os 
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from sqlmodel import create_engine 
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import QueuePool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from configs import config
 
+# Sync driver -> asyncio driver used when DATABASE_ASYNC_MODE is on
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
 def is_enabled() -> bool:
     return True 
 
-def init_app(app: FastAPI):
-    
+def get_async_url(url: str) -> str:
+    """Rewrite a database URL to use an asyncio-capable driver."""
+
+    sa_url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(sa_url.drivername, sa_url.drivername)
+    return sa_url.set(drivername=drivername).render_as_string(hide_password=False)
 
-    engine = create_engine(
-        config.DATABASE_URL,
+def init_app(app: FastAPI):
+    pool_options = dict(
         pool_pre_ping=True,
-        poolclass=QueuePool,
         pool_size=config.DATABASE_POOL_SIZE,
         max_overflow=config.DATABASE_MAX_OVERFLOW,
-        pool_timeout=30,  # Connection timeout (seconds)
-        pool_recycle=1800,  # Recycle connections after 30 minutes
+        pool_timeout=config.DATABASE_POOL_TIMEOUT,  # Connection timeout (seconds)
+        pool_recycle=config.DATABASE_POOL_RECYCLE,  # Recycle connections after 30 minutes by default
     )
 
+    if config.DATABASE_ASYNC_MODE:
+        engine = create_async_engine(
+            get_async_url(config.DATABASE_URL),
+            poolclass=AsyncAdaptedQueuePool,
+            **pool_options,
+        )
+        # expire_on_commit=False 让提交后的对象仍可在响应中直接读取，不会触发隐式 IO
+        app.state.session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+    else:
+        engine = create_engine(
+            config.DATABASE_URL,
+            poolclass=QueuePool,
+            **pool_options,
+        )
+        app.state.session_factory = None
+
     app.state.engine = engine 
 
-    
\ No newline at end of file
+async def shutdown_app(app: FastAPI):
+    engine = getattr(app.state, "engine", None)
+    if isinstance(engine, AsyncEngine):
+        await engine.dispose()
+    elif engine is not None:
+        engine.dispose()
+
+async def get_db_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding a request-scoped AsyncSession.
+
+    The session is closed (and its connection returned to the pool) when the
+    request finishes.
+
+    Raises:
+        RuntimeError: If the database extension runs in synchronous mode.
+    """
+    session_factory = getattr(request.app.state, "session_factory", None)
+    if session_factory is None:
+        raise RuntimeError("AsyncSession requires DATABASE_ASYNC_MODE to be enabled")
+
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,103 @@
+# extensions/ext_db_pool.py
+
+import logging
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import FastAPI
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.engine import make_url
+
+from configs import config
+
+logger = logging.getLogger(__name__)
+
+# 每个 worker 进程只有一个共享连接池，由 lifespan 负责打开和关闭
+db_pool: Optional[AsyncConnectionPool] = None
+
+def is_enabled() -> bool:
+    # 未配置数据库时跳过连接池，make_url 无法解析空字符串
+    if not config.DATABASE_URL:
+        return False
+    return make_url(config.DATABASE_URL).get_backend_name() == "postgresql"
+
+def get_conninfo(url: str) -> str:
+    """Turn a SQLAlchemy database URL into a libpq connection string."""
+
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+async def init_app(app: FastAPI):
+    global db_pool
+
+    pool = AsyncConnectionPool(
+        get_conninfo(config.DATABASE_URL),
+        min_size=config.PSYCOPG_POOL_MIN_SIZE,
+        max_size=max(config.PSYCOPG_POOL_MAX_SIZE, config.PSYCOPG_POOL_MIN_SIZE),
+        timeout=config.PSYCOPG_POOL_TIMEOUT,
+        max_idle=config.PSYCOPG_POOL_MAX_IDLE,
+        name="app",
+        open=False,
+        # AsyncPostgresSaver 要求 autocommit、dict_row，并关闭服务端 prepared statements
+        kwargs={
+            "autocommit": True,
+            "prepare_threshold": 0,
+            "row_factory": dict_row,
+        },
+    )
+    # wait=True 会在启动阶段预热 min_size 个连接，避免首批请求承担建连开销
+    await pool.open(wait=True, timeout=config.PSYCOPG_POOL_OPEN_TIMEOUT)
+
+    db_pool = pool
+    app.state.db_pool = pool
+
+    logger.info(f"Psycopg pool opened: {get_pool_stats()}")
+
+async def shutdown_app(app: FastAPI):
+    global db_pool
+
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
+
+def get_pool_stats() -> dict[str, Any]:
+    """Return a snapshot of the shared pool's utilization.
+
+    Returns:
+        dict: Pool size, connections in use and available, requests waiting,
+        and cumulative request/wait counters. Empty if the pool is not open.
+    """
+    if db_pool is None:
+        return {}
+
+    stats = db_pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    requests_num = stats.get("requests_num", 0)
+    requests_wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "min_size": stats.get("pool_min", 0),
+        "max_size": stats.get("pool_max", 0),
+        "size": size,
+        "available": available,
+        "in_use": size - available,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests_num": requests_num,
+        "requests_queued": stats.get("requests_queued", 0),
+        "requests_errors": stats.get("requests_errors", 0),
+        "requests_wait_ms": requests_wait_ms,
+        "avg_wait_ms": requests_wait_ms / requests_num if requests_num else 0.0,
+        "connections_num": stats.get("connections_num", 0),
+    }
+
+async def get_db_connection() -> AsyncIterator[AsyncConnection]:
+    """FastAPI dependency yielding a connection from the shared pool.
+
+    Raises:
+        RuntimeError: If the pool is not open (no PostgreSQL database configured).
+    """
+    if db_pool is None:
+        raise RuntimeError("The shared psycopg pool is not available")
+
+    async with db_pool.connection() as conn:
+        yield conn
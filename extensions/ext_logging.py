@@ -1,49 +1,103 @@
 # extensions/ext_logging.py
 
 import logging
+import queue
+from typing import Optional
+
 from fastapi import FastAPI
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from configs import config
+from configs.deploy import Environment
+from libs.logger import ContextQueueHandler, JSONFormatter, KeyValueFormatter, SamplingFilter
+
+_queue_handler: Optional[ContextQueueHandler] = None
+_listener: Optional[QueueListener] = None
+# init_app 之前 root logger 上的 handler，shutdown_app 时原样恢复
+_previous_handlers: list[logging.Handler] = []
+# shutdown_app 为关闭之后的日志临时加上的控制台 handler，下次 init_app 时移除
+_fallback_handler: Optional[logging.Handler] = None
+
+_DEFAULT_LEVELS = {
+    Environment.DEVELOPMENT: logging.DEBUG,
+    Environment.TEST: logging.WARNING,
+}
+
 
 def is_enabled() -> bool:
     return True
 
+
+def get_log_level() -> int:
+    if config.LOG_LEVEL:
+        return logging.getLevelName(config.LOG_LEVEL)
+    return _DEFAULT_LEVELS.get(config.ENVIRONMENT, logging.INFO)
+
+
 def init_app(app: FastAPI):
-    log_level = logging.INFO
+    global _queue_handler, _listener, _previous_handlers, _fallback_handler
+
+    root_logger = logging.getLogger()
+    if _fallback_handler is not None:
+        root_logger.removeHandler(_fallback_handler)
+        _fallback_handler = None
+    _previous_handlers = list(root_logger.handlers)
 
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] [%(name)s] - %(message)s"
-    )
+    formatter = JSONFormatter() if config.LOG_FORMAT == "json" else KeyValueFormatter()
 
     # 控制台输出
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
+    handlers: list[logging.Handler] = [console_handler]
 
     # 文件输出
-    file_handler = RotatingFileHandler(
-        filename="app.log",
-        maxBytes=10 * 1024 * 1024,
-        backupCount=5
-    )
-    file_handler.setFormatter(formatter)
+    if config.LOG_FILE:
+        file_handler = RotatingFileHandler(
+            filename=config.LOG_FILE,
+            maxBytes=config.LOG_FILE_MAX_BYTES,
+            backupCount=config.LOG_FILE_BACKUP_COUNT,
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # 请求路径上只把日志放进内存队列，格式化和控制台/磁盘 I/O 都在后台线程里完成
+    _queue_handler = ContextQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATES))
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
 
     # 设置日志
-    root_logger = logging.getLogger()
-    root_logger.setLevel(log_level)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    root_logger.setLevel(get_log_level())
+    root_logger.addHandler(_queue_handler)
 
     logging.getLogger().info("Logging has been initialized.")
 
-def shutdown_app(app: FastAPI):
-    logging.getLogger().info("Shutting down logging.")
-
 
-# TODO
-
-# JSON 日志格式化？
-
-# 每个模块单独日志文件？
+def shutdown_app(app: FastAPI):
+    global _queue_handler, _listener, _fallback_handler
 
-# 根据 ENV 切换日志级别？
+    logging.getLogger().info("Shutting down logging.")
+    if _queue_handler is None:
+        return
 
-# 添加错误捕获日志（全局异常处理）？
\ No newline at end of file
+    root_logger = logging.getLogger()
+    root_logger.removeHandler(_queue_handler)
+    # stop() 会先写完队列里剩余的日志
+    _listener.stop()
+    for handler in _listener.handlers:
+        if isinstance(handler, RotatingFileHandler):
+            handler.close()
+        elif not _previous_handlers:
+            # 原本没有 handler 时，关闭之后的日志（如 "Application shutdown complete"）直接同步输出到控制台
+            _fallback_handler = handler
+    # 恢复 init_app 之前的 handler，重复 init/shutdown 不会累积 handler
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    for handler in _previous_handlers:
+        root_logger.addHandler(handler)
+    if _fallback_handler is not None:
+        root_logger.addHandler(_fallback_handler)
+    if _queue_handler.dropped:
+        logging.getLogger().warning(f"Dropped {_queue_handler.dropped} log records on a full queue")
+    _queue_handler = None
+    _listener = None
@@ -0,0 +1,62 @@
+# extensions/ext_metrics.py
+
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import FastAPI
+
+from configs import config
+from core import metrics
+from extensions import ext_db_pool
+
+logger = logging.getLogger(__name__)
+
+_sampler_task: Optional[asyncio.Task] = None
+
+
+def is_enabled() -> bool:
+    return config.METRICS_ENABLED
+
+
+def sample_pools(app: FastAPI, sampler: metrics.PoolMetricsSampler) -> None:
+    sampler.sample_psycopg("psycopg", ext_db_pool.get_pool_stats())
+
+    engine = getattr(app.state, "engine", None)
+    if engine is not None:
+        sa_pool = engine.pool
+        if hasattr(sa_pool, "checkedout"):
+            sampler.sample_sqlalchemy(
+                "sqlalchemy", sa_pool, config.DATABASE_POOL_SIZE + config.DATABASE_MAX_OVERFLOW
+            )
+
+
+async def _sample_forever(app: FastAPI) -> None:
+    sampler = metrics.PoolMetricsSampler()
+    while True:
+        try:
+            sample_pools(app, sampler)
+        except Exception:
+            logger.exception("Failed to sample pool metrics")
+        await asyncio.sleep(config.METRICS_POOL_SAMPLE_INTERVAL)
+
+
+async def init_app(app: FastAPI):
+    global _sampler_task
+
+    # 多 worker 部署时每个进程采样自己的连接池，由 /metrics 汇总
+    _sampler_task = asyncio.create_task(_sample_forever(app))
+    logger.info(f"Metrics enabled, multiprocess mode: {metrics.is_multiprocess()}")
+
+
+async def shutdown_app(app: FastAPI):
+    global _sampler_task
+
+    if _sampler_task is not None:
+        _sampler_task.cancel()
+        try:
+            await _sampler_task
+        except asyncio.CancelledError:
+            pass
+        _sampler_task = None
+    metrics.mark_process_dead()
@@ -0,0 +1,67 @@
+"""In-process caches."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Returned by LRUTTLCache.get on a miss, so that None can be cached as a value
+MISSING: Any = object()
+
+
+class LRUTTLCache(Generic[K, V]):
+    """A bounded LRU cache whose entries also expire after a time-to-live.
+
+    Not thread-safe; meant to be used from a single event loop. Expired entries
+    are dropped lazily when they are read or pushed out by newer entries.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept; the least recently used
+                entry is evicted when the cache is full.
+            ttl: Default time-to-live of an entry, in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Any = MISSING) -> V:
+        """Return the value for ``key``, or ``default`` if absent or expired."""
+
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds (the default TTL if omitted)."""
+
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        """Remove ``key`` from the cache if present."""
+
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+
+        self._data.clear()
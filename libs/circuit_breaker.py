@@ -0,0 +1,117 @@
+"""Circuit breaker failing calls fast while a dependency is down."""
+
+import time
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit '{name}' is open, retry after {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    The circuit is closed while calls succeed. After ``failure_threshold``
+    consecutive failures it opens, and calls fail immediately with
+    ``CircuitOpenError`` for ``reset_timeout`` seconds. It is then half-open: a
+    single probe call is let through, which closes the circuit if it succeeds
+    and opens it again if it fails.
+
+    Not thread-safe; meant to be used from a single event loop.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        on_state_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        """Initialize the breaker.
+
+        Args:
+            name: Name of the protected dependency, used in errors and logs.
+            failure_threshold: Consecutive failures opening the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe.
+            on_state_change: Called with the name and the new state on every transition.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            if self.on_state_change is not None:
+                self.on_state_change(self.name, state)
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a probe through, 0 if not open."""
+
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    @property
+    def available(self) -> bool:
+        """Whether ``before_call`` would currently let a call through."""
+
+        if self.state == self.OPEN:
+            return time.monotonic() - self._opened_at >= self.reset_timeout
+        return not (self.state == self.HALF_OPEN and self._probing)
+
+    def before_call(self) -> None:
+        """Check that a call may be made, and register it as the probe if half-open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe in flight.
+        """
+        if self.state == self.OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probing = True
+
+    def record_success(self) -> None:
+        """Report a successful call."""
+
+        self.failures = 0
+        self._probing = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Report a failed call."""
+
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._probing = False
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """Report a call that ended without telling anything about the dependency.
+
+        E.g. a call cancelled by its caller, or rejected for a bad request. A
+        half-open circuit lets the next call probe instead.
+        """
+        self._probing = False
@@ -0,0 +1,26 @@
+"""Minimal in-process latency statistics."""
+
+from collections import deque
+
+
+class RollingQuantile:
+    """Quantiles over the most recent samples of a value, e.g. a latency."""
+
+    def __init__(self, window: int = 256):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, value: float) -> None:
+        """Record one sample, forgetting the oldest one once the window is full."""
+
+        self._samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        """Return the ``q`` quantile of the samples in the window (0 if there are none)."""
+
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
@@ -0,0 +1,148 @@
+"""Structured, non-blocking logging.
+
+Application code logs events with keyword fields, structlog style::
+
+    logger = get_logger(__name__)
+    logger.info("chat_request_processed", session_id=session.id)
+
+Records are put on an in-memory queue by the calling thread and formatted and
+written by a background ``QueueListener`` thread, so the event loop never waits
+on console or disk I/O. ``extensions.ext_logging`` wires the pipeline up.
+"""
+
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Any, Mapping, MutableMapping
+
+from libs.request_context import get_request_id
+
+# Keyword arguments understood by stdlib logging itself; everything else is a field
+_LOGGING_KWARGS = frozenset({"exc_info", "stack_info", "stacklevel", "extra"})
+
+
+class StructLogger(logging.LoggerAdapter):
+    """Logger adapter accepting arbitrary keyword fields.
+
+    Fields are attached to the record as ``record.fields`` and rendered by the
+    formatters below. Disabled levels return before any field is processed.
+    """
+
+    def process(self, msg: Any, kwargs: MutableMapping[str, Any]) -> tuple[Any, MutableMapping[str, Any]]:
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _LOGGING_KWARGS}
+        if fields:
+            extra = dict(kwargs.get("extra") or {})
+            extra["fields"] = {**extra.get("fields", {}), **fields}
+            kwargs["extra"] = extra
+        return msg, kwargs
+
+
+def get_logger(name: str) -> StructLogger:
+    """Return a logger accepting keyword fields for the module ``name``."""
+
+    return StructLogger(logging.getLogger(name), {})
+
+
+class ContextQueueHandler(QueueHandler):
+    """Queue handler that captures everything depending on the caller's context.
+
+    The request ID lives in a contextvar and is only visible in the thread that
+    logs, so it is read here before the record crosses to the listener thread.
+    The message is rendered and any exception formatted now as well, since the
+    arguments may change or go away once the caller moves on. When the queue is
+    full the record is dropped and counted in ``dropped``.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Shed records rather than block the caller when the writer falls behind
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records of selected high-volume events.
+
+    Args:
+        rates: Fraction of records to keep, by event name (the log message).
+            Events not listed are always kept. Warnings and errors are never
+            sampled out.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.msg)
+        return rate is None or random.random() < rate
+
+
+def _record_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return getattr(record, "fields", None) or {}
+
+
+class JSONFormatter(logging.Formatter):
+    """Render records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            payload["request_id"] = request_id
+        payload.update(_record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Render records as human-readable lines with ``key=value`` fields."""
+
+    def __init__(self):
+        super().__init__("[%(asctime)s] [%(levelname)s] [%(name)s] - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = dict(_record_fields(record))
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            fields = {"request_id": request_id, **fields}
+        if not fields:
+            return line
+
+        head, sep, tail = line.partition("\n")
+        rendered = " ".join(f"{key}={value!r}" if isinstance(value, str) else f"{key}={value}" for key, value in fields.items())
+        return f"{head} {rendered}{sep}{tail}"
@@ -0,0 +1,89 @@
+"""Password hashing off the event loop."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import bcrypt
+
+from configs import config
+from core.metrics import password_hash_duration_seconds, password_hash_pending
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when too many hashing operations are already queued."""
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated, bounded thread pool.
+
+    A bcrypt hash takes hundreds of milliseconds by design; running it in an async
+    handler would freeze every other request of the worker, including streaming
+    responses. bcrypt releases the GIL, so the pool's threads hash in parallel with
+    the event loop. The number of operations running or queued is capped, and
+    callers beyond the cap fail fast instead of piling up behind a login burst.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, rounds: int):
+        """Initialize the hasher.
+
+        Args:
+            max_workers: Number of threads hashing concurrently.
+            max_queue: Number of operations allowed to wait for a thread.
+            rounds: bcrypt work factor (log2 of the number of iterations).
+        """
+        self.rounds = rounds
+        self._capacity = max_workers + max_queue
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password on the calling thread."""
+
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    @staticmethod
+    def verify_sync(password: str, hashed_password: str) -> bool:
+        """Check a password against a hash on the calling thread."""
+
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the hashing pool.
+
+        Raises:
+            PasswordHasherBusyError: If the pool's queue is full.
+        """
+        return await self._run("hash", self.hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against a hash in the hashing pool.
+
+        Raises:
+            PasswordHasherBusyError: If the pool's queue is full.
+        """
+        return await self._run("verify", self.verify_sync, password, hashed_password)
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._capacity:
+            raise PasswordHasherBusyError(f"{self._pending} password operations already pending")
+
+        self._pending += 1
+        password_hash_pending.inc()
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            password_hash_pending.dec()
+            # Includes the time spent waiting for a thread, which is what callers feel
+            password_hash_duration_seconds.labels(operation=operation).observe(time.perf_counter() - start)
+
+
+password_hasher = PasswordHasher(
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_queue=config.PASSWORD_HASH_MAX_QUEUE,
+    rounds=config.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,79 @@
+"""Per-request context shared with logging, plus the ASGI middleware that sets it."""
+
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Incoming IDs are echoed into headers and logs, so only short, plain tokens are accepted
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """Return the ID of the request being handled, or None outside of a request."""
+
+    return request_id_var.get()
+
+
+def new_request_id() -> str:
+    """Generate a collision-free request ID."""
+
+    return uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    """Assign a request ID and report the handling time of every HTTP request.
+
+    Implemented as plain ASGI rather than ``BaseHTTPMiddleware``: the response
+    body is passed through untouched, so streaming responses are not buffered
+    or run in a separate task, and the only per-request work is rewriting the
+    response start message.
+
+    The ID is taken from an incoming ``X-Request-ID`` header when it looks sane
+    and generated otherwise. It is stored in ``request.state.request_id`` and in
+    a contextvar for log correlation, and echoed back in the response headers
+    together with a ``Server-Timing`` entry measuring the time until the
+    response headers were sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = new_request_id()
+
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[REQUEST_ID_HEADER] = request_id
+                headers.append("Server-Timing", f"app;dur={(time.perf_counter() - start) * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,46 @@
+"""Input sanitization and validation helpers."""
+
+import re
+
+_EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}$")
+
+
+def sanitize_email(email: str) -> str:
+    """Normalize an email address and check its format.
+
+    Args:
+        email: The email address to sanitize.
+
+    Returns:
+        str: The trimmed, lower-cased email address.
+
+    Raises:
+        ValueError: If the email address is not valid.
+    """
+    email = email.strip().lower()
+    if not _EMAIL_PATTERN.match(email):
+        raise ValueError("Invalid email format.")
+    return email
+
+
+def validate_password_strength(password: str) -> bool:
+    """Check that a password is strong enough.
+
+    Args:
+        password: The password to validate.
+
+    Returns:
+        bool: True if the password is strong enough.
+
+    Raises:
+        ValueError: Describing the first unmet requirement.
+    """
+    if len(password) < 8:
+        raise ValueError("Password must be at least 8 characters long.")
+    if not re.search(r"[A-Z]", password):
+        raise ValueError("Password must contain at least one uppercase letter.")
+    if not re.search(r"[a-z]", password):
+        raise ValueError("Password must contain at least one lowercase letter.")
+    if not re.search(r"[0-9]", password):
+        raise ValueError("Password must contain at least one number.")
+    return True
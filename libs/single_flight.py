@@ -0,0 +1,117 @@
+"""Coalescing of identical concurrent calls ("single flight")."""
+
+import asyncio
+import contextvars
+from typing import AsyncIterator, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    """One upstream call whose items are recorded and fanned out to subscribers."""
+
+    def __init__(self, factory: Callable[[], AsyncIterator[T]]):
+        self.items: list[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._updated = asyncio.Event()
+        # Run in an empty context: the upstream call must not inherit the callbacks
+        # or tracing context of whichever request happened to start it
+        self.task = asyncio.get_running_loop().create_task(
+            self._run(factory), context=contextvars.Context()
+        )
+
+    async def _run(self, factory: Callable[[], AsyncIterator[T]]) -> None:
+        try:
+            async for item in factory():
+                self.items.append(item)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("the shared upstream call was cancelled")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        """Yield every item of the flight, from the first one, as they arrive."""
+
+        index = 0
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._updated.wait()
+
+
+class SingleFlight(Generic[T]):
+    """Share one upstream streaming call between concurrent callers with the same key.
+
+    The first caller for a key starts the upstream call; callers arriving while it
+    is in flight subscribe to it and receive every item from the start, so each
+    of them sees the complete stream. The upstream call is cancelled if all of its
+    subscribers go away. Once it finishes the key is released, and the next
+    caller starts a new call.
+    """
+
+    LEADER = "leader"
+    FOLLOWER = "follower"
+
+    def __init__(self, on_call: Optional[Callable[[str], None]] = None):
+        """Initialize the group.
+
+        Args:
+            on_call: Called for every caller with ``LEADER`` if it started the
+                upstream call or ``FOLLOWER`` if it joined one in flight.
+        """
+        self.on_call = on_call
+        self._flights: dict[str, _Flight[T]] = {}
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Stream the result of ``factory()``, shared with concurrent callers of ``key``.
+
+        Args:
+            key: Identifies calls that are interchangeable.
+            factory: Starts the upstream call; only invoked by the first caller.
+
+        Yields:
+            T: The items produced by the shared upstream call.
+        """
+        flight = self._flights.get(key)
+        # A finished flight stays registered until its task's done callback runs
+        if flight is None or flight.done:
+            flight = _Flight(factory)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._release(key, flight))
+            role = self.LEADER
+        else:
+            role = self.FOLLOWER
+        if self.on_call is not None:
+            self.on_call(role)
+
+        flight.subscribers += 1
+        try:
+            async for item in flight.subscribe():
+                yield item
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening anymore: stop the upstream call, and make sure
+                # a caller arriving meanwhile starts a new one instead of joining it
+                self._release(key, flight)
+                flight.task.cancel()
+
+    def _release(self, key: str, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
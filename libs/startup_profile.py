@@ -0,0 +1,109 @@
+"""Startup profiling: where the time goes between process start and readiness.
+
+Records module import times (like ``python -X importtime``, attributed to
+top-level packages) and named startup phases such as extension initialization.
+Must only depend on the standard library, since it is installed before the
+application modules are imported.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+
+class StartupProfiler:
+    """Collect import and phase timings until startup is complete.
+
+    The import hook wraps ``builtins.__import__`` and only measures modules
+    imported for the first time; ``finish`` removes it, so the running
+    application pays nothing for it.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        # Import time not spent in nested imports, by top-level package
+        self.import_self_times: dict[str, float] = defaultdict(float)
+        self._original_import: Optional[Any] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install_import_hook(self) -> None:
+        """Start measuring module imports."""
+
+        if self._original_import is not None:
+            return
+        original_import = builtins.__import__
+        self._original_import = original_import
+
+        def profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level:
+                package = (globals or {}).get("__package__") or ""
+            else:
+                # Already imported modules cost (almost) nothing, unless submodules are
+                # imported through the fromlist
+                module = sys.modules.get(name)
+                if module is not None and all(item == "*" or hasattr(module, item) for item in fromlist or ()):
+                    return original_import(name, globals, locals, fromlist, level)
+                package = name
+
+            stack = getattr(self._local, "stack", None)
+            if stack is None:
+                stack = self._local.stack = []
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - started
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self.import_self_times[package.partition(".")[0]] += elapsed - nested
+
+        builtins.__import__ = profiled_import
+
+    def remove_import_hook(self) -> None:
+        """Stop measuring module imports."""
+
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the duration of a named startup phase."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, time.perf_counter() - started))
+
+    def finish(self, top: int = 10) -> dict[str, Any]:
+        """Stop profiling and summarize startup.
+
+        Args:
+            top: Number of most expensive packages to report.
+
+        Returns:
+            dict: Total time since the profiler was created, the phase timings
+            and the slowest packages to import, in milliseconds.
+        """
+        self.remove_import_hook()
+        slowest = sorted(self.import_self_times.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "imports_ms": {package: round(seconds * 1000, 1) for package, seconds in slowest},
+        }
+
+
+# Created when the entry point is imported, so "total" covers the app's own imports
+startup_profiler = StartupProfiler()
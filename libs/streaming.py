@@ -0,0 +1,84 @@
+"""Helpers for streaming responses to HTTP clients."""
+
+import asyncio
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+
+class SlowConsumerError(Exception):
+    """Raised when the consumer of a bounded stream stops draining it."""
+
+
+class _End:
+    """Sentinel marking the end of the producer side of a bounded stream."""
+
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+
+
+async def bounded_stream(
+    source: AsyncIterator[T],
+    maxsize: int,
+    send_timeout: float,
+) -> AsyncIterator[T]:
+    """Relay ``source`` through a bounded buffer so a slow consumer throttles the producer.
+
+    The source is iterated in a background task that can run at most ``maxsize`` items
+    ahead of the consumer. If the consumer does not free a slot within ``send_timeout``
+    seconds, or the consumer goes away (the returned generator is closed or cancelled),
+    the source is closed, which stops the upstream generation.
+
+    Args:
+        source: The async iterator producing items.
+        maxsize: Maximum number of items buffered ahead of the consumer.
+        send_timeout: Seconds to wait for the consumer to free a buffer slot.
+
+    Yields:
+        T: Items from ``source``, in order.
+
+    Raises:
+        SlowConsumerError: If the consumer did not keep up with the producer.
+    """
+    # The queue itself is unbounded so the end sentinel can always be enqueued;
+    # the bound on in-flight items is enforced by the semaphore.
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(maxsize)
+
+    async def produce() -> None:
+        error: BaseException | None = None
+        try:
+            async for item in source:
+                try:
+                    await asyncio.wait_for(slots.acquire(), timeout=send_timeout)
+                except asyncio.TimeoutError:
+                    error = SlowConsumerError(
+                        f"consumer did not drain the stream within {send_timeout}s"
+                    )
+                    break
+                queue.put_nowait(item)
+        except Exception as e:
+            error = e
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            queue.put_nowait(_End(error))
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if isinstance(item, _End):
+                if item.error is not None:
+                    raise item.error
+                return
+            slots.release()
+            yield item
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
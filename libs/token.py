@@ -0,0 +1,57 @@
+"""Access token creation and verification."""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from typing import Literal, Optional
+
+import jwt
+
+from configs import config
+from schemas.auth import Token
+
+TokenKind = Literal["user", "session"]
+
+
+def create_access_token(subject: str, kind: TokenKind = "user", expires_delta: Optional[timedelta] = None) -> Token:
+    """Create a signed access token.
+
+    Args:
+        subject: The user ID or session ID the token stands for.
+        kind: Whether the token authenticates a user or a chat session.
+        expires_delta: Lifetime of the token, JWT_ACCESS_TOKEN_EXPIRE_DAYS if omitted.
+
+    Returns:
+        Token: The access token and its expiration time.
+    """
+    expires_at = datetime.now(UTC) + (expires_delta or timedelta(days=config.JWT_ACCESS_TOKEN_EXPIRE_DAYS))
+    payload = {
+        "sub": subject,
+        "kind": kind,
+        "exp": expires_at,
+        "iat": datetime.now(UTC),
+        # Identifies the token in the revocation table
+        "jti": uuid.uuid4().hex,
+    }
+    encoded = jwt.encode(payload, config.JWT_SECRET_KEY.get_secret_value(), algorithm=config.JWT_ALGORITHM)
+    return Token(access_token=encoded, expires_at=expires_at)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Verify a token's signature and expiration and return its claims.
+
+    Args:
+        token: The encoded access token.
+
+    Returns:
+        Optional[dict]: The claims, or None if the token is invalid or expired.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            config.JWT_SECRET_KEY.get_secret_value(),
+            algorithms=[config.JWT_ALGORITHM],
+            options={"require": ["sub", "exp"]},
+        )
+    except jwt.PyJWTError:
+        return None
+    return payload
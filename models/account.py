@@ -5,12 +5,12 @@ from typing import (
     List,
 )
 
-import bcrypt
 from sqlmodel import (
     Field,
     Relationship,
 )
 
+from libs.password import password_hasher
 from models.base import BaseModel
 
 if TYPE_CHECKING:
@@ -34,14 +34,28 @@ class User(BaseModel, table=True):
     sessions: List["Session"] = Relationship(back_populates="user")
 
     def verify_password(self, password: str) -> bool:
-        """Verify if the provided password matches the hash."""
-        return bcrypt.checkpw(password.encode("utf-8"), self.hashed_password.encode("utf-8"))
+        """Verify if the provided password matches the hash.
+
+        Blocks for the duration of a bcrypt check; use ``averify_password`` in async code.
+        """
+        return password_hasher.verify_sync(password, self.hashed_password)
+
+    async def averify_password(self, password: str) -> bool:
+        """Verify the password in the hashing thread pool, off the event loop."""
+        return await password_hasher.verify(password, self.hashed_password)
 
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt."""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+        """Hash a password using bcrypt.
+
+        Blocks for the duration of a bcrypt hash; use ``ahash_password`` in async code.
+        """
+        return password_hasher.hash_sync(password)
+
+    @staticmethod
+    async def ahash_password(password: str) -> str:
+        """Hash a password in the hashing thread pool, off the event loop."""
+        return await password_hasher.hash(password)
 
 
 # Avoid circular imports
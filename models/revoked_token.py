@@ -0,0 +1,22 @@
+"""This file contains the revoked token model for the application."""
+
+from datetime import datetime
+
+from sqlmodel import Field
+
+from models.base import BaseModel
+
+
+class RevokedToken(BaseModel, table=True):
+    """Access tokens revoked before their expiration, e.g. by a logout.
+
+    Attributes:
+        jti: The token's unique ID (``jti`` claim)
+        expires_at: When the token expires; the row is useless afterwards
+        created_at: When the token was revoked
+    """
+
+    __tablename__ = "revoked_token"
+
+    jti: str = Field(primary_key=True)
+    expires_at: datetime = Field(index=True)
@@ -0,0 +1,71 @@
+"""This file contains the authentication schemas for the application."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, Field, SecretStr
+
+
+class Token(BaseModel):
+    """Token model for authentication.
+
+    Attributes:
+        access_token: The JWT access token.
+        token_type: The type of token (always "bearer").
+        expires_at: The token expiration timestamp.
+    """
+
+    access_token: str = Field(..., description="The JWT access token")
+    token_type: str = Field(default="bearer", description="The type of token")
+    expires_at: datetime = Field(..., description="The token expiration timestamp")
+
+
+class UserCreate(BaseModel):
+    """Request model for user registration.
+
+    Attributes:
+        email: User's email address.
+        password: User's password.
+    """
+
+    email: str = Field(..., description="User's email address", max_length=254)
+    password: SecretStr = Field(..., description="User's password", min_length=8, max_length=64)
+
+
+class UserResponse(BaseModel):
+    """Response model for user operations.
+
+    Attributes:
+        id: User's ID.
+        email: User's email address.
+        token: Authentication token.
+    """
+
+    id: int = Field(..., description="User's ID")
+    email: str = Field(..., description="User's email address")
+    token: Token = Field(..., description="Authentication token")
+
+
+class UserLogin(BaseModel):
+    """Request model for user login.
+
+    Attributes:
+        email: User's email address.
+        password: User's password.
+    """
+
+    email: str = Field(..., description="User's email address", max_length=254)
+    password: SecretStr = Field(..., description="User's password", min_length=8, max_length=64)
+
+
+class SessionResponse(BaseModel):
+    """Response model for chat session creation.
+
+    Attributes:
+        session_id: The ID of the chat session.
+        name: Name of the session.
+        token: The token authenticating requests within the session.
+    """
+
+    session_id: str = Field(..., description="The ID of the chat session")
+    name: str = Field(default="", description="Name of the session")
+    token: Token = Field(..., description="The session's authentication token")
@@ -2,8 +2,11 @@
 
 
 import re
-from typing import List, Literal
-from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+# Compiled once: content validation runs for every message of every request
+_SCRIPT_TAG_PATTERN = re.compile(r"<script.*?>.*?</script>", re.IGNORECASE | re.DOTALL)
 
 
 class Message(BaseModel):
@@ -34,7 +37,7 @@ class Message(BaseModel):
         """Validate the message content."""
 
         # Check for potentially handful content
-        if re.search(r"<script.*?>.*?</script>", content, re.IGNORECASE | re.DOTALL):
+        if _SCRIPT_TAG_PATTERN.search(content):
             raise ValueError("Content contains potentially harmful scripts tags.")
         
         # Check for null bytes
@@ -44,13 +47,34 @@ class Message(BaseModel):
         return content
 
 class ChatRequest(BaseModel):
-    """Request model for chat endpoint."""
+    """Request model for chat endpoint.
+
+    Attributes:
+        messages: The conversation ("full") or only the new turn ("delta").
+        history_mode: "full" when the client sends the whole conversation, which
+            replaces the history stored for the session; "delta" when the client
+            sends only the new user messages and the server rebuilds the history
+            from the session's checkpoint thread.
+    """
 
     messages: List[Message] = Field(
         ...,
         description="List of messages in the conversation",
         min_length=1       
     )
+    history_mode: Literal["full", "delta"] = Field(
+        default="full",
+        description="Whether messages hold the full conversation or only the new turn",
+    )
+
+    @model_validator(mode="after")
+    def validate_delta_messages(self) -> "ChatRequest":
+        """Ensure a delta request only carries new user messages."""
+
+        if self.history_mode == "delta" and any(message.role != "user" for message in self.messages):
+            raise ValueError("Delta requests must only contain the new user messages.")
+
+        return self
 
 class ChatResponse(BaseModel):
     """Response model for chat endpoint.
@@ -71,4 +95,33 @@ class StreamResponse(BaseModel):
     """
 
     content: str = Field(default="", description="The content of the current chunk")
-    done: bool = Field(default=False, description="Whether the stream is complete")
\ No newline at end of file
+    done: bool = Field(default=False, description="Whether the stream is complete")
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint.
+
+    Attributes:
+        requests: Independent conversations, each answered in its own thread.
+    """
+
+    requests: List[ChatRequest] = Field(
+        ...,
+        description="Independent conversations to answer",
+        min_length=1,
+    )
+
+
+class BatchChatResult(BaseModel):
+    """One line of the batch chat response, sent as soon as its conversation is answered.
+
+    Attributes:
+        index: Position of the conversation in the request.
+        status: HTTP status the conversation would have gotten from the chat endpoint.
+        messages: The resulting conversation, if it succeeded.
+        error: Why the conversation failed, if it did.
+    """
+
+    index: int = Field(..., description="Position of the conversation in the request")
+    status: int = Field(..., description="HTTP status of the conversation")
+    messages: Optional[List[Message]] = Field(default=None, description="The resulting conversation")
+    error: Optional[str] = Field(default=None, description="Why the conversation failed")
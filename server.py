@@ -0,0 +1,104 @@
+"""Production entry point: a Gunicorn master managing Uvicorn workers.
+
+Usage::
+
+    python server.py
+
+``app.py`` stays the development entry point (single process, auto-reload).
+Here the application is imported once in the master and the workers are forked
+from it, so they share the imported modules and boot quickly. Every worker runs
+the lifespan itself, so pools, threads and the agent are created after the fork.
+
+On SIGTERM the master stops accepting connections and gives every worker
+SERVER_GRACEFUL_TIMEOUT seconds to finish in-flight requests (streams included)
+and run its shutdown before it is killed.
+"""
+
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from configs import config
+
+
+def get_worker_count() -> int:
+    """Number of workers: SERVER_WORKERS, or one per CPU available to this process."""
+
+    if config.SERVER_WORKERS:
+        return config.SERVER_WORKERS
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+class AppUvicornWorker(UvicornWorker):
+    """Uvicorn worker using uvloop and httptools with the configured limits."""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "limit_concurrency": config.SERVER_LIMIT_CONCURRENCY,
+        # Shorter than Gunicorn's graceful timeout, so Uvicorn cancels the remaining
+        # requests and runs the lifespan shutdown before the master kills the worker
+        "timeout_graceful_shutdown": max(config.SERVER_GRACEFUL_TIMEOUT - 1, 1),
+    }
+
+
+def child_exit(server, worker) -> None:
+    # Drop the live gauges of a worker that crashed without running its shutdown
+    from core import metrics
+
+    metrics.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving ``app:app``."""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        from app_factory import EXTENSIONS
+        from libs.startup_profile import startup_profiler
+
+        # Import what the lifespan would import anyway in the master too, so that
+        # forked workers start with those modules loaded
+        for ext in EXTENSIONS:
+            if hasattr(ext, "preload") and not (hasattr(ext, "is_enabled") and not ext.is_enabled()):
+                with startup_profiler.phase(f"{ext.__name__}.preload"):
+                    ext.preload()
+        startup_profiler.remove_import_hook()
+        return app
+
+
+def get_options() -> dict:
+    """Gunicorn settings derived from the application config."""
+
+    return {
+        "bind": f"{config.SERVER_HOST}:{config.SERVER_PORT}",
+        "workers": get_worker_count(),
+        "worker_class": AppUvicornWorker,
+        "preload_app": True,
+        "backlog": config.SERVER_BACKLOG,
+        "keepalive": config.SERVER_KEEPALIVE,
+        "timeout": config.SERVER_TIMEOUT,
+        "graceful_timeout": config.SERVER_GRACEFUL_TIMEOUT,
+        "max_requests": config.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": config.SERVER_MAX_REQUESTS_JITTER,
+        "child_exit": child_exit,
+        # Application logs go through ext_logging; access logs would add a
+        # synchronous write per request
+        "accesslog": None,
+    }
+
+
+if __name__ == "__main__":
+    Server(get_options()).run()
@@ -0,0 +1,87 @@
+"""This file contains the account service for users and chat sessions."""
+
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.account import User
+from models.session import Session
+
+
+class AccountService:
+    """Async lookups and mutations for users and their chat sessions.
+
+    All methods take the request-scoped AsyncSession provided by
+    ``extensions.ext_database.get_db_session`` so they never block the event loop.
+    """
+
+    @staticmethod
+    async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+        """Get a user by ID."""
+
+        return await db.get(User, user_id)
+
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """Get a user by email."""
+
+        result = await db.exec(select(User).where(User.email == email))
+        return result.first()
+
+    @staticmethod
+    async def create_user(db: AsyncSession, email: str, password: str) -> User:
+        """Create a new user.
+
+        Args:
+            db: The database session.
+            email: The user's email.
+            password: The already hashed password.
+
+        Returns:
+            User: The created user.
+        """
+        user = User(email=email, hashed_password=password)
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def get_session(db: AsyncSession, session_id: str) -> Optional[Session]:
+        """Get a chat session by ID."""
+
+        return await db.get(Session, session_id)
+
+    @staticmethod
+    async def create_session(db: AsyncSession, session_id: str, user_id: int, name: str = "") -> Session:
+        """Create a new chat session.
+
+        Args:
+            db: The database session.
+            session_id: The ID of the new chat session.
+            user_id: The ID of the user owning the session.
+            name: Name of the session.
+
+        Returns:
+            Session: The created chat session.
+        """
+        session = Session(id=session_id, user_id=user_id, name=name)
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+        return session
+
+    @staticmethod
+    async def delete_session(db: AsyncSession, session_id: str) -> bool:
+        """Delete a chat session by ID.
+
+        Returns:
+            bool: True if the session existed and was deleted.
+        """
+        session = await db.get(Session, session_id)
+        if session is None:
+            return False
+        await db.delete(session)
+        await db.commit()
+        return True
@@ -0,0 +1,138 @@
+"""This file contains the authentication service resolving tokens to users and sessions."""
+
+import hashlib
+import time
+from datetime import UTC, datetime
+from typing import Optional
+
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from configs import config
+from libs.cache import MISSING, LRUTTLCache
+from libs.token import TokenKind, decode_token
+from models.account import User
+from models.revoked_token import RevokedToken
+from models.session import Session
+from services.account_service import AccountService
+
+
+class AuthService:
+    """Resolve bearer tokens to users and sessions with per-worker caches.
+
+    Verified tokens are cached until the earlier of their expiration and
+    AUTH_TOKEN_CACHE_TTL, so a known token costs a dictionary lookup instead of a
+    signature check. Users and sessions are cached for AUTH_ENTITY_CACHE_TTL, so
+    most requests need no database round trip before they start working.
+
+    Revoked tokens are stored in the ``revoked_token`` table, shared by every
+    worker, and checked whenever a token is not in the cache. Cached tokens are
+    therefore kept no longer than AUTH_ENTITY_CACHE_TTL: a logout takes effect
+    at once on the worker handling it, and on the other workers within that
+    TTL, like a session deletion does for their cached sessions.
+    """
+
+    _tokens: LRUTTLCache[str, tuple[TokenKind, str]] = LRUTTLCache(
+        max_entries=config.AUTH_TOKEN_CACHE_SIZE, ttl=config.AUTH_TOKEN_CACHE_TTL
+    )
+    _users: LRUTTLCache[int, User] = LRUTTLCache(
+        max_entries=config.AUTH_ENTITY_CACHE_SIZE, ttl=config.AUTH_ENTITY_CACHE_TTL
+    )
+    _sessions: LRUTTLCache[str, Session] = LRUTTLCache(
+        max_entries=config.AUTH_ENTITY_CACHE_SIZE, ttl=config.AUTH_ENTITY_CACHE_TTL
+    )
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        # Keep digests rather than the bearer tokens themselves in memory
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _token_id(cls, token: str, payload: dict) -> str:
+        # Tokens issued before the jti claim existed are identified by their digest
+        return payload.get("jti") or cls._token_key(token)
+
+    @classmethod
+    async def resolve_token(cls, db: AsyncSession, token: str, kind: TokenKind) -> Optional[str]:
+        """Return the subject of a valid token of the expected kind.
+
+        Args:
+            db: The database session, only used on a cache miss.
+            token: The encoded access token.
+            kind: The kind of token the caller accepts.
+
+        Returns:
+            Optional[str]: The user ID or session ID, or None if the token is
+            invalid, expired, revoked or of another kind.
+        """
+        key = cls._token_key(token)
+        cached = cls._tokens.get(key)
+        if cached is MISSING:
+            payload = decode_token(token)
+            if payload is None:
+                return None
+            if await db.get(RevokedToken, cls._token_id(token, payload)) is not None:
+                return None
+            cached = (payload.get("kind", "user"), str(payload["sub"]))
+            # Never trust a cached token past its own expiration, nor miss a revocation for long
+            ttl = min(config.AUTH_TOKEN_CACHE_TTL, config.AUTH_ENTITY_CACHE_TTL, payload["exp"] - time.time())
+            cls._tokens.set(key, cached, ttl=ttl)
+
+        token_kind, subject = cached
+        return subject if token_kind == kind else None
+
+    @classmethod
+    async def revoke_token(cls, db: AsyncSession, token: str) -> None:
+        """Reject ``token`` on every worker for the rest of its lifetime."""
+
+        cls._tokens.delete(cls._token_key(token))
+        payload = decode_token(token)
+        if payload is None:
+            return
+
+        now = datetime.now(UTC)
+        await db.merge(
+            RevokedToken(
+                jti=cls._token_id(token, payload),
+                expires_at=datetime.fromtimestamp(payload["exp"], UTC),
+            )
+        )
+        # Revocations of expired tokens are no longer needed
+        await db.exec(delete(RevokedToken).where(RevokedToken.expires_at < now))
+        await db.commit()
+
+    @classmethod
+    async def get_user(cls, db: AsyncSession, user_id: int) -> Optional[User]:
+        """Get a user, from the cache when possible."""
+
+        user = cls._users.get(user_id)
+        if user is MISSING:
+            user = await AccountService.get_user(db, user_id)
+            if user is None:
+                return None
+            cls._users.set(user_id, user)
+        return user
+
+    @classmethod
+    async def get_session(cls, db: AsyncSession, session_id: str) -> Optional[Session]:
+        """Get a chat session, from the cache when possible."""
+
+        session = cls._sessions.get(session_id)
+        if session is MISSING:
+            session = await AccountService.get_session(db, session_id)
+            if session is None:
+                return None
+            cls._sessions.set(session_id, session)
+        return session
+
+    @classmethod
+    def invalidate_user(cls, user_id: int) -> None:
+        """Drop a user from the cache, e.g. after it changed."""
+
+        cls._users.delete(user_id)
+
+    @classmethod
+    def invalidate_session(cls, session_id: str) -> None:
+        """Drop a session from the cache, e.g. after it was deleted."""
+
+        cls._sessions.delete(session_id)
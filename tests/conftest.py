@@ -0,0 +1,87 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Required settings, so the application modules can be imported without a .env
+os.environ.setdefault("LLM_API_KEY", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+
+import asyncio  # noqa: E402
+import itertools  # noqa: E402
+from typing import Any, AsyncIterator  # noqa: E402
+
+import pytest  # noqa: E402
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+ANSWER = "sit amet lorem ipsum dolor"
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Chat model streaming a fixed answer word by word, counting its calls."""
+
+    temperature: float = 0.0
+    calls: int = 0
+    delay: float = 0.0
+
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+@pytest.fixture
+def fake_llm() -> FakeChatModel:
+    return FakeChatModel(messages=(AIMessage(ANSWER) for _ in itertools.count()))
+
+
+@pytest.fixture
+def agent(monkeypatch: pytest.MonkeyPatch, fake_llm: FakeChatModel):
+    """A NormalAgent answering with ``fake_llm`` and keeping history in memory."""
+
+    from core.agent import normal_agent
+
+    async def no_setup(self, connection_pool):
+        return None
+
+    async def fake_pool(self):
+        return object()
+
+    monkeypatch.setattr(normal_agent, "ProfiledPostgresSaver", lambda pool: InMemorySaver())
+    monkeypatch.setattr(normal_agent.NormalAgent, "_setup_storage", no_setup)
+    monkeypatch.setattr(normal_agent.NormalAgent, "_get_connection_pool", fake_pool)
+
+    agent = normal_agent.NormalAgent(tools=[])
+    for endpoint in agent.llm_pool.endpoints:
+        endpoint.llm = fake_llm
+    agent.llm = fake_llm
+    agent.llm_cache.enabled = False
+    return agent
+
+
+@pytest.fixture
+def chat_client(agent):
+    """Client of the chatbot routes, authenticated as a fresh session, backed by ``agent``."""
+
+    import uuid
+    from types import SimpleNamespace
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from controllers.v1 import chatbot
+    from controllers.v1.auth import get_current_session
+    from extensions.ext_agent import get_agent
+
+    session = SimpleNamespace(id=f"session-{uuid.uuid4().hex}", user_id=uuid.uuid4().int % 10**9)
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/chatbot")
+    app.dependency_overrides[get_current_session] = lambda: session
+    app.dependency_overrides[get_agent] = lambda: agent
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,205 @@
+"""Tests for the admission control of LLM calls."""
+
+import asyncio
+import os
+
+import pytest
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from controllers.v1 import chatbot
+from core.admission import LEASE_TABLE, RATE_LIMIT_TABLE, AdmissionRejectedError, LLMAdmission
+from extensions import ext_db_pool
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def make_admission(**overrides) -> LLMAdmission:
+    settings = dict(requests_per_minute=60, burst=2, max_concurrency=1, max_queue=1, queue_timeout=1.0)
+    settings.update(overrides)
+    return LLMAdmission(**settings)
+
+
+def test_a_user_gets_a_burst_then_their_rate():
+    admission = make_admission()
+
+    async def run():
+        await admission.admit_request(1)
+        await admission.admit_request(1)
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await admission.admit_request(1)
+        # Other users have their own bucket
+        await admission.admit_request(2)
+        return rejected.value
+
+    rejected = asyncio.run(run())
+
+    assert rejected.reason == "user_rate"
+    assert 0 < rejected.retry_after <= 1.0
+    assert rejected.retry_after_header == "1"
+
+
+def test_slots_are_handed_over_in_order():
+    admission = make_admission(max_queue=2)
+    order: list[str] = []
+
+    async def call(name: str, hold: float) -> None:
+        async with admission.slot():
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def run():
+        first = asyncio.create_task(call("first", 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(call("second", 0))
+        await asyncio.sleep(0)
+        third = asyncio.create_task(call("third", 0))
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(run())
+
+    assert order == ["first", "second", "third"]
+    assert admission._in_flight == 0
+
+
+def test_calls_beyond_the_queue_are_rejected():
+    admission = make_admission()
+
+    async def run():
+        async with admission.slot():
+            queued = asyncio.create_task(admission.slot().__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejectedError) as slot_rejected:
+                async with admission.slot():
+                    pass
+            # A full queue also turns new chat requests away early
+            with pytest.raises(AdmissionRejectedError) as request_rejected:
+                await admission.admit_request(1)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+        return slot_rejected.value, request_rejected.value
+
+    slot_rejected, request_rejected = asyncio.run(run())
+
+    assert slot_rejected.reason == request_rejected.reason == "queue_full"
+    assert admission._in_flight == 0
+
+
+def test_a_call_waits_at_most_the_queue_timeout():
+    admission = make_admission(queue_timeout=0.05)
+
+    async def run():
+        async with admission.slot():
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                async with admission.slot():
+                    pass
+        return rejected.value
+
+    assert asyncio.run(run()).reason == "queue_timeout"
+    assert admission._in_flight == 0
+    assert admission._waiting == 0
+
+
+def test_a_cancelled_waiter_does_not_hold_a_slot():
+    admission = make_admission()
+
+    async def run():
+        async with admission.slot():
+            waiter = asyncio.create_task(admission.slot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        async with admission.slot():
+            pass
+
+    asyncio.run(run())
+
+    assert admission._in_flight == 0
+
+
+def test_no_limits_when_disabled(monkeypatch):
+    monkeypatch.setattr("core.admission.config.LLM_ADMISSION_ENABLED", False)
+    admission = make_admission(burst=1)
+
+    async def run():
+        for _ in range(3):
+            await admission.admit_request(1)
+        async with admission.slot(), admission.slot():
+            pass
+
+    asyncio.run(run())
+
+
+def test_chat_routes_answer_429_with_retry_after(chat_client, monkeypatch):
+    monkeypatch.setattr(chatbot, "llm_admission", make_admission(requests_per_minute=1, burst=1))
+    body = {"messages": [{"role": "user", "content": "hello"}]}
+
+    assert chat_client.post("/chatbot/chat", json=body).status_code == 200
+    rejected = chat_client.post("/chatbot/chat", json=body)
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 59
+
+
+@pytest.fixture
+def shared_pool(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    loop = asyncio.new_event_loop()
+    pool = AsyncConnectionPool(
+        TEST_DATABASE_URL,
+        min_size=1,
+        max_size=4,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    )
+    loop.run_until_complete(pool.open(wait=True))
+    monkeypatch.setattr(ext_db_pool, "db_pool", pool)
+
+    async def reset():
+        async with pool.connection() as conn:
+            await make_admission(shared=True).setup(conn)
+            await conn.execute(f"TRUNCATE {RATE_LIMIT_TABLE}, {LEASE_TABLE}")
+
+    loop.run_until_complete(reset())
+    yield loop
+    loop.run_until_complete(pool.close())
+    loop.close()
+
+
+def test_workers_share_the_user_bucket(shared_pool):
+    workers = [make_admission(shared=True), make_admission(shared=True)]
+
+    async def run():
+        await workers[0].admit_request(1)
+        await workers[1].admit_request(1)
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await workers[0].admit_request(1)
+        return rejected.value
+
+    assert shared_pool.run_until_complete(run()).reason == "user_rate"
+
+
+def test_workers_share_the_concurrency_cap(shared_pool):
+    workers = [make_admission(shared=True, max_concurrency=1), make_admission(shared=True, max_concurrency=1)]
+    in_flight: list[int] = []
+    running = 0
+
+    async def call(admission: LLMAdmission) -> None:
+        nonlocal running
+        async with admission.slot():
+            running += 1
+            in_flight.append(running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(call(workers[0]), call(workers[1]))
+        async with ext_db_pool.db_pool.connection() as conn:
+            cursor = await conn.execute(f"SELECT count(*) AS n FROM {LEASE_TABLE}")
+            return (await cursor.fetchone())["n"]
+
+    leases_left = shared_pool.run_until_complete(run())
+
+    assert in_flight == [1, 1]
+    assert leases_left == 0
@@ -0,0 +1,131 @@
+"""Tests for compiling the agent graph once and reporting readiness."""
+
+import asyncio
+import os
+
+import psycopg
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from configs import config
+from configs.deploy import Environment
+from controllers.v1 import api_router
+from core.agent import normal_agent
+from core.agent.normal_agent import CHECKPOINTER_SETUP_LOCK_ID, NormalAgent
+from extensions import ext_agent
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# The real migrations, before the agent fixture replaces them
+setup_storage = NormalAgent._setup_storage
+
+
+def test_concurrent_first_callers_compile_the_graph_once(agent, monkeypatch):
+    setups = []
+
+    async def counting_setup(self, connection_pool):
+        setups.append(connection_pool)
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(NormalAgent, "_setup_storage", counting_setup)
+
+    async def run():
+        return await asyncio.gather(*(agent.create_graph() for _ in range(5)))
+
+    graphs = asyncio.run(run())
+
+    assert all(graph is graphs[0] for graph in graphs)
+    assert len(setups) == 1
+    assert agent.is_ready and agent.keeps_history
+
+
+def ready_client(app_state_agent) -> TestClient:
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    if app_state_agent is not None:
+        app.state.agent = app_state_agent
+    return TestClient(app)
+
+
+def test_ready_only_once_the_graph_is_compiled(agent):
+    assert ready_client(None).get("/api/v1/ready").status_code == 503
+    assert ready_client(agent).get("/api/v1/ready").status_code == 503
+
+    asyncio.run(agent.create_graph())
+
+    assert ready_client(agent).get("/api/v1/ready").json() == {"status": "ready"}
+
+
+def test_a_failed_startup_compilation_is_retried_by_the_first_request(agent, monkeypatch):
+    monkeypatch.setattr(config, "ENVIRONMENT", Environment.DEVELOPMENT)
+    monkeypatch.setattr(normal_agent, "NormalAgent", lambda tools: agent)
+    pools = [None, object()]
+
+    async def flaky_pool(self):
+        return pools.pop(0)
+
+    monkeypatch.setattr(NormalAgent, "_get_connection_pool", flaky_pool)
+    app = FastAPI()
+
+    asyncio.run(ext_agent.init_app(app))
+    assert app.state.agent is agent and not agent.is_ready
+
+    assert asyncio.run(agent.create_graph()) is not None
+    assert agent.is_ready
+
+
+async def open_pool(max_size: int) -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        TEST_DATABASE_URL,
+        min_size=1,
+        max_size=max_size,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    )
+    await pool.open(wait=True)
+    return pool
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_workers_migrate_one_after_the_other_on_a_single_connection():
+    async def run():
+        # One pool per worker, each with a single connection
+        pools = [await open_pool(max_size=1) for _ in range(3)]
+        try:
+            workers = [object.__new__(NormalAgent) for _ in pools]
+            await asyncio.wait_for(
+                asyncio.gather(*(setup_storage(worker, pool) for worker, pool in zip(workers, pools))), timeout=30
+            )
+            async with pools[0].connection() as conn:
+                cursor = await conn.execute("SELECT to_regclass('checkpoints') AS name")
+                return (await cursor.fetchone())["name"]
+        finally:
+            for pool in pools:
+                await pool.close()
+
+    assert asyncio.run(run()) == "checkpoints"
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_waiting_for_the_migration_lock_is_bounded(monkeypatch):
+    monkeypatch.setattr(config, "PSYCOPG_SETUP_LOCK_TIMEOUT_MS", 100)
+
+    async def run():
+        holder = await psycopg.AsyncConnection.connect(TEST_DATABASE_URL, autocommit=True)
+        pool = await open_pool(max_size=1)
+        try:
+            await holder.execute("SELECT pg_advisory_lock(%s)", (CHECKPOINTER_SETUP_LOCK_ID,))
+            with pytest.raises(psycopg.errors.LockNotAvailable):
+                await asyncio.wait_for(setup_storage(object.__new__(NormalAgent), pool), timeout=10)
+            # The timeout does not stay on the pooled connection
+            async with pool.connection() as conn:
+                cursor = await conn.execute("SHOW lock_timeout")
+                return (await cursor.fetchone())["lock_timeout"]
+        finally:
+            await pool.close()
+            await holder.close()
+
+    assert asyncio.run(run()) == "0"
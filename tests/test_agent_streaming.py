@@ -0,0 +1,36 @@
+"""Tests for token streaming out of the agent graph."""
+
+import asyncio
+
+import pytest
+
+from configs import config
+from schemas.chat import Message
+from tests.conftest import ANSWER
+
+
+async def stream_tokens(agent, session_id: str) -> list[str]:
+    messages = [Message(role="user", content="hello")]
+    return [token async for token in agent.get_stream_response(messages, session_id)]
+
+
+@pytest.mark.parametrize("coalescing", [True, False])
+def test_every_token_is_streamed_once(monkeypatch, agent, coalescing):
+    monkeypatch.setattr(config, "LLM_COALESCING_ENABLED", coalescing)
+
+    tokens = asyncio.run(stream_tokens(agent, "stream-once"))
+
+    assert "".join(tokens) == ANSWER
+    assert len(tokens) == len(ANSWER.split(" ")) * 2 - 1
+
+
+def test_stream_response_matches_the_stored_answer(agent):
+    async def run():
+        tokens = await stream_tokens(agent, "stream-history")
+        history = await agent.get_chat_history("stream-history")
+        return tokens, history
+
+    tokens, history = asyncio.run(run())
+
+    assert history[-1].role == "assistant"
+    assert history[-1].content == "".join(tokens)
@@ -0,0 +1,163 @@
+"""Tests for the cached resolution of access tokens, users and sessions."""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import models.account  # noqa: F401  (registers the tables)
+import models.revoked_token  # noqa: F401
+import models.session  # noqa: F401
+from controllers.v1 import auth
+from libs.token import create_access_token
+from services import auth_service
+from services.auth_service import AuthService
+
+PASSWORD = "Correct-Horse-9"
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    for cache in (AuthService._tokens, AuthService._users, AuthService._sessions):
+        cache.clear()
+    yield
+    for cache in (AuthService._tokens, AuthService._users, AuthService._sessions):
+        cache.clear()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(session_factory):
+    app = FastAPI()
+    app.state.session_factory = session_factory
+    app.include_router(auth.router, prefix="/auth")
+
+    @app.get("/whoami")
+    async def whoami(user=Depends(auth.get_current_user)):
+        return {"id": user.id}
+
+    @app.get("/session")
+    async def current_session(session=Depends(auth.get_current_session)):
+        return {"id": session.id}
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def decoded(monkeypatch) -> list[str]:
+    """Tokens whose signature was checked."""
+
+    tokens: list[str] = []
+    decode_token = auth_service.decode_token
+
+    def counting(token: str):
+        tokens.append(token)
+        return decode_token(token)
+
+    monkeypatch.setattr(auth_service, "decode_token", counting)
+    return tokens
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def register(client) -> str:
+    response = client.post("/auth/register", json={"email": "ada@example.com", "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()["token"]["access_token"]
+
+
+def test_a_known_token_is_not_verified_again(client, decoded):
+    token = register(client)
+
+    first = client.get("/whoami", headers=bearer(token))
+    second = client.get("/whoami", headers=bearer(token))
+
+    assert first.json() == second.json()
+    assert decoded == [token]
+
+
+def test_users_are_read_from_the_database_once(client, session_factory):
+    token = register(client)
+    client.get("/whoami", headers=bearer(token))
+
+    user_id = client.get("/whoami", headers=bearer(token)).json()["id"]
+
+    # A cache hit never touches the database session
+    assert asyncio.run(AuthService.get_user(None, user_id)).id == user_id
+
+
+def test_tokens_only_resolve_for_their_kind(client):
+    user_token = register(client)
+    session_token = client.post("/auth/session", headers=bearer(user_token)).json()["token"]["access_token"]
+
+    assert client.get("/session", headers=bearer(session_token)).status_code == 200
+    assert client.get("/session", headers=bearer(user_token)).status_code == 401
+    assert client.get("/whoami", headers=bearer(session_token)).status_code == 401
+
+
+def test_a_logout_revokes_the_token_at_once(client):
+    token = register(client)
+    client.get("/whoami", headers=bearer(token))
+
+    assert client.post("/auth/logout", headers=bearer(token)).status_code == 204
+
+    assert client.get("/whoami", headers=bearer(token)).status_code == 401
+
+
+def test_other_workers_see_the_revocation(client, session_factory):
+    token = register(client)
+    client.post("/auth/logout", headers=bearer(token))
+
+    async def resolve_on_a_fresh_worker():
+        AuthService._tokens.clear()
+        async with session_factory() as db:
+            return await AuthService.resolve_token(db, token, "user")
+
+    assert asyncio.run(resolve_on_a_fresh_worker()) is None
+
+
+def test_tokens_are_not_cached_past_their_expiration(session_factory, decoded, monkeypatch):
+    token = create_access_token("1", "user", expires_delta=timedelta(seconds=1)).access_token
+    now = [1000.0]
+    monkeypatch.setattr("libs.cache.time.monotonic", lambda: now[0])
+
+    async def resolve():
+        async with session_factory() as db:
+            return await AuthService.resolve_token(db, token, "user")
+
+    assert asyncio.run(resolve()) == "1"
+    now[0] += 2
+    asyncio.run(resolve())
+
+    assert decoded == [token, token]
+
+
+def test_a_deleted_session_stops_resolving(client):
+    user_token = register(client)
+    created = client.post("/auth/session", headers=bearer(user_token)).json()
+    session_token = created["token"]["access_token"]
+    client.get("/session", headers=bearer(session_token))
+
+    client.delete(f"/auth/session/{created['session_id']}", headers=bearer(user_token))
+
+    assert client.get("/session", headers=bearer(session_token)).status_code == 401
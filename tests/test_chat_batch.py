@@ -0,0 +1,110 @@
+"""Tests for the NDJSON batch chat endpoint."""
+
+import asyncio
+import json
+
+from configs import config
+from core.admission import AdmissionRejectedError, llm_admission
+from tests.conftest import ANSWER
+
+
+def batch(*contents: str) -> dict:
+    return {"requests": [{"messages": [{"role": "user", "content": content}]} for content in contents]}
+
+
+def result_lines(response) -> dict[int, dict]:
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return {line["index"]: line for line in lines}
+
+
+def test_every_conversation_gets_one_line(chat_client, agent):
+    response = chat_client.post("/chatbot/chat/batch", json=batch("one", "two", "three"))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = result_lines(response)
+    assert sorted(lines) == [0, 1, 2]
+    for index, content in enumerate(["one", "two", "three"]):
+        assert lines[index]["status"] == 200
+        assert lines[index]["messages"][0]["content"] == content
+        assert lines[index]["messages"][-1] == {"role": "assistant", "content": ANSWER}
+
+
+def test_batch_leaves_the_session_history_untouched(chat_client, agent):
+    chat_client.post("/chatbot/chat/batch", json=batch("one", "two"))
+
+    assert chat_client.get("/chatbot/messages").json()["messages"] == []
+
+
+def test_a_failed_conversation_gets_an_error_line(chat_client, agent, monkeypatch):
+    get_response = agent.get_response
+
+    async def failing(messages, *args, **kwargs):
+        if messages[0].content == "overloaded":
+            raise AdmissionRejectedError("queue_full", 1.0)
+        if messages[0].content == "broken":
+            raise RuntimeError("graph failed")
+        return await get_response(messages, *args, **kwargs)
+
+    monkeypatch.setattr(agent, "get_response", failing)
+    response = chat_client.post("/chatbot/chat/batch", json=batch("fine", "overloaded", "broken"))
+
+    lines = result_lines(response)
+    assert lines[0]["status"] == 200
+    assert lines[1]["status"] == 429
+    assert "queue_full" in lines[1]["error"]
+    assert lines[2] == {"index": 2, "status": 500, "error": "graph failed"}
+
+
+def test_too_large_a_batch_is_rejected(chat_client, monkeypatch):
+    monkeypatch.setattr(config, "CHAT_BATCH_MAX_REQUESTS", 2)
+
+    response = chat_client.post("/chatbot/chat/batch", json=batch("one", "two", "three"))
+
+    assert response.status_code == 400
+
+
+def test_every_conversation_is_charged_and_paced(chat_client, monkeypatch):
+    charged = []
+
+    async def admit_request(user_id: int) -> None:
+        charged.append(user_id)
+        # The user's bucket is empty once, the batch waits instead of failing
+        if len(charged) == 2:
+            raise AdmissionRejectedError("user_rate", 0.01)
+
+    monkeypatch.setattr(llm_admission, "admit_request", admit_request)
+    response = chat_client.post("/chatbot/chat/batch", json=batch("one", "two", "three"))
+
+    assert all(line["status"] == 200 for line in result_lines(response).values())
+    assert len(charged) == 4
+
+
+def test_closing_the_results_cancels_the_running_conversations(agent, monkeypatch):
+    from schemas.chat import ChatRequest, Message
+
+    started = []
+    cancelled = []
+
+    async def slow(*args, **kwargs):
+        started.append(True)
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(agent, "get_response", slow)
+    requests = [ChatRequest(messages=[Message(role="user", content="hello")]) for _ in range(3)]
+
+    async def run():
+        results = agent.get_batch_responses(requests, "batch-cancel", concurrency=2)
+        consumer = asyncio.create_task(anext(results))
+        await asyncio.sleep(0.05)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        await results.aclose()
+
+    asyncio.run(run())
+
+    assert len(started) == len(cancelled) == 2
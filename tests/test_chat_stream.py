@@ -0,0 +1,100 @@
+"""Tests for the streaming chat endpoint and its bounded relay."""
+
+import asyncio
+import json
+
+import pytest
+
+from libs.streaming import SlowConsumerError, bounded_stream
+from tests.conftest import ANSWER
+
+
+class Source:
+    """Async iterator of numbers recording how far it was consumed and whether it was closed."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.produced = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> int:
+        if self.produced >= self.count:
+            raise StopAsyncIteration
+        self.produced += 1
+        return self.produced
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def test_bounded_stream_relays_every_item_in_order():
+    async def run():
+        source = Source(20)
+        return [item async for item in bounded_stream(source, maxsize=4, send_timeout=1)], source
+
+    items, source = asyncio.run(run())
+
+    assert items == list(range(1, 21))
+    assert source.closed
+
+
+def test_bounded_stream_stops_a_stalled_consumer():
+    async def run():
+        source = Source(1000)
+        stream = bounded_stream(source, maxsize=2, send_timeout=0.05)
+        await anext(stream)
+        # The consumer stalls: the producer fills the buffer, then gives up
+        await asyncio.sleep(0.2)
+        with pytest.raises(SlowConsumerError):
+            async for _ in stream:
+                pass
+        return source
+
+    source = asyncio.run(run())
+
+    assert source.closed
+    assert source.produced < 10
+
+
+def test_closing_the_stream_closes_the_source():
+    async def run():
+        source = Source(1000)
+        stream = bounded_stream(source, maxsize=2, send_timeout=1)
+        await anext(stream)
+        await stream.aclose()
+        return source
+
+    source = asyncio.run(run())
+
+    assert source.closed
+
+
+def sse_frames(body: str) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_stream_endpoint_sends_tokens_then_done(chat_client):
+    response = chat_client.post("/chatbot/chat/stream", json={"messages": [{"role": "user", "content": "hello"}]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = sse_frames(response.text)
+    assert frames[-1] == {"content": "", "done": True}
+    assert "".join(frame["content"] for frame in frames[:-1]) == ANSWER
+    assert not any(frame["done"] for frame in frames[:-1])
+
+
+def test_stream_endpoint_reports_a_failure_in_the_final_frame(chat_client, fake_llm, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("upstream exploded")
+        yield
+
+    monkeypatch.setattr(type(fake_llm), "_astream", broken)
+    response = chat_client.post("/chatbot/chat/stream", json={"messages": [{"role": "user", "content": "hello"}]})
+
+    frames = sse_frames(response.text)
+    assert frames[-1]["done"] is True
+    assert "upstream exploded" in frames[-1]["content"]
@@ -0,0 +1,127 @@
+"""Tests for the checkpoint retention job, against a scratch PostgreSQL database.
+
+They run only with ``TEST_DATABASE_URL`` set; its checkpointer tables are emptied.
+"""
+
+import asyncio
+import os
+import uuid
+from typing import Annotated, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from core.agent.checkpoint_retention import CheckpointRetention
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+class State(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+
+
+async def reply(state: State) -> dict:
+    return {"messages": [AIMessage(content="answer")]}
+
+
+async def seeded_pool(threads: list[str], turns: int, max_size: int) -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        TEST_DATABASE_URL,
+        min_size=1,
+        max_size=max_size,
+        timeout=5,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    )
+    await pool.open(wait=True)
+    saver = AsyncPostgresSaver(pool)
+    await saver.setup()
+    async with pool.connection() as conn:
+        await conn.execute("TRUNCATE checkpoints, checkpoint_blobs, checkpoint_writes")
+
+    builder = StateGraph(State)
+    builder.add_node("chat", reply)
+    builder.add_edge(START, "chat")
+    builder.add_edge("chat", END)
+    graph = builder.compile(checkpointer=saver)
+    for thread_id in threads:
+        for turn in range(turns):
+            config = {"configurable": {"thread_id": thread_id}}
+            await graph.ainvoke({"messages": [HumanMessage(content=f"question {turn}")]}, config)
+    return pool
+
+
+async def checkpoint_counts(pool: AsyncConnectionPool) -> dict[str, int]:
+    async with pool.connection() as conn:
+        cursor = await conn.execute("SELECT thread_id, count(*) AS n FROM checkpoints GROUP BY thread_id")
+        return {row["thread_id"]: row["n"] for row in await cursor.fetchall()}
+
+
+def test_keeps_the_latest_checkpoints_of_every_thread():
+    threads = [uuid.uuid4().hex for _ in range(3)]
+
+    async def run():
+        pool = await seeded_pool(threads, turns=4, max_size=2)
+        try:
+            before = await checkpoint_counts(pool)
+            stats = await CheckpointRetention(
+                pool, keep_last=2, max_age_days=0, delete_orphans=False, batch_size=2, batch_pause=0
+            ).run_once()
+            return before, stats, await checkpoint_counts(pool)
+        finally:
+            await pool.close()
+
+    before, stats, after = asyncio.run(run())
+
+    assert stats.threads_scanned == 3
+    assert stats.checkpoints_deleted == sum(before.values()) - 2 * len(threads)
+    assert after == {thread_id: 2 for thread_id in threads}
+
+
+def test_deletes_threads_idle_for_too_long():
+    threads = [uuid.uuid4().hex for _ in range(2)]
+
+    async def run():
+        pool = await seeded_pool(threads, turns=1, max_size=2)
+        try:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    "UPDATE checkpoints SET checkpoint = jsonb_set(checkpoint, '{ts}', to_jsonb((now() - interval '40 days')::text))"
+                    " WHERE thread_id = %s",
+                    (threads[0],),
+                )
+            stats = await CheckpointRetention(
+                pool, keep_last=10, max_age_days=30, delete_orphans=False, batch_pause=0
+            ).run_once()
+            return stats, await checkpoint_counts(pool)
+        finally:
+            await pool.close()
+
+    stats, after = asyncio.run(run())
+
+    assert stats.threads_deleted == 1
+    assert set(after) == {threads[1]}
+
+
+def test_a_pass_needs_a_single_pool_connection():
+    threads = [uuid.uuid4().hex for _ in range(3)]
+
+    async def run():
+        pool = await seeded_pool(threads, turns=3, max_size=1)
+        try:
+            retention = CheckpointRetention(pool, keep_last=1, max_age_days=0, delete_orphans=False, batch_size=1)
+            return await asyncio.wait_for(retention.run_once(), timeout=10)
+        finally:
+            await pool.close()
+
+    stats = asyncio.run(run())
+
+    assert stats.threads_scanned == 3
+    assert stats.batches_skipped == 0
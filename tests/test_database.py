@@ -0,0 +1,65 @@
+"""Tests for the database extension's async engine and session dependency."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+
+from configs import config
+from extensions import ext_database
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("postgresql://user:secret@db:5432/app", "postgresql+psycopg://user:secret@db:5432/app"),
+        ("postgresql+psycopg2://user:secret@db/app", "postgresql+psycopg://user:secret@db/app"),
+        ("postgresql+psycopg://user@db/app", "postgresql+psycopg://user@db/app"),
+        ("sqlite:////tmp/app.db", "sqlite+aiosqlite:////tmp/app.db"),
+    ],
+)
+def test_urls_are_rewritten_to_an_async_driver(url, expected):
+    assert ext_database.get_async_url(url) == expected
+
+
+def request_for(app: FastAPI) -> Request:
+    return Request({"type": "http", "app": app, "headers": []})
+
+
+def test_sessions_run_on_the_async_engine(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DATABASE_ASYNC_MODE", True)
+    monkeypatch.setattr(config, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    app = FastAPI()
+    ext_database.init_app(app)
+
+    async def run():
+        try:
+            sessions = ext_database.get_db_session(request_for(app))
+            session = await anext(sessions)
+            result = await session.exec(text("SELECT 1"))
+            await sessions.aclose()
+            return result.scalar_one()
+        finally:
+            await ext_database.shutdown_app(app)
+
+    assert isinstance(app.state.engine, AsyncEngine)
+    assert asyncio.run(run()) == 1
+
+
+def test_the_dependency_needs_the_async_mode(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DATABASE_ASYNC_MODE", False)
+    monkeypatch.setattr(config, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    app = FastAPI()
+    ext_database.init_app(app)
+
+    async def run():
+        try:
+            await anext(ext_database.get_db_session(request_for(app)))
+        finally:
+            await ext_database.shutdown_app(app)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
@@ -0,0 +1,27 @@
+"""Tests for the shared psycopg pool extension."""
+
+import pytest
+
+from configs import config
+from extensions import ext_db_pool
+
+
+@pytest.mark.parametrize(
+    "url, enabled",
+    [
+        ("", False),
+        ("sqlite:///app.db", False),
+        ("postgresql://user:secret@db:5432/app", True),
+        ("postgresql+psycopg://user:secret@db:5432/app", True),
+    ],
+)
+def test_pool_only_for_postgres(monkeypatch, url, enabled):
+    monkeypatch.setattr(config, "DATABASE_URL", url)
+
+    assert ext_db_pool.is_enabled() is enabled
+
+
+def test_conninfo_drops_the_sqlalchemy_driver():
+    conninfo = ext_db_pool.get_conninfo("postgresql+psycopg://user:secret@db:5432/app")
+
+    assert conninfo == "postgresql://user:secret@db:5432/app"
@@ -0,0 +1,86 @@
+"""Tests for the fake OpenAI-compatible server used by the load tests."""
+
+import json
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from fake_openai_server import FakeLLMSettings, create_app, fake_arguments  # noqa: E402
+
+USER_MESSAGES = [{"role": "user", "content": "hello"}]
+
+SEARCH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "search",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}, "lang": {"type": "string"}},
+            "required": ["query", "limit"],
+        },
+    },
+}
+
+
+def client(**settings) -> TestClient:
+    defaults = {"ttft": 0, "tokens_per_second": 10_000, "output_tokens": 4}
+    return TestClient(create_app(FakeLLMSettings(**{**defaults, **settings})))
+
+
+def stream_events(response) -> list:
+    return [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_text_answer_has_the_configured_length():
+    response = client().post("/v1/chat/completions", json={"messages": USER_MESSAGES})
+
+    choice = response.json()["choices"][0]
+    assert choice["finish_reason"] == "stop"
+    assert len(choice["message"]["content"].split()) == 4
+
+
+def test_no_tool_call_without_offered_tools():
+    response = client(tool_call_ratio=1.0).post("/v1/chat/completions", json={"messages": USER_MESSAGES})
+
+    assert response.json()["choices"][0]["finish_reason"] == "stop"
+
+
+def test_tool_call_names_an_offered_tool():
+    body = {"messages": USER_MESSAGES, "tools": [SEARCH_TOOL]}
+    response = client(tool_call_ratio=1.0).post("/v1/chat/completions", json=body)
+
+    choice = response.json()["choices"][0]
+    assert choice["finish_reason"] == "tool_calls"
+    function = choice["message"]["tool_calls"][0]["function"]
+    assert function["name"] == "search"
+    assert json.loads(function["arguments"]) == {"query": "benchmark", "limit": 1}
+
+
+def test_tool_result_gets_a_text_answer():
+    messages = USER_MESSAGES + [{"role": "tool", "content": "result", "tool_call_id": "call_1"}]
+    response = client(tool_call_ratio=1.0).post(
+        "/v1/chat/completions", json={"messages": messages, "tools": [SEARCH_TOOL]}
+    )
+
+    assert response.json()["choices"][0]["finish_reason"] == "stop"
+
+
+def test_stream_reports_usage_and_stats():
+    app_client = client()
+    body = {"messages": USER_MESSAGES, "stream": True, "stream_options": {"include_usage": True}}
+    events = stream_events(app_client.post("/v1/chat/completions", json=body))
+
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    content = "".join(chunk["choices"][0]["delta"].get("content") or "" for chunk in chunks if chunk["choices"])
+    assert len(content.split()) == 4
+    assert chunks[-1]["usage"]["completion_tokens"] == 4
+    assert app_client.get("/stats").json()["completions"] == 1
+
+
+def test_fake_arguments_fill_required_parameters_only():
+    assert fake_arguments(SEARCH_TOOL) == {"query": "benchmark", "limit": 1}
+    assert fake_arguments({"type": "function", "function": {"name": "ping"}}) == {}
@@ -0,0 +1,75 @@
+"""Tests for the delta message protocol."""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from configs import config
+from configs.deploy import Environment
+from core.agent.normal_agent import NormalAgent
+from schemas.chat import ChatRequest, Message
+from tests.conftest import ANSWER
+
+
+def user(content: str) -> Message:
+    return Message(role="user", content=content)
+
+
+def assistant(content: str) -> Message:
+    return Message(role="assistant", content=content)
+
+
+def test_delta_turns_are_appended_to_the_stored_history(agent):
+    async def run():
+        first = await agent.get_response([user("one")], "delta", history_mode="delta")
+        second = await agent.get_response([user("two")], "delta", history_mode="delta")
+        return first, second, await agent.get_chat_history("delta")
+
+    first, second, history = asyncio.run(run())
+
+    # A delta response only carries what this turn generated
+    assert first == second == [assistant(ANSWER)]
+    assert history == [user("one"), assistant(ANSWER), user("two"), assistant(ANSWER)]
+
+
+def test_full_requests_replace_the_stored_history(agent):
+    async def run():
+        await agent.get_response([user("one")], "full")
+        conversation = [user("one"), assistant(ANSWER), user("two")]
+        response = await agent.get_response(conversation, "full")
+        return response, await agent.get_chat_history("full")
+
+    response, history = asyncio.run(run())
+
+    assert response == history == [user("one"), assistant(ANSWER), user("two"), assistant(ANSWER)]
+
+
+def test_a_full_request_can_rewrite_the_history(agent):
+    async def run():
+        await agent.get_response([user("one"), assistant(ANSWER), user("two")], "rewrite")
+        await agent.get_response([user("other")], "rewrite")
+        return await agent.get_chat_history("rewrite")
+
+    assert asyncio.run(run()) == [user("other"), assistant(ANSWER)]
+
+
+def test_delta_requests_only_carry_user_messages():
+    with pytest.raises(ValidationError):
+        ChatRequest(messages=[assistant("hi"), user("one")], history_mode="delta")
+
+    assert ChatRequest(messages=[assistant("hi"), user("one")]).history_mode == "full"
+
+
+def test_delta_requests_need_a_checkpointer(chat_client, agent, monkeypatch):
+    monkeypatch.setattr(config, "ENVIRONMENT", Environment.PRODUCTION)
+
+    async def no_pool(self):
+        return None
+
+    monkeypatch.setattr(NormalAgent, "_get_connection_pool", no_pool)
+    asyncio.run(agent.create_graph())
+    body = {"messages": [{"role": "user", "content": "one"}]}
+
+    assert chat_client.post("/chatbot/chat", json={**body, "history_mode": "delta"}).status_code == 400
+    assert chat_client.post("/chatbot/chat", json=body).status_code == 200
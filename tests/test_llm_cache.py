@@ -0,0 +1,88 @@
+"""Tests for the exact-match LLM response cache."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from configs import config
+from core.agent.llm_cache import LLMResponseCache, make_llm_call_key
+from core.metrics import llm_cache_requests_total
+from schemas.chat import Message
+from tests.conftest import ANSWER
+
+
+@pytest.fixture
+def llm_cache(monkeypatch) -> LLMResponseCache:
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_CACHE_SHARED", False)
+    return LLMResponseCache()
+
+
+def cache_requests(result: str) -> float:
+    return llm_cache_requests_total.labels(result=result)._value.get()
+
+
+def test_only_deterministic_calls_are_cacheable(llm_cache, fake_llm):
+    assert llm_cache.is_cacheable(fake_llm)
+    assert not llm_cache.is_cacheable(fake_llm.model_copy(update={"temperature": 0.7}))
+    # A temperature bound to the call takes precedence over the model's
+    assert not llm_cache.is_cacheable(fake_llm.bind(temperature=0.7))
+    llm_cache.enabled = False
+    assert not llm_cache.is_cacheable(fake_llm)
+
+
+def test_keys_identify_the_model_tools_and_prompt(fake_llm):
+    prompt = [SystemMessage("be brief"), HumanMessage("hello")]
+    key = make_llm_call_key(fake_llm, prompt)
+
+    assert key == make_llm_call_key(fake_llm, [SystemMessage("be brief"), HumanMessage("hello")])
+    assert key != make_llm_call_key(fake_llm, [SystemMessage("be brief"), HumanMessage("hello!")])
+    assert key != make_llm_call_key(fake_llm.bind(tools=[{"name": "lookup"}]), prompt)
+
+
+def test_responses_round_trip_and_count_hits_and_misses(llm_cache):
+    response = AIMessage("cached answer", tool_calls=[{"name": "lookup", "args": {"city": "Paris"}, "id": "call-1"}])
+    hits, misses = cache_requests("hit"), cache_requests("miss")
+
+    async def run():
+        missing = await llm_cache.aget("key")
+        await llm_cache.aset("key", response)
+        return missing, await llm_cache.aget("key")
+
+    missing, cached = asyncio.run(run())
+
+    assert missing is None
+    assert cached.content == "cached answer"
+    assert cached.tool_calls == response.tool_calls
+    assert (cache_requests("hit") - hits, cache_requests("miss") - misses) == (1, 1)
+
+
+def ask(agent, session_id: str, bypass_cache: bool = False) -> list[str]:
+    async def run():
+        messages = [Message(role="user", content="hello")]
+        return [token async for token in agent.get_stream_response(messages, session_id, bypass_cache=bypass_cache)]
+
+    return asyncio.run(run())
+
+
+def test_a_repeated_prompt_is_answered_from_the_cache(agent, fake_llm, llm_cache):
+    agent.llm_cache = llm_cache
+
+    first = ask(agent, "cache-first")
+    second = ask(agent, "cache-second")
+
+    assert fake_llm.calls == 1
+    # The cached response still reaches the stream consumer
+    assert "".join(second) == "".join(first) == ANSWER
+
+
+def test_bypassing_the_cache_calls_the_model(agent, fake_llm, llm_cache):
+    agent.llm_cache = llm_cache
+    bypassed = cache_requests("bypass")
+
+    ask(agent, "bypass-first")
+    ask(agent, "bypass-second", bypass_cache=True)
+
+    assert fake_llm.calls == 2
+    assert cache_requests("bypass") - bypassed == 1
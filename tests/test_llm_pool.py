@@ -0,0 +1,95 @@
+"""Tests for routing LLM calls over the endpoint pool."""
+
+import pytest
+
+from configs import config
+from configs.middleware import LLMEndpointConfig
+from core.agent.llm_pool import EndpointHealth, LLMEndpoint, LLMPool
+from libs.circuit_breaker import CircuitOpenError
+
+
+def make_pool(*names: str, strategy: str = "ewma") -> LLMPool:
+    return LLMPool(
+        [LLMEndpoint(LLMEndpointConfig(name=name), None, "test", EndpointHealth(name)) for name in names],
+        strategy,
+    )
+
+
+def endpoint(pool: LLMPool, name: str) -> LLMEndpoint:
+    return next(endpoint for endpoint in pool.endpoints if endpoint.name == name)
+
+
+def open_circuit(endpoint: LLMEndpoint) -> None:
+    for _ in range(endpoint.health.breaker.failure_threshold):
+        endpoint.health.breaker.record_failure()
+
+
+def test_least_outstanding_picks_the_least_busy_endpoint():
+    pool = make_pool("a", "b", strategy="least_outstanding")
+    endpoint(pool, "a").health.outstanding = 2
+
+    assert pool.acquire().name == "b"
+    assert endpoint(pool, "b").health.outstanding == 1
+
+
+def test_ewma_prefers_the_faster_endpoint_until_it_is_loaded():
+    pool = make_pool("fast", "slow")
+    endpoint(pool, "fast").health.observe_first_chunk(0.1)
+    endpoint(pool, "slow").health.observe_first_chunk(0.25)
+
+    picked = [pool.acquire().name for _ in range(4)]
+
+    # Scores are the EWMA times (outstanding + 1): "fast" reaches 0.3 with two calls in flight
+    assert picked == ["fast", "fast", "slow", "fast"]
+
+
+def test_endpoints_without_samples_are_tried_first():
+    pool = make_pool("known", "new")
+    endpoint(pool, "known").health.observe_first_chunk(0.1)
+
+    assert pool.acquire().name == "new"
+
+
+def test_slowdowns_count_at_once_and_recoveries_gradually():
+    health = EndpointHealth("a")
+    health.observe_first_chunk(0.1)
+    health.observe_first_chunk(1.0)
+    assert health.ttft_ewma == 1.0
+
+    health.observe_first_chunk(0.1)
+    assert 0.1 < health.ttft_ewma < 1.0
+
+
+def test_tried_endpoints_are_avoided_unless_nothing_else_is_left():
+    pool = make_pool("a", "b")
+
+    assert pool.acquire(exclude=["a"]).name == "b"
+    open_circuit(endpoint(pool, "b"))
+    assert pool.acquire(exclude=["a"]).name == "a"
+
+
+def test_no_endpoint_is_available_once_every_circuit_is_open():
+    pool = make_pool("a", "b")
+    for each in pool.endpoints:
+        open_circuit(each)
+
+    with pytest.raises(CircuitOpenError) as rejected:
+        pool.acquire()
+
+    assert rejected.value.retry_after > 0
+
+
+def test_derived_pools_share_the_health_of_each_backend(monkeypatch):
+    monkeypatch.setattr(
+        config,
+        "LLM_ENDPOINTS",
+        [LLMEndpointConfig(name="a", base_url="http://a.test/v1"), LLMEndpointConfig(name="b", model="small")],
+    )
+    pool = LLMPool.from_config(temperature=0.7)
+
+    derived = pool.derive(model="summarizer", temperature=0)
+
+    assert [each.model for each in pool.endpoints] == [config.LLM_MODEL, "small"]
+    assert [each.model for each in derived.endpoints] == ["summarizer", "summarizer"]
+    assert all(mine.health is theirs.health for mine, theirs in zip(pool.endpoints, derived.endpoints))
+    assert str(pool.primary.llm.openai_api_base).startswith("http://a.test/v1")
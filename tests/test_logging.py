@@ -0,0 +1,117 @@
+"""Tests for the queued, structured logging pipeline."""
+
+import json
+import logging
+import queue
+
+import pytest
+
+from configs import config
+from extensions import ext_logging
+from libs.logger import ContextQueueHandler, KeyValueFormatter, SamplingFilter, get_logger
+from libs.request_context import request_id_var
+
+
+@pytest.fixture
+def log_file(monkeypatch, tmp_path):
+    """Run the pipeline writing JSON lines to a file, and restore the root logger afterwards."""
+
+    path = tmp_path / "app.log"
+    monkeypatch.setattr(config, "LOG_FILE", str(path))
+    monkeypatch.setattr(config, "LOG_FORMAT", "json")
+    monkeypatch.setattr(config, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(config, "LOG_SAMPLE_RATES", {})
+    root_logger = logging.getLogger()
+    level = root_logger.level
+    yield path
+    if ext_logging._queue_handler is not None:
+        ext_logging.shutdown_app(None)
+    root_logger.setLevel(level)
+
+
+def read_records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_are_written_with_their_fields_and_request_id(log_file):
+    ext_logging.init_app(None)
+    token = request_id_var.set("req-1")
+    try:
+        get_logger("tests").info("chat_request_processed", session_id="abc", tokens=12)
+    finally:
+        request_id_var.reset(token)
+    ext_logging.shutdown_app(None)
+
+    record = next(record for record in read_records(log_file) if record["event"] == "chat_request_processed")
+    assert record["request_id"] == "req-1"
+    assert (record["session_id"], record["tokens"], record["level"]) == ("abc", 12, "info")
+
+
+def test_exceptions_are_formatted_when_logged(log_file):
+    ext_logging.init_app(None)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        get_logger("tests").error("tool_call_failed", exc_info=True)
+    ext_logging.shutdown_app(None)
+
+    record = next(record for record in read_records(log_file) if record["event"] == "tool_call_failed")
+    assert "ValueError: boom" in record["exception"]
+
+
+def test_shutdown_restores_the_previous_handlers(log_file):
+    root_logger = logging.getLogger()
+    before = list(root_logger.handlers)
+
+    for _ in range(2):
+        ext_logging.init_app(None)
+        ext_logging.shutdown_app(None)
+
+    assert root_logger.handlers == before
+
+
+def test_a_full_queue_drops_records_instead_of_blocking():
+    handler = ContextQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger("tests.full_queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for _ in range(3):
+            logger.warning("event")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+
+def test_the_message_is_rendered_before_the_arguments_change():
+    handler = ContextQueueHandler(queue.Queue())
+    arguments = ["before"]
+    record = logging.LogRecord("tests", logging.INFO, __file__, 1, "value=%s", (arguments,), None)
+
+    prepared = handler.prepare(record)
+    arguments[0] = "after"
+
+    assert prepared.getMessage() == "value=['before']"
+
+
+def test_sampling_keeps_warnings_and_unlisted_events():
+    sampling = SamplingFilter({"health_check_called": 0.0})
+
+    def record(level: int, event: str) -> logging.LogRecord:
+        return logging.LogRecord("tests", level, __file__, 1, event, None, None)
+
+    assert not sampling.filter(record(logging.INFO, "health_check_called"))
+    assert sampling.filter(record(logging.WARNING, "health_check_called"))
+    assert sampling.filter(record(logging.INFO, "chat_request_processed"))
+
+
+def test_text_format_appends_the_fields():
+    record = logging.LogRecord("tests", logging.INFO, __file__, 1, "chat_request_processed", None, None)
+    record.fields = {"session_id": "abc", "tokens": 12}
+
+    line = KeyValueFormatter().format(record)
+
+    assert line.endswith("chat_request_processed session_id='abc' tokens=12")
@@ -0,0 +1,92 @@
+"""Tests for the Prometheus metrics surface."""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+from prometheus_client import REGISTRY
+
+from controllers import metrics as metrics_controller
+from core.metrics import PoolMetricsSampler, observe_llm_stream
+from schemas.chat import Message
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class Stream:
+    def __init__(self, chunks: list[AIMessageChunk]):
+        self.chunks = iter(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> AIMessageChunk:
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def test_upstream_streams_record_time_to_first_token_and_usage():
+    model = "metrics-test"
+    stream = Stream(
+        [
+            AIMessageChunk("hello"),
+            AIMessageChunk(" world", usage_metadata={"input_tokens": 12, "output_tokens": 2, "total_tokens": 14}),
+        ]
+    )
+
+    async def run():
+        return [chunk.content async for chunk in observe_llm_stream(stream, model)]
+
+    assert asyncio.run(run()) == ["hello", " world"]
+    assert stream.closed
+    assert sample("llm_time_to_first_token_seconds_count", model=model) == 1
+    assert sample("llm_prompt_tokens_total", model=model) == 12
+    assert sample("llm_completion_tokens_total", model=model) == 2
+
+
+def test_pool_counters_grow_by_the_difference():
+    sampler = PoolMetricsSampler()
+    pool = "metrics-test"
+    stats = dict(in_use=1, available=3, max_size=4, waiting=0, requests_num=10, requests_wait_ms=500, requests_errors=0)
+
+    sampler.sample_psycopg(pool, stats)
+    sampler.sample_psycopg(pool, {**stats, "in_use": 2, "requests_num": 15, "requests_wait_ms": 1500})
+    # A recreated pool restarts its counters
+    sampler.sample_psycopg(pool, {**stats, "requests_num": 3, "requests_wait_ms": 0})
+
+    assert sample("db_pool_connections", pool=pool, state="in_use") == 1
+    assert sample("db_pool_requests_total", pool=pool) == 18
+    assert sample("db_pool_wait_seconds_total", pool=pool) == 1.5
+
+
+def test_a_chat_run_records_node_and_llm_metrics(agent):
+    nodes_before = sample("graph_node_duration_seconds_count", node="chat")
+    iterations_before = sample("graph_run_iterations_count")
+
+    async def run():
+        return await agent.get_response([Message(role="user", content="hello")], "metrics")
+
+    asyncio.run(run())
+
+    assert sample("graph_node_duration_seconds_count", node="chat") == nodes_before + 1
+    assert sample("graph_run_iterations_count") == iterations_before + 1
+
+
+def test_the_metrics_endpoint_exposes_the_registry():
+    app = FastAPI()
+    app.include_router(metrics_controller.router)
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "llm_inference_duration_seconds" in response.text
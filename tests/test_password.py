@@ -0,0 +1,79 @@
+"""Tests for password hashing off the event loop."""
+
+import asyncio
+import time
+
+import pytest
+
+from core.metrics import password_hash_pending
+from libs.password import PasswordHasher, PasswordHasherBusyError
+
+
+@pytest.fixture
+def hasher() -> PasswordHasher:
+    return PasswordHasher(max_workers=1, max_queue=1, rounds=4)
+
+
+def test_hashes_verify_the_password(hasher):
+    async def run():
+        hashed = await hasher.hash("Correct-Horse-9")
+        return await hasher.verify("Correct-Horse-9", hashed), await hasher.verify("wrong", hashed)
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_callers_beyond_the_queue_fail_fast(hasher, monkeypatch):
+    def slow_hash(password: str) -> str:
+        time.sleep(0.1)
+        return password
+
+    monkeypatch.setattr(hasher, "hash_sync", slow_hash)
+
+    async def run():
+        return await asyncio.gather(*(hasher.hash(str(i)) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert results[:2] == ["0", "1"]
+    assert isinstance(results[2], PasswordHasherBusyError)
+    assert hasher._pending == 0
+
+
+def test_the_event_loop_keeps_running_while_hashing(hasher, monkeypatch):
+    def slow_hash(password: str) -> str:
+        time.sleep(0.2)
+        return password
+
+    monkeypatch.setattr(hasher, "hash_sync", slow_hash)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await hasher.hash("password")
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+
+
+def test_pending_operations_are_reported(hasher, monkeypatch):
+    seen = []
+
+    def observing_hash(password: str) -> str:
+        seen.append(password_hash_pending._value.get())
+        return password
+
+    monkeypatch.setattr(hasher, "hash_sync", observing_hash)
+    before = password_hash_pending._value.get()
+
+    asyncio.run(hasher.hash("password"))
+
+    assert seen == [before + 1]
+    assert password_hash_pending._value.get() == before
@@ -0,0 +1,92 @@
+"""Tests for the per-run profiling of the agent graph."""
+
+import asyncio
+from typing import Any
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.tools import StructuredTool
+
+from configs import config
+from core.agent import profiling
+from schemas.chat import Message
+from tests.conftest import FakeChatModel
+
+
+class ToolCallingModel(FakeChatModel):
+    """Asks for a tool on its first call, then answers like ``FakeChatModel``."""
+
+    async def _astream(self, *args: Any, **kwargs: Any):
+        if self.calls == 0:
+            self.calls += 1
+            tool_call = {"name": "lookup", "args": '{"city": "Paris"}', "id": "call-1", "index": 0}
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call]))
+            return
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+async def lookup(city: str) -> str:
+    """Look up the weather of a city."""
+    await asyncio.sleep(0.01)
+    return f"sunny in {city}"
+
+
+def use_tool_calling_model(agent, fake_llm) -> ToolCallingModel:
+    llm = ToolCallingModel(messages=fake_llm.messages)
+    for endpoint in agent.llm_pool.endpoints:
+        endpoint.llm = llm
+    agent.llm = llm
+    tool = StructuredTool.from_function(coroutine=lookup)
+    agent.tools_by_name = {tool.name: tool}
+    return llm
+
+
+def test_a_run_records_its_nodes_phases_and_iterations(agent, fake_llm):
+    use_tool_calling_model(agent, fake_llm)
+
+    async def run():
+        with profiling.capture_trace() as trace:
+            await agent.get_response([Message(role="user", content="weather?")], "profiling")
+        return trace
+
+    trace = asyncio.run(run())
+
+    assert dict(trace.node_counts) == {"summarize": 1, "chat": 2, "tool_call": 1}
+    assert trace.iterations == 1
+    assert trace.phases["tools"] >= 0.01
+    assert trace.phases["llm"] > 0
+    assert trace.wall_time >= sum(trace.node_times.values())
+
+
+def test_concurrent_runs_keep_separate_traces(agent):
+    async def traced_run(session_id: str):
+        with profiling.capture_trace() as trace:
+            await agent.get_response([Message(role="user", content="hello")], session_id)
+        return trace
+
+    async def run():
+        return await asyncio.gather(*(traced_run(f"profiling-{index}") for index in range(3)))
+
+    traces = asyncio.run(run())
+
+    assert [dict(trace.node_counts) for trace in traces] == [{"summarize": 1, "chat": 1}] * 3
+
+
+def test_chat_responses_carry_the_trace_in_server_timing_on_request(chat_client, monkeypatch):
+    body = {"messages": [{"role": "user", "content": "hello"}]}
+    monkeypatch.setattr(config, "GRAPH_PROFILE_HEADER_ENABLED", False)
+    assert "Server-Timing" not in chat_client.post("/chatbot/chat", json=body).headers
+
+    monkeypatch.setattr(config, "GRAPH_PROFILE_HEADER_ENABLED", True)
+    timing = chat_client.post("/chatbot/chat", json=body).headers["Server-Timing"]
+
+    assert timing.startswith("graph;dur=")
+    assert all(f"{phase};dur=" in timing for phase in profiling.PHASES)
+
+
+def test_phases_outside_a_run_are_ignored():
+    with profiling.phase("llm"):
+        pass
+
+    assert profiling.current_trace() is None
@@ -0,0 +1,68 @@
+"""Tests for the request-ID and timing middleware."""
+
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from libs.request_context import REQUEST_ID_HEADER, RequestContextMiddleware, get_request_id
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/request-id")
+    async def request_id(request: Request):
+        return {"context": get_request_id(), "state": request.state.request_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for index in range(3):
+                await asyncio.sleep(0)
+                yield f"{get_request_id()}:{index}\n"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_every_request_gets_an_id():
+    client = make_client()
+
+    first = client.get("/request-id")
+    second = client.get("/request-id")
+
+    ids = [response.headers[REQUEST_ID_HEADER] for response in (first, second)]
+    assert ids[0] != ids[1]
+    assert first.json() == {"context": ids[0], "state": ids[0]}
+    assert first.headers["Server-Timing"].startswith("app;dur=")
+
+
+def test_a_sane_incoming_id_is_kept():
+    response = make_client().get("/request-id", headers={REQUEST_ID_HEADER: "lb-1234.abc"})
+
+    assert response.headers[REQUEST_ID_HEADER] == "lb-1234.abc"
+    assert response.json()["context"] == "lb-1234.abc"
+
+
+def test_an_unsafe_incoming_id_is_replaced():
+    response = make_client().get("/request-id", headers={REQUEST_ID_HEADER: "bad id\twith spaces"})
+
+    assert response.headers[REQUEST_ID_HEADER] != "bad id\twith spaces"
+    assert response.json()["context"] == response.headers[REQUEST_ID_HEADER]
+
+
+def test_streamed_bodies_keep_the_request_id():
+    response = make_client().get("/stream")
+    request_id = response.headers[REQUEST_ID_HEADER]
+
+    assert response.text.splitlines() == [f"{request_id}:{index}" for index in range(3)]
+
+
+def test_the_id_does_not_leak_out_of_the_request():
+    make_client().get("/request-id")
+
+    assert get_request_id() is None
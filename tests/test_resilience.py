@@ -0,0 +1,267 @@
+"""Tests for the resilient LLM call layer."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from configs.middleware import LLMEndpointConfig
+from core.agent.llm_pool import EndpointHealth, LLMEndpoint, LLMPool
+from core.agent.resilience import ResilientLLMCaller
+from libs.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def make_pool(*names: str) -> LLMPool:
+    return LLMPool(
+        [LLMEndpoint(LLMEndpointConfig(name=name), None, "test", EndpointHealth(name)) for name in names],
+        "least_outstanding",
+    )
+
+
+async def stalled_attempt(endpoint: LLMEndpoint):
+    await asyncio.sleep(3600)
+    yield AIMessageChunk(content="never")
+
+
+async def cancel_during_hedge_delay(caller: ResilientLLMCaller) -> None:
+    async def consume() -> None:
+        async for _ in caller.stream(stalled_attempt):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def hedging_caller(pool: LLMPool) -> ResilientLLMCaller:
+    caller = ResilientLLMCaller(pool, hedge_quantile=0.5, hedge_min_samples=1)
+    # Hedge only after a minute, so the call is cancelled while waiting for it
+    caller.first_chunk_times.observe(60.0)
+    return caller
+
+
+def test_cancel_during_hedge_delay_finishes_the_call():
+    pool = make_pool("a", "b")
+
+    asyncio.run(cancel_during_hedge_delay(hedging_caller(pool)))
+
+    assert [endpoint.health.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_cancel_during_hedge_delay_releases_the_probe():
+    pool = make_pool("a")
+    breaker = pool.primary.health.breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    # Past the reset timeout: the next call is the half-open probe
+    breaker._opened_at -= breaker.reset_timeout
+
+    asyncio.run(cancel_during_hedge_delay(hedging_caller(pool)))
+
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.available
+    assert pool.primary.health.outstanding == 0
+
+
+def queued_admission(wait: float, entered: list, released: list):
+    @asynccontextmanager
+    async def slot():
+        await asyncio.sleep(wait)
+        entered.append(time.perf_counter())
+        try:
+            yield
+        finally:
+            released.append(time.perf_counter())
+
+    return slot
+
+
+async def answering_attempt(endpoint: LLMEndpoint):
+    await asyncio.sleep(0.02)
+    yield AIMessageChunk(content="hi")
+
+
+async def collect(caller: ResilientLLMCaller) -> list[str]:
+    return [chunk.content async for chunk in caller.stream(answering_attempt)]
+
+
+def test_time_to_first_token_excludes_the_admission_wait():
+    entered: list[float] = []
+    released: list[float] = []
+    admission = queued_admission(0.2, entered, released)
+    caller = ResilientLLMCaller(make_pool("a"), hedge_quantile=None, admission=admission)
+
+    assert asyncio.run(collect(caller)) == ["hi"]
+
+    assert len(entered) == len(released) == 1
+    assert caller.first_chunk_times.quantile(0.5) < 0.15
+
+
+def test_no_hedge_while_waiting_for_admission():
+    entered: list[float] = []
+    released: list[float] = []
+    pool = make_pool("a", "b")
+    admission = queued_admission(0.2, entered, released)
+    caller = ResilientLLMCaller(pool, hedge_quantile=0.5, hedge_min_samples=1, admission=admission)
+    # Hedge after 50 ms without a first chunk, well under the admission wait
+    caller.first_chunk_times.observe(0.05)
+
+    assert asyncio.run(collect(caller)) == ["hi"]
+
+    assert len(entered) == len(released) == 1
+    assert [endpoint.health.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_endpoint_latency_excludes_the_admission_wait():
+    pool = make_pool("a")
+    caller = ResilientLLMCaller(pool, hedge_quantile=None, admission=queued_admission(0.2, [], []))
+
+    asyncio.run(collect(caller))
+
+    assert pool.primary.health.ttft_ewma < 0.15
+
+
+def upstream_error(status: int, retry_after: str | None = None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(status, request=request, headers=headers)
+    return openai.APIStatusError(f"upstream answered {status}", response=response, body=None)
+
+
+def scripted_attempt(script: dict[str, list], calls: list[str]):
+    """Attempt answering per endpoint with the next scripted error, or "hi" once the script runs out."""
+
+    async def attempt(endpoint: LLMEndpoint):
+        calls.append(endpoint.name)
+        errors = script.get(endpoint.name, [])
+        if errors:
+            raise errors.pop(0)
+        yield AIMessageChunk(content="hi")
+        yield AIMessageChunk(content=" there")
+
+    return attempt
+
+
+async def collect_from(caller: ResilientLLMCaller, attempt) -> list[str]:
+    return [chunk.content async for chunk in caller.stream(attempt)]
+
+
+def test_a_transient_error_is_retried_on_another_endpoint():
+    pool = make_pool("a", "b")
+    calls: list[str] = []
+    caller = ResilientLLMCaller(pool, hedge_quantile=None)
+    script = {"a": [upstream_error(503)], "b": [upstream_error(503)]}
+
+    result = asyncio.run(collect_from(caller, scripted_attempt(script, calls)))
+
+    assert result == ["hi", " there"]
+    assert sorted(calls[:2]) == ["a", "b"]
+    assert len(calls) == 3
+    assert [endpoint.health.outstanding for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_other_errors_are_not_retried():
+    pool = make_pool("a", "b")
+    calls: list[str] = []
+    caller = ResilientLLMCaller(pool, hedge_quantile=None)
+    script = {"a": [upstream_error(400)], "b": [upstream_error(400)]}
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(collect_from(caller, scripted_attempt(script, calls)))
+
+    assert len(calls) == 1
+    # A bad request says nothing about the endpoint's health
+    assert all(endpoint.health.breaker.failures == 0 for endpoint in pool.endpoints)
+
+
+def test_a_failure_after_the_first_chunk_is_not_retried():
+    calls: list[str] = []
+
+    async def attempt(endpoint: LLMEndpoint):
+        calls.append(endpoint.name)
+        yield AIMessageChunk(content="hi")
+        raise upstream_error(503)
+
+    caller = ResilientLLMCaller(make_pool("a"), hedge_quantile=None)
+    received: list[str] = []
+
+    async def run():
+        async for chunk in caller.stream(attempt):
+            received.append(chunk.content)
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(run())
+
+    assert received == ["hi"]
+    assert calls == ["a"]
+
+
+def test_the_backoff_honours_retry_after():
+    caller = ResilientLLMCaller(make_pool("a"), backoff_base=0.01, backoff_max=5.0)
+
+    assert caller.backoff(0, upstream_error(429, retry_after="2")) == 2.0
+    assert caller.backoff(0, upstream_error(429, retry_after="60")) == 5.0
+    assert caller.backoff(0, upstream_error(503)) <= 0.01
+
+
+def test_calls_fail_fast_once_every_circuit_is_open():
+    pool = make_pool("a")
+    breaker = pool.primary.health.breaker
+    calls: list[str] = []
+    caller = ResilientLLMCaller(pool, max_attempts=1, hedge_quantile=None)
+    script = {"a": [upstream_error(503) for _ in range(breaker.failure_threshold)]}
+
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(openai.APIStatusError):
+            asyncio.run(collect_from(caller, scripted_attempt(script, calls)))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(collect_from(caller, scripted_attempt(script, calls)))
+
+    assert breaker.state == breaker.OPEN
+    assert len(calls) == breaker.failure_threshold
+
+
+def test_a_half_open_circuit_lets_one_probe_through():
+    transitions: list[str] = []
+    breaker = CircuitBreaker(
+        "test", failure_threshold=2, reset_timeout=0.01, on_state_change=lambda name, state: transitions.append(state)
+    )
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+
+    assert transitions == [breaker.OPEN, breaker.HALF_OPEN, breaker.CLOSED]
+    breaker.before_call()
+
+
+def test_a_slow_call_is_hedged_on_another_endpoint():
+    pool = make_pool("a", "b")
+    calls: list[str] = []
+
+    async def attempt(endpoint: LLMEndpoint):
+        calls.append(endpoint.name)
+        if len(calls) == 1:
+            await asyncio.sleep(3600)
+        yield AIMessageChunk(content=endpoint.name)
+
+    caller = ResilientLLMCaller(pool, hedge_quantile=0.5, hedge_min_samples=1)
+    caller.first_chunk_times.observe(0.02)
+
+    result = asyncio.run(collect_from(caller, attempt))
+
+    assert len(calls) == 2 and calls[0] != calls[1]
+    assert result == [calls[1]]
+    assert [endpoint.health.outstanding for endpoint in pool.endpoints] == [0, 0]
@@ -0,0 +1,30 @@
+"""Tests for the production server settings."""
+
+import os
+
+import server
+from configs import config
+
+
+def test_gunicorn_accepts_every_option(monkeypatch):
+    monkeypatch.setattr(config, "SERVER_WORKERS", 3)
+
+    app = server.Server(server.get_options())
+
+    assert app.cfg.workers == 3
+    assert app.cfg.worker_class is server.AppUvicornWorker
+    assert app.cfg.preload_app
+    assert app.cfg.bind == [f"{config.SERVER_HOST}:{config.SERVER_PORT}"]
+
+
+def test_one_worker_per_available_cpu_by_default(monkeypatch):
+    monkeypatch.setattr(config, "SERVER_WORKERS", 0)
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1}, raising=False)
+
+    assert server.get_worker_count() == 2
+
+
+def test_workers_shut_down_before_the_master_kills_them():
+    worker_timeout = server.AppUvicornWorker.CONFIG_KWARGS["timeout_graceful_shutdown"]
+
+    assert 0 < worker_timeout < config.SERVER_GRACEFUL_TIMEOUT
@@ -0,0 +1,126 @@
+"""Tests for the coalescing of identical concurrent calls."""
+
+import asyncio
+
+import pytest
+
+from libs.single_flight import SingleFlight
+
+
+class Upstream:
+    """Counts its calls; every call streams ``items``, pausing before each one."""
+
+    def __init__(self, items: list[str], pause: float = 0.01, error: Exception | None = None):
+        self.items = items
+        self.pause = pause
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            for item in self.items:
+                await asyncio.sleep(self.pause)
+                yield item
+            if self.error is not None:
+                raise self.error
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+async def collect(group: SingleFlight, key: str, factory) -> list[str]:
+    return [item async for item in group.stream(key, factory)]
+
+
+def test_concurrent_callers_share_one_call():
+    upstream = Upstream(["a", "b", "c"])
+    roles: list[str] = []
+    group = SingleFlight(on_call=roles.append)
+
+    async def run():
+        first = asyncio.create_task(collect(group, "key", upstream))
+        # Joins once the first item went out, and still gets the whole stream
+        await asyncio.sleep(0.015)
+        return await asyncio.gather(first, collect(group, "key", upstream))
+
+    results = asyncio.run(run())
+
+    assert results == [["a", "b", "c"], ["a", "b", "c"]]
+    assert upstream.calls == 1
+    assert roles == [SingleFlight.LEADER, SingleFlight.FOLLOWER]
+
+
+def test_different_keys_do_not_share():
+    upstream = Upstream(["a"])
+    group = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(collect(group, "one", upstream), collect(group, "two", upstream))
+
+    assert asyncio.run(run()) == [["a"], ["a"]]
+    assert upstream.calls == 2
+
+
+def test_a_finished_call_is_not_reused():
+    upstream = Upstream(["a"])
+    group = SingleFlight()
+
+    async def run():
+        await collect(group, "key", upstream)
+        await collect(group, "key", upstream)
+
+    asyncio.run(run())
+
+    assert upstream.calls == 2
+
+
+def test_every_subscriber_gets_the_error():
+    upstream = Upstream(["a"], error=ValueError("upstream failed"))
+    group = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(
+            collect(group, "key", upstream), collect(group, "key", upstream), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert upstream.calls == 1
+
+
+def test_the_call_is_cancelled_once_every_subscriber_left():
+    upstream = Upstream(["a", "b"], pause=3600)
+    group = SingleFlight()
+
+    async def run():
+        callers = [asyncio.create_task(collect(group, "key", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        still_running = upstream.cancelled == 0
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return still_running
+
+    assert asyncio.run(run())
+    assert upstream.cancelled == 1
+
+
+def test_a_caller_after_cancellation_starts_a_new_call():
+    upstream = Upstream(["a"], pause=0.05)
+    group = SingleFlight()
+
+    async def run():
+        leaver = asyncio.create_task(collect(group, "key", upstream))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        return await collect(group, "key", upstream)
+
+    assert asyncio.run(run()) == ["a"]
+    assert upstream.calls == 2
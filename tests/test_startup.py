@@ -0,0 +1,48 @@
+"""Tests for the lazy startup of the application."""
+
+import builtins
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from libs.startup_profile import StartupProfiler
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded in the lifespan, not when the app is imported
+HEAVY_MODULES = ("langgraph", "langchain_core", "langchain_openai", "openai", "tiktoken")
+
+
+def test_creating_the_app_does_not_import_the_agent_stack():
+    code = (
+        "import sys, app_factory; app_factory.create_app(); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = {**os.environ, "LLM_API_KEY": "test", "JWT_SECRET_KEY": "test-secret-key-of-at-least-32-bytes"}
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_the_profiler_attributes_imports_to_packages_and_unhooks():
+    profiler = StartupProfiler()
+    original_import = builtins.__import__
+    profiler.install_import_hook()
+    try:
+        sys.modules.pop("json.tool", None)
+        import json.tool  # noqa: F401
+
+        with profiler.phase("extensions"):
+            pass
+    finally:
+        summary = profiler.finish()
+
+    assert builtins.__import__ is original_import
+    assert "json" in summary["imports_ms"]
+    assert list(summary["phases_ms"]) == ["extensions"]
+    assert summary["total_ms"] >= 0
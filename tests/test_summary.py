@@ -0,0 +1,109 @@
+"""Tests for the rolling summary of older conversation turns."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from configs import config
+from core.agent.normal_agent import prepare_message
+from core.agent.summary import history_fingerprint, summary_message
+from schemas.chat import Message
+from tests.conftest import ANSWER
+
+
+@pytest.fixture
+def summarizer(monkeypatch, agent, fake_llm):
+    monkeypatch.setattr(config, "SUMMARIZATION_ENABLED", True)
+    monkeypatch.setattr(config, "SUMMARIZATION_TRIGGER_TOKENS", 1)
+    monkeypatch.setattr(config, "SUMMARIZATION_KEEP_TURNS", 2)
+    monkeypatch.setattr(config, "SUMMARIZATION_REFRESH_TURNS", 2)
+    for endpoint in agent.summarizer.llm_pool.endpoints:
+        endpoint.llm = fake_llm
+    return agent.summarizer
+
+
+def turns(count: int) -> list:
+    messages = []
+    for turn in range(count):
+        messages += [HumanMessage(f"question {turn}"), AIMessage(f"answer {turn}")]
+    return messages
+
+
+def update(summarizer, messages, summary="", summarized_count=0, fingerprint=""):
+    return asyncio.run(summarizer.update(messages, summary, summarized_count, fingerprint))
+
+
+def test_short_conversations_are_not_summarized(summarizer, fake_llm, monkeypatch):
+    assert update(summarizer, turns(2)) == {}
+    monkeypatch.setattr(config, "SUMMARIZATION_TRIGGER_TOKENS", 10_000)
+    assert update(summarizer, turns(5)) == {}
+    assert fake_llm.calls == 0
+
+
+def test_turns_before_the_recent_window_are_summarized(summarizer, fake_llm):
+    messages = turns(4)
+
+    result = update(summarizer, messages)
+
+    assert result == {
+        "summary": ANSWER,
+        "summarized_count": 4,
+        "summary_fingerprint": history_fingerprint(messages[:4]),
+    }
+    assert fake_llm.calls == 1
+
+
+def test_the_summary_is_refreshed_only_after_enough_new_turns(summarizer, fake_llm):
+    messages = turns(5)
+    fingerprint = history_fingerprint(messages[:4])
+
+    assert update(summarizer, messages, "older", 4, fingerprint) == {}
+    assert fake_llm.calls == 0
+
+    messages = turns(6)
+    assert update(summarizer, messages, "older", 4, fingerprint)["summarized_count"] == 8
+    assert fake_llm.calls == 1
+
+
+def test_a_replaced_history_discards_the_summary(summarizer, fake_llm, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARIZATION_TRIGGER_TOKENS", 10_000)
+    messages = turns(3)
+
+    result = update(summarizer, messages, "another conversation", 2, history_fingerprint(turns(1)[::-1]))
+
+    assert result == {"summary": "", "summarized_count": 0, "summary_fingerprint": ""}
+    assert fake_llm.calls == 0
+
+
+def test_a_failed_summary_keeps_the_previous_state(summarizer, fake_llm, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("upstream exploded")
+        yield
+
+    monkeypatch.setattr(type(fake_llm), "_astream", broken)
+
+    assert update(summarizer, turns(4)) == {}
+
+
+def test_the_prompt_replaces_summarized_turns_with_the_summary(agent):
+    prompt = prepare_message(turns(4)[4:], agent.token_counter, "be brief", "they asked twice")
+
+    assert prompt[:2] == [SystemMessage("be brief"), summary_message("they asked twice")]
+    assert [message.content for message in prompt[2:]] == ["question 2", "answer 2", "question 3", "answer 3"]
+
+
+def test_the_history_keeps_every_message(agent, summarizer, fake_llm):
+    async def run():
+        for turn in range(4):
+            messages = [Message(role="user", content=f"question {turn}")]
+            await agent.get_response(messages, "summary-history", history_mode="delta")
+        state = await agent._graph.aget_state(agent._get_run_config("summary-history"))
+        return state.values, await agent.get_chat_history("summary-history")
+
+    values, history = asyncio.run(run())
+
+    # Summarized before the third answer; the fourth turn is one short of a refresh
+    assert values["summary"] == ANSWER
+    assert values["summarized_count"] == 2
+    assert len(history) == 8
@@ -0,0 +1,109 @@
+"""Tests for the memoized token counter and history trimming."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage, trim_messages
+
+from core.agent.normal_agent import prepare_message
+from core.agent.token_counter import TOKENS_PER_MESSAGE, TokenCounter
+
+
+@pytest.fixture
+def encoded(monkeypatch) -> list[str]:
+    """Texts given to the tokenizer, which counts one token per word."""
+
+    texts: list[str] = []
+
+    def load_encoder(model: str):
+        def encode(text: str) -> int:
+            texts.append(text)
+            return len(text.split())
+
+        return encode
+
+    monkeypatch.setattr(TokenCounter, "_load_encoder", staticmethod(load_encoder))
+    return texts
+
+
+def conversation() -> list:
+    return [
+        HumanMessage("what is the weather in Paris"),
+        AIMessage("", tool_calls=[{"name": "weather", "args": {"city": "Paris"}, "id": "call-1"}]),
+        ToolMessage("sunny", tool_call_id="call-1"),
+        AIMessage("it is sunny in Paris"),
+        HumanMessage("and in Lyon"),
+        AIMessage("rainy"),
+    ]
+
+
+def test_messages_are_tokenized_once(encoded):
+    counter = TokenCounter("test")
+    messages = conversation()
+
+    first = counter(messages)
+    second = counter(messages + [HumanMessage("thanks")])
+
+    assert second == first + TOKENS_PER_MESSAGE + 1
+    assert len(encoded) == len(messages) + 1
+
+
+def test_equal_messages_share_a_count_but_not_different_roles(encoded):
+    counter = TokenCounter("test")
+
+    counter.count_message(HumanMessage("hello there"))
+    counter.count_message(HumanMessage("hello there", id="other"))
+    counter.count_message(AIMessage("hello there"))
+
+    assert len(encoded) == 2
+
+
+def test_tool_calls_are_counted(encoded):
+    counter = TokenCounter("test")
+    call = AIMessage("", tool_calls=[{"name": "weather", "args": {"city": "Paris"}, "id": "call-1"}])
+
+    assert counter.count_message(call) > counter.count_message(AIMessage(""))
+
+
+def test_the_cache_is_bounded(encoded):
+    counter = TokenCounter("test", max_entries=2)
+
+    for text in ["one", "two", "three", "one"]:
+        counter.count_message(HumanMessage(text))
+
+    assert encoded == ["one", "two", "three", "one"]
+
+
+def test_an_unavailable_tokenizer_falls_back_to_an_estimate(monkeypatch):
+    def offline(model: str):
+        raise OSError("offline")
+
+    monkeypatch.setattr("tiktoken.encoding_for_model", offline)
+    counter = TokenCounter("test")
+
+    assert counter.count_message(HumanMessage("x" * 40)) == TOKENS_PER_MESSAGE + 10
+
+
+@pytest.mark.parametrize("max_tokens", [0, 5, 12, 20, 30, 45, 1000])
+def test_trim_matches_trim_messages(encoded, max_tokens):
+    counter = TokenCounter("test")
+    messages = conversation()
+
+    expected = trim_messages(
+        messages,
+        max_tokens=max_tokens,
+        token_counter=counter,
+        strategy="last",
+        start_on="human",
+        allow_partial=False,
+    )
+
+    assert counter.trim(messages, max_tokens) == expected
+
+
+def test_prepared_prompts_start_with_the_system_prompt_and_a_human_turn(encoded, monkeypatch):
+    monkeypatch.setattr("core.agent.normal_agent.config.MAX_TOKENS", 12)
+    counter = TokenCounter("test")
+
+    prompt = prepare_message(conversation(), counter, "be brief")
+
+    assert prompt[0] == SystemMessage("be brief")
+    assert [message.content for message in prompt[1:]] == ["and in Lyon", "rainy"]
@@ -0,0 +1,164 @@
+"""Tests for the two-tier cache and the result cache of idempotent tools."""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+from langchain_core.tools import StructuredTool
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from configs import config
+from core.agent.cache import TieredCache
+from core.agent.tool_cache import ToolResultCache
+from extensions import ext_db_pool
+from libs.cache import MISSING, LRUTTLCache
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def test_lru_ttl_cache_evicts_the_least_recently_used_entry():
+    cache = LRUTTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_lru_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("libs.cache.time.monotonic", lambda: now[0])
+    cache = LRUTTLCache(max_entries=10, ttl=60)
+    cache.set("default", None)
+    cache.set("short", 1, ttl=5)
+
+    now[0] += 10
+    assert cache.get("short") is MISSING
+    assert cache.get("default") is None
+    now[0] += 60
+    assert cache.get("default") is MISSING
+    assert len(cache) == 0
+
+
+class BrokenPool:
+    def connection(self):
+        raise ConnectionError("database is down")
+
+
+def test_a_failing_shared_tier_is_a_miss(monkeypatch):
+    monkeypatch.setattr(ext_db_pool, "db_pool", BrokenPool())
+    cache = TieredCache("test", max_entries=10, ttl=60, shared=True)
+
+    async def run():
+        missing = await cache.aget("key")
+        await cache.aset("key", {"answer": 42})
+        return missing, await cache.aget("key")
+
+    # The write still reaches the in-process tier
+    assert asyncio.run(run()) == (MISSING, {"answer": 42})
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_workers_share_entries_through_postgres(monkeypatch):
+    namespace = f"test-{uuid.uuid4().hex}"
+
+    async def run():
+        pool = AsyncConnectionPool(
+            TEST_DATABASE_URL,
+            min_size=1,
+            max_size=2,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        await pool.open(wait=True)
+        monkeypatch.setattr(ext_db_pool, "db_pool", pool)
+        try:
+            async with pool.connection() as conn:
+                await TieredCache.setup(conn)
+            # Two workers, each with its own in-process tier
+            writer = TieredCache(namespace, max_entries=10, ttl=60, shared=True)
+            reader = TieredCache(namespace, max_entries=10, ttl=60, shared=True)
+            await writer.aset("key", {"answer": 42})
+            await writer.aset("expired", "stale", ttl=0.001)
+            await asyncio.sleep(0.01)
+            return await reader.aget("key"), await reader.aget("expired")
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()) == ({"answer": 42}, MISSING)
+
+
+def make_tool(calls: list, idempotent: bool = True, result=None) -> StructuredTool:
+    async def lookup(city: str, units: str = "metric") -> str:
+        """Look up the weather of a city."""
+        calls.append(city)
+        return f"sunny in {city}" if result is None else result
+
+    return StructuredTool.from_function(coroutine=lookup, metadata={"idempotent": idempotent})
+
+
+@pytest.fixture
+def tool_cache(monkeypatch) -> ToolResultCache:
+    monkeypatch.setattr(config, "TOOL_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "TOOL_CACHE_SHARED", False)
+    return ToolResultCache()
+
+
+def test_only_idempotent_tools_are_cacheable(tool_cache):
+    assert tool_cache.is_cacheable(make_tool([]))
+    assert not tool_cache.is_cacheable(make_tool([], idempotent=False))
+    tool_cache.enabled = False
+    assert not tool_cache.is_cacheable(make_tool([]))
+
+
+def test_keys_ignore_the_order_of_the_arguments():
+    first = ToolResultCache.make_key("weather", {"city": "Paris", "units": "metric"})
+
+    assert first == ToolResultCache.make_key("weather", {"units": "metric", "city": "Paris"})
+    assert first != ToolResultCache.make_key("weather", {"city": "Lyon", "units": "metric"})
+    assert first != ToolResultCache.make_key("forecast", {"city": "Paris", "units": "metric"})
+
+
+def test_results_that_are_not_json_are_not_cached(tool_cache):
+    async def run():
+        await tool_cache.aset("weather", {"city": "Paris"}, object())
+        return await tool_cache.aget("weather", {"city": "Paris"})
+
+    assert asyncio.run(run()) is MISSING
+
+
+def tool_call(city: str) -> dict:
+    return {"name": "lookup", "args": {"city": city}, "id": uuid.uuid4().hex}
+
+
+def run_tool_calls(agent, tool: StructuredTool, *calls: dict) -> list:
+    agent.tools_by_name = {tool.name: tool}
+
+    async def run():
+        return [await agent._run_tool(call) for call in calls]
+
+    return asyncio.run(run())
+
+
+def test_an_idempotent_tool_runs_once_per_arguments(agent, tool_cache):
+    agent.tool_cache = tool_cache
+    calls: list[str] = []
+
+    messages = run_tool_calls(agent, make_tool(calls), tool_call("Paris"), tool_call("Paris"), tool_call("Lyon"))
+
+    assert calls == ["Paris", "Lyon"]
+    assert [message.content for message in messages] == ["sunny in Paris", "sunny in Paris", "sunny in Lyon"]
+    assert messages[1].tool_call_id != messages[0].tool_call_id
+
+
+def test_other_tools_always_run(agent, tool_cache):
+    agent.tool_cache = tool_cache
+    calls: list[str] = []
+
+    run_tool_calls(agent, make_tool(calls, idempotent=False), tool_call("Paris"), tool_call("Paris"))
+
+    assert calls == ["Paris", "Paris"]
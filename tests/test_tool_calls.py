@@ -0,0 +1,74 @@
+"""Tests for the concurrent execution of tool calls."""
+
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from configs import config
+from core.agent.normal_agent import GraphState
+
+
+def sleeping_tool(running: list[int], peak: list[int]) -> StructuredTool:
+    async def wait(seconds: float) -> str:
+        """Wait for a while."""
+        running.append(1)
+        peak.append(len(running))
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            running.pop()
+        return f"waited {seconds}"
+
+    return StructuredTool.from_function(coroutine=wait)
+
+
+def failing_tool() -> StructuredTool:
+    async def explode() -> str:
+        """Always fail."""
+        raise RuntimeError("boom")
+
+    return StructuredTool.from_function(coroutine=explode)
+
+
+def run_tool_calls(agent, tools: list[StructuredTool], calls: list[tuple[str, dict]]) -> list:
+    agent.tools_by_name = {tool.name: tool for tool in tools}
+    message = AIMessage(
+        "",
+        tool_calls=[{"name": name, "args": args, "id": f"call-{index}"} for index, (name, args) in enumerate(calls)],
+    )
+    state = GraphState(messages=[message], session_id="tools")
+    return asyncio.run(agent._tool_call(state))["messages"]
+
+
+def test_tool_calls_run_concurrently_and_answer_in_order(agent, monkeypatch):
+    monkeypatch.setattr(config, "TOOL_MAX_CONCURRENCY", 2)
+    running: list[int] = []
+    peak: list[int] = []
+    durations = [0.05, 0.01, 0.03, 0.02]
+
+    messages = run_tool_calls(agent, [sleeping_tool(running, peak)], [("wait", {"seconds": s}) for s in durations])
+
+    assert [message.tool_call_id for message in messages] == ["call-0", "call-1", "call-2", "call-3"]
+    assert [message.content for message in messages] == [f"waited {s}" for s in durations]
+    assert max(peak) == 2
+
+
+def test_a_slow_tool_times_out_without_failing_the_others(agent, monkeypatch):
+    monkeypatch.setattr(config, "TOOL_CALL_TIMEOUT", 0.05)
+
+    messages = run_tool_calls(
+        agent, [sleeping_tool([], [])], [("wait", {"seconds": 10}), ("wait", {"seconds": 0})]
+    )
+
+    assert messages[0].status == "error"
+    assert "timed out" in messages[0].content
+    assert (messages[1].status, messages[1].content) == ("success", "waited 0.0")
+
+
+def test_failures_are_reported_to_the_model(agent):
+    messages = run_tool_calls(agent, [failing_tool()], [("explode", {}), ("missing", {})])
+
+    assert [message.status for message in messages] == ["error", "error"]
+    assert "boom" in messages[0].content
+    assert messages[1].tool_call_id == "call-1"